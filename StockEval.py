@@ -1,11 +1,22 @@
 """Core stock evaluation logic used by the Flask app."""
 
-import yfinance as yf
 import pandas as pd
-import requests
 import re
 import os
+import math
+import json
+import time
 from dotenv import load_dotenv
+import httpClient
+from fundamentalsCache import loadSnapshot
+from upstreamScheduler import admit, upstreamPriority
+from circuitBreaker import breakerFor, CircuitOpenError
+from llmCache import getOrCompute, lookup, store, lastKnown, recordEvent
+from batchEngine import runBatch, defaultWorkers, defaultTimeout
+from metricHistory import storePeriods, storeObservation
+from metricRegistry import registry, registerMetric, resolveMetrics, fieldsFor
+from peerStats import sketches as peerSketches, capBand, observePeer, percentiles, relativeScore
+from instrumentation import timedStage, metricStage, metricError, recordStage
 
 load_dotenv()
 
@@ -15,32 +26,42 @@ apiUrl = "https://openrouter.ai/api/v1/chat/completions"
 
 # ==== Metric Calculation Helpers ====
 
+# Row labels yfinance has used for the same line item over time
+currentLiabilityLabels = [
+    'Current Liabilities',
+    'Total Current Liabilities',
+    'Total Current Liab',
+    'Total Liabilities',
+]
+interestExpenseLabels = [
+    'Interest Expense',
+    'Interest Expense Non Operating',
+    'Net Interest Income',
+    'Total Other Finance Cost'
+]
+
 def getCurrentLiabilities(balanceSheet):
     """
     Try to find current liabilities in a balance sheet using common label names.
     """
-    possibleKeys = [
-        'Current Liabilities',
-        'Total Current Liabilities',
-        'Total Current Liab',
-        'Total Liabilities',
-    ]
-    for key in possibleKeys:
+    for key in currentLiabilityLabels:
         if key in balanceSheet.index:
             return balanceSheet.loc[key].values[0]
     return 0
 
-def calcRoce(tickerObj):
+@registerMetric("roce", "financials", "balance_sheet")
+@metricStage("roce")
+def calcRoce(snapshot):
     """
     Calculate Return on Capital Employed (ROCE).
     ROCE = Operating Income / (Total Assets - Current Liabilities)
     """
     try:
-        fin = tickerObj.financials  # Income statement data
+        fin = snapshot.financials  # Income statement data
         if fin is None or fin.empty:
             return 0
         ebit = fin.loc['Operating Income'].values[0]  # Earnings before interest and taxes
-        balanceSheet = tickerObj.balance_sheet  # Balance sheet data
+        balanceSheet = snapshot.balance_sheet  # Balance sheet data
         if balanceSheet is None or balanceSheet.empty:
             return 0
         totalAssets = balanceSheet.loc['Total Assets'].values[0]
@@ -48,26 +69,23 @@ def calcRoce(tickerObj):
         capitalEmployed = totalAssets - currentLiabilities
         return ebit / capitalEmployed if capitalEmployed else 0
     except Exception:
+        metricError("roce")
         return 0
 
-def calcInterestCoverage(tickerObj):
+@registerMetric("interestCov", "financials")
+@metricStage("interestCov")
+def calcInterestCoverage(snapshot):
     """
     Calculate Interest Coverage Ratio.
     Coverage = EBIT / Interest Expense (try multiple possible row names)
     """
     try:
-        fin = tickerObj.financials
+        fin = snapshot.financials
         if fin is None or fin.empty or 'Operating Income' not in fin.index:
             return 0
         ebit = fin.loc['Operating Income'].dropna().iloc[0]  # EBIT
-        possibleLabels = [
-            'Interest Expense',
-            'Interest Expense Non Operating',
-            'Net Interest Income',
-            'Total Other Finance Cost'
-        ]
         interestExpense = 0
-        for label in possibleLabels:
+        for label in interestExpenseLabels:
             # Search common rows for interest expense
             if label in fin.index:
                 vals = fin.loc[label].dropna()
@@ -85,14 +103,17 @@ def calcInterestCoverage(tickerObj):
                     break
         return ebit / interestExpense if interestExpense else 0
     except Exception:
+        metricError("interestCov")
         return 0
 
-def calcNetMargin(tickerObj):
+@registerMetric("netMargin", "quarterly_financials")
+@metricStage("netMargin")
+def calcNetMargin(snapshot):
     """
     Calculate Net Margin: Net Income / Revenue (quarterly financials preferred)
     """
     try:
-        fin = tickerObj.quarterly_financials  # Prefer more recent quarterly data
+        fin = snapshot.quarterly_financials  # Prefer more recent quarterly data
         if fin is None or fin.empty:
             return 0
         netIncome = fin.loc['Net Income'].values[0] if 'Net Income' in fin.index else 0
@@ -101,15 +122,18 @@ def calcNetMargin(tickerObj):
         )
         return netIncome / revenue if revenue else 0
     except Exception:
+        metricError("netMargin")
         return 0
 
-def calcCashConversionRatioTtm(tickerObj):
+@registerMetric("ccr", "quarterly_cashflow", "quarterly_financials")
+@metricStage("ccr")
+def calcCashConversionRatioTtm(snapshot):
     """
     Calculate Cash Conversion Ratio (TTM): Operating Cash Flow / Net Income
     """
     try:
-        cfQ = tickerObj.quarterly_cashflow
-        finQ = tickerObj.quarterly_financials
+        cfQ = snapshot.quarterly_cashflow
+        finQ = snapshot.quarterly_financials
         if cfQ is None or finQ is None or cfQ.empty or finQ.empty:
             return 0
         # Sum the last four quarters to approximate trailing twelve months
@@ -125,27 +149,33 @@ def calcCashConversionRatioTtm(tickerObj):
         )
         return cfo / ni if ni else 0
     except Exception:
+        metricError("ccr")
         return 0
 
-def calcPeRatio(tickerObj):
+@registerMetric("peRatio", "info")
+@metricStage("peRatio")
+def calcPeRatio(snapshot):
     """
     Calculate Price/Earnings Ratio using yfinance info dict.
     """
     try:
-        info = tickerObj.info
+        info = snapshot.info
         # Use trailing P/E if available; otherwise fall back to forward P/E
         pe = info.get("trailingPE") or info.get("forwardPE") or 0
         return pe
     except Exception:
+        metricError("peRatio")
         return 0
 
-def calcGrossProfitToAssets(tickerObj):
+@registerMetric("gpAssets", "info", "balance_sheet")
+@metricStage("gpAssets")
+def calcGrossProfitToAssets(snapshot):
     """
     Calculate Gross Profit / Total Assets.
     """
     try:
-        info = tickerObj.info
-        balanceSheet = tickerObj.balance_sheet
+        info = snapshot.info
+        balanceSheet = snapshot.balance_sheet
         if balanceSheet is None or balanceSheet.empty:
             return 0
         totalAssets = balanceSheet.loc['Total Assets'].values[0]
@@ -154,47 +184,131 @@ def calcGrossProfitToAssets(tickerObj):
             return 0
         return grossProfit / totalAssets
     except Exception:
+        metricError("gpAssets")
         return 0
 
-def gatherMetrics(tickerObj):
+@registerMetric("grossMargin", "info")
+def calcGrossMargin(snapshot):
+    """Gross margin as reported in the yfinance info dict."""
+    return snapshot.info.get("grossMargins", 0)
+
+@registerMetric("dividendYield", "info")
+def calcDividendYield(snapshot):
+    """Dividend yield from the info dict (0 when the company pays none)."""
+    return snapshot.info.get("dividendYield") or 0
+
+def gatherMetrics(snapshot, activeMetrics=None):
     """Collect commonly used metrics for a ticker.
 
-    This helper centralizes yfinance calls so that individual functions
-    don't have to repeat the same lookups.  It returns the raw values used
-    for scoring and display.
+    Every metric is computed from the same pre-fetched TickerSnapshot, so no
+    yfinance property is read more than once per evaluation.  It returns the
+    raw values used for scoring and display.  Only `activeMetrics` (registry
+    keys, default all) are computed; the rest are None.
     """
-    info = tickerObj.info
+    info = snapshot.info
+    active = resolveMetrics(activeMetrics)
+    values = {key: registry[key].calc(snapshot) if key in active else None for key in registry}
     metrics = {
         "name": info.get("longName", "N/A"),
         "price": info.get("currentPrice", 0),
         "country": info.get("country"),
+        "sector": info.get("sector"),
+        # Set when some statements are last-known-good copies (upstream unavailable)
+        "staleSince": snapshot.staleSince,
         # Raw dividend yield is stored as a decimal (e.g. 0.02 for 2%)
-        "divYieldRaw": info.get("dividendYield") or 0,
-        "peRatio": calcPeRatio(tickerObj),
-        "roce": calcRoce(tickerObj),
-        "interestCov": calcInterestCoverage(tickerObj),
-        "grossMargin": info.get("grossMargins", 0),
-        "netMargin": calcNetMargin(tickerObj),
-        "ccr": calcCashConversionRatioTtm(tickerObj),
-        "gpAssets": calcGrossProfitToAssets(tickerObj),
+        "divYieldRaw": values.pop("dividendYield"),
+        **values,
     }
     return metrics
 
+# Summary lines sent to the AI: (label, metric, format)
+summaryLines = [
+    ("ROCE", "roce", "{:.2%}"),
+    ("Interest Coverage", "interestCov", "{:.2f}x"),
+    ("Gross Margin", "grossMargin", "{:.2%}"),
+    ("Net Margin", "netMargin", "{:.2%}"),
+    ("Cash Conversion Ratio", "ccr", "{:.2%}"),
+    ("Gross Profit to Assets", "gpAssets", "{:.2%}"),
+    ("P/E Ratio", "peRatio", "{:.2f}"),
+    ("Dividend Yield", "divYieldRaw", "{:.2%}"),
+]
+
+@timedStage("summary")
 def buildSummary(metrics):
-    """Create a human readable summary string from metric values."""
-    return (
-        f"""ROCE: {metrics['roce']:.2%}
-Interest Coverage: {metrics['interestCov']:.2f}x
-Gross Margin: {metrics['grossMargin']:.2%}
-Net Margin: {metrics['netMargin']:.2%}
-Cash Conversion Ratio: {metrics['ccr']:.2%}
-Gross Profit to Assets: {metrics['gpAssets']:.2%}
-P/E Ratio: {metrics['peRatio']:.2f}
-Dividend Yield: {metrics['divYieldRaw']:.2%}"""
+    """Create a human readable summary string from metric values (skipping ones not computed)."""
+    return "\n".join(
+        f"{label}: {fmt.format(metrics[key])}"
+        for label, key, fmt in summaryLines
+        if metrics[key] is not None
     )
+
+# ==== Per-Period Metric History ====
+
+def statementRows(statement, labels, periods):
+    """
+    One line item across periods, reindexed to `periods`.  Each period takes
+    the first label that has a value for it; missing everywhere -> NaN.
+    """
+    values = pd.Series(float('nan'), index=periods)
+    if statement is None or statement.empty:
+        return values
+    for label in labels:
+        if label in statement.index:
+            row = pd.to_numeric(statement.loc[label], errors='coerce').reindex(periods)
+            values = values.combine_first(row)
+    return values
+
+def ratio(numerator, denominator):
+    """Element-wise ratio; missing data or a zero denominator gives 0 like the calc* functions."""
+    return (numerator / denominator.where(denominator != 0)).fillna(0)
+
+def periodMetrics(snapshot):
+    """
+    Compute the scored metrics for every annual period in the snapshot, not
+    just the latest one.  Returns a DataFrame indexed by fiscal period end.
+    P/E and dividend yield need the price at the time, so they are left out.
+    """
+    fin = snapshot.financials
+    if fin is None or fin.empty:
+        return pd.DataFrame()
+    periods = fin.columns
+    bs, cf = snapshot.balance_sheet, snapshot.cashflow
+
+    ebit = statementRows(fin, ['Operating Income'], periods)
+    revenue = statementRows(fin, ['Total Revenue', 'Operating Revenue'], periods)
+    grossProfit = statementRows(fin, ['Gross Profit'], periods)
+    netIncome = statementRows(fin, ['Net Income'], periods)
+    interestLabels = interestExpenseLabels + [
+        l for l in fin.index if 'interest' in l.lower() and 'income' not in l.lower()
+    ]
+    interestExpense = statementRows(fin, interestLabels, periods).abs()
+    totalAssets = statementRows(bs, ['Total Assets'], periods)
+    currentLiabilities = statementRows(bs, currentLiabilityLabels, periods).fillna(0)
+    operatingCashFlow = statementRows(cf, ['Operating Cash Flow'], periods)
+
+    return pd.DataFrame({
+        "roce": ratio(ebit, totalAssets - currentLiabilities),
+        "interestCov": ratio(ebit, interestExpense),
+        "grossMargin": ratio(grossProfit, revenue),
+        "netMargin": ratio(netIncome, revenue),
+        "ccr": ratio(operatingCashFlow, netIncome),
+        "gpAssets": ratio(grossProfit, totalAssets),
+    }, index=pd.to_datetime(periods))
+
+def recordHistory(snapshot, metrics):
+    """
+    Persist every annual period plus today's full metrics (with P/E and
+    yield) to the history store.  Failures are logged, never raised.
+    """
+    try:
+        storePeriods(snapshot.symbol, periodMetrics(snapshot))
+        storeObservation(snapshot.symbol, metrics)
+    except Exception as e:
+        print(f"Could not record history for {snapshot.symbol}: {e}")
 
 # ==== Scoring and Formatting ====
 
+@timedStage("score")
 def calculateScore(roce, interestCov, grossMargin, netMargin, ccr, gpAssets, peRatio, divYield):
     """Composite scoring logic using weighted metrics."""
     score = 0
@@ -210,7 +324,35 @@ def calculateScore(roce, interestCov, grossMargin, netMargin, ccr, gpAssets, peR
     score += max(min((20 / peRatio) * 5 if peRatio else 0, 5), 0)
     score += max(min((divYield / 0.03) * 5, 5), 0)
     return min(round(score), 100)
+
+def scoreMetrics(metrics):
+    """calculateScore for a gatherMetrics dict; metrics that weren't computed earn no points."""
+    def value(key):
+        return metrics[key] or 0
+    return calculateScore(
+        value("roce"),
+        value("interestCov"),
+        value("grossMargin"),
+        value("netMargin"),
+        value("ccr"),
+        value("gpAssets"),
+        value("peRatio"),
+        value("divYieldRaw"),
+    )
+
+def percentText(value):
+    """Whole-percent display of a decimal ratio, or "N/A" if it wasn't computed."""
+    return "N/A" if value is None else f"{round(value * 100)}%"
+
+def timesText(value):
+    """Whole-number multiple (e.g. interest coverage "12x"), or "N/A"."""
+    return "N/A" if value is None else f"{round(value)}x"
+
+def formatMetric(value, spec):
+    """format(value, spec), or "N/A" if the metric wasn't computed."""
+    return "N/A" if value is None else format(value, spec)
 
+@timedStage("highlight")
 def highlight(text):
     """Highlight key terms in the qualitative analysis HTML."""
     # Emphasize yes/no answers from the model
@@ -250,14 +392,63 @@ def highlight(text):
     text = re.sub(r'(?i)(Confidence:\s*)(\d+%?)', colorConfidence, text)
     return text
 
-# ==== AI Qualitative Questions ====
-
-def askQualitativeQuestions(ticker, financialSummary):
+class IncrementalHighlighter:
     """
-    Query OpenRouter/Deepseek API for qualitative questions about the stock, based on summary.
-    Returns a formatted string or a default fallback on error.
+    Apply highlight() to text that arrives in pieces (e.g. a streamed answer).
+    feed() returns HTML for the part that can no longer change: whole lines,
+    plus whole words of the current line that can't be part of a
+    "Final Score:" or "Confidence:" match.  Concatenating every feed() and
+    the final flush() gives the same HTML as highlight() on the full text
+    with newlines turned into <br>.
     """
-    prompt = f"""For {ticker}, respond clearly in bullet points.
+
+    keywords = ("final score:", "confidence:")
+
+    def __init__(self):
+        self.pending = ""
+
+    @staticmethod
+    def _wordStart(line, end):
+        """Start of the word running into line[end]; a cut inside a word would let \\b match there."""
+        return max(line.rfind(' ', 0, end), line.rfind('\t', 0, end)) + 1
+
+    def _safeLength(self, line):
+        """How much of an unfinished line can be highlighted now."""
+        safe = self._wordStart(line, len(line))  # Hold the last, possibly partial, word
+        lower = line.lower()
+        for keyword in self.keywords:
+            found = lower.find(keyword)
+            if found != -1:
+                safe = min(safe, self._wordStart(line, found))
+            # The keyword may still be arriving at the end of the buffer
+            for start in range(max(0, len(lower) - len(keyword)), len(lower)):
+                if keyword.startswith(lower[start:]):
+                    safe = min(safe, self._wordStart(line, start))
+                    break
+        return safe
+
+    def feed(self, chunk):
+        """Add streamed text; return HTML that is now final."""
+        self.pending += chunk
+        *lines, self.pending = self.pending.split('\n')
+        html = ''.join(highlight(line) + '<br>' for line in lines)
+        safe = self._safeLength(self.pending)
+        if safe:
+            html += highlight(self.pending[:safe])
+            self.pending = self.pending[safe:]
+        return html
+
+    def flush(self):
+        """Return HTML for whatever is left once the stream ends."""
+        html = highlight(self.pending)
+        self.pending = ""
+        return html
+
+# ==== AI Qualitative Questions ====
+
+# Model and prompt used for every analysis; both are part of the cache key
+qualitativeModel = "deepseek/deepseek-chat-v3-0324:free"
+qualitativePrompt = """For {ticker}, respond clearly in bullet points.
 Each bullet point must start with "Yes" or "No", followed by a short label of the question in parentheses, then a brief explanation.
 Do not restate the question.
 
@@ -279,6 +470,29 @@ Financial summary:
 {financialSummary}
 
 """
+
+# Shown while OpenRouter's circuit breaker is open and no earlier analysis exists
+aiPausedText = "AI analysis is paused while the AI service recovers. Please try again in a few minutes."
+
+def staleAnalysis(ticker):
+    """The last analysis stored for a ticker (under any summary), labelled with its date, or None."""
+    entry = lastKnown(qualitativeModel, qualitativePrompt, ticker)
+    if entry is None:
+        return None
+    value, storedAt = entry
+    day = time.strftime("%Y-%m-%d", time.gmtime(storedAt))
+    return f"(Stale: last available analysis from {day}; the AI service is unavailable right now.)\n{value}"
+
+class QualitativeUnavailable(Exception):
+    """OpenRouter gave no usable analysis; `fallback` is the text shown instead."""
+
+    def __init__(self, fallback, quota=False):
+        super().__init__(fallback)
+        self.fallback = fallback
+        self.quota = quota
+
+def openRouterRequest(prompt, stream=False):
+    """Headers and JSON body for one OpenRouter chat completion."""
     headers = {
         # Basic headers required by the OpenRouter API
         "Authorization": f"Bearer {apiKey}",
@@ -287,50 +501,275 @@ Financial summary:
         "X-Title": "Stock Screener App"
     }
     jsonData = {
-        "model": "deepseek/deepseek-chat-v3-0324:free",
+        "model": qualitativeModel,
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": 300,
         "temperature": 0.7,
-        "stream": False
+        "stream": stream
     }
-    response = requests.post(apiUrl, headers=headers, json=jsonData)
+    return headers, jsonData
+
+@timedStage("llm")
+def requestQualitative(prompt):
+    """
+    Send one prompt to OpenRouter and return the model's answer.
+    Raises QualitativeUnavailable when the call fails.
+    """
+    headers, jsonData = openRouterRequest(prompt)
+    breaker = breakerFor("openrouter")
+    if not breaker.allow():
+        raise QualitativeUnavailable(aiPausedText)
+    admit("openrouter")
+    start = time.perf_counter()
+    try:
+        response = httpClient.post(apiUrl, headers=headers, json=jsonData, timeout=(5, 60), rateHost="openrouter")
+    except httpClient.RequestError as e:
+        print(f"Error contacting OpenRouter: {e}")
+        breaker.record(False, time.perf_counter() - start)
+        raise QualitativeUnavailable("No qualitative analysis available.")
+    seconds = time.perf_counter() - start
     if response.status_code != 200:
         print("Error:", response.status_code, response.text)
-        return "No qualitative analysis available."
+        breaker.record(False, seconds)
+        raise QualitativeUnavailable("No qualitative analysis available.", quota=response.status_code == 429)
     try:
         resultJson = response.json()
         content = resultJson['choices'][0]['message']['content']
+        breaker.record(True, seconds)
         return content
     except Exception as e:
+        # The free tier answers 200 with an error body once the daily quota is used up
         print(f"Error parsing response: {e}")
-        return "No qualitative analysis available. Most likely too many results ran today. Please try again tomorrow."
+        breaker.record(False, seconds)
+        raise QualitativeUnavailable(
+            "No qualitative analysis available. Most likely too many results ran today. Please try again tomorrow.",
+            quota=True,
+        )
+
+def askQualitativeQuestions(ticker, financialSummary):
+    """
+    Query OpenRouter/Deepseek API for qualitative questions about the stock, based on summary.
+    Answers are cached by (model, prompt, ticker, summary), so repeat requests skip the API.
+    Returns a formatted string or a default fallback on error.
+    """
+    prompt = qualitativePrompt.format(ticker=ticker, financialSummary=financialSummary)
+    try:
+        return getOrCompute(
+            qualitativeModel,
+            qualitativePrompt,
+            ticker,
+            financialSummary,
+            lambda: requestQualitative(prompt),
+        )
+    except QualitativeUnavailable as e:
+        return staleAnalysis(ticker) or e.fallback
+
+def streamQualitativeQuestions(ticker, financialSummary):
+    """
+    Streaming version of askQualitativeQuestions: yields the answer's text as
+    OpenRouter produces it.  A cached answer is yielded in one piece, and a
+    completed stream is written to the same cache.
+    """
+    cached = lookup(qualitativeModel, qualitativePrompt, ticker, financialSummary)
+    if cached is not None:
+        yield cached
+        return
+    recordEvent("misses")
+    prompt = qualitativePrompt.format(ticker=ticker, financialSummary=financialSummary)
+    headers, jsonData = openRouterRequest(prompt, stream=True)
+    breaker = breakerFor("openrouter")
+    if not breaker.allow():
+        yield staleAnalysis(ticker) or aiPausedText
+        return
+    admit("openrouter")
+    start = time.perf_counter()
+    try:
+        response = httpClient.post(
+            apiUrl, headers=headers, json=jsonData, timeout=(5, 60), stream=True, rateHost="openrouter"
+        )
+    except httpClient.RequestError as e:
+        print(f"Error contacting OpenRouter: {e}")
+        breaker.record(False, time.perf_counter() - start)
+        recordEvent("errors")
+        yield staleAnalysis(ticker) or "No qualitative analysis available."
+        return
+    if response.status_code != 200:
+        print("Error:", response.status_code, response.text)
+        breaker.record(False, time.perf_counter() - start)
+        recordEvent("quotaErrors" if response.status_code == 429 else "errors")
+        yield staleAnalysis(ticker) or "No qualitative analysis available."
+        return
+    # Time to the first byte; a long answer streaming in is not a slow upstream
+    responseSeconds = time.perf_counter() - start
+
+    parts = []
+    ok = False
+    failed = False
+    start = time.perf_counter()
+    try:
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                # Server-sent events: "data: {...}" lines; ":" lines are keep-alive comments
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)['choices'][0]['delta'].get('content') or ""
+                except Exception:
+                    continue
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        ok = bool(parts)
+    except GeneratorExit:
+        # The client went away mid-answer; OpenRouter itself was answering fine
+        ok = True
+        raise
+    except Exception as e:
+        print(f"Error reading OpenRouter stream: {e}")
+        failed = True
+    finally:
+        # Always report an outcome: a half-open probe that never reports keeps the breaker shut
+        breaker.record(ok, responseSeconds)
+    recordStage("llm.stream", time.perf_counter() - start)
+    if failed:
+        recordEvent("errors")
+        if not parts:
+            yield staleAnalysis(ticker) or "No qualitative analysis available."
+        return
+    if parts:
+        store(qualitativeModel, qualitativePrompt, ticker, financialSummary, ''.join(parts))
+    else:
+        recordEvent("quotaErrors")
+        yield staleAnalysis(ticker) or (
+            "No qualitative analysis available. Most likely too many results ran today. Please try again tomorrow."
+        )
+
+def streamQualitativeHtml(ticker):
+    """
+    Evaluate a ticker's metrics, then yield the highlighted AI analysis as
+    HTML fragments while the model streams its answer.
+    """
+    snapshot = loadSnapshot(ticker)
+    summary = buildSummary(gatherMetrics(snapshot))
+    highlighter = IncrementalHighlighter()
+    for chunk in streamQualitativeQuestions(ticker, summary):
+        html = highlighter.feed(chunk)
+        if html:
+            yield html
+    tail = highlighter.flush()
+    if tail:
+        yield tail
 
 # ==== Main Entry: Evaluate One Ticker ====
 
-def evaluateSingleTicker(ticker, runAi=False):
+def evaluateSnapshot(ticker, activeMetrics=None):
+    """
+    Load only the statements the active metrics read (cached on disk),
+    compute them and return (snapshot, metrics).  History is only recorded
+    for full evaluations, so a partial one never overwrites stored periods,
+    and never from stale fallback data.
+    """
+    active = resolveMetrics(activeMetrics)
+    full = len(active) == len(registry)
+    # History is computed from every statement (cashflow too), so full runs load them all
+    snapshot = loadSnapshot(ticker) if full else loadSnapshot(ticker, fieldsFor(active))
+    metrics = gatherMetrics(snapshot, active)
+    if full and not snapshot.staleFields:
+        recordHistory(snapshot, metrics)
+        observePeer(snapshot.symbol, peerGroups(snapshot, metrics), metrics)
+    return snapshot, metrics
+
+def peerGroups(snapshot, metrics):
+    """The sector, country and market-cap band a ticker is ranked against."""
+    return {
+        "sector": metrics["sector"],
+        "country": metrics["country"],
+        "capBand": capBand(snapshot.info.get("marketCap")),
+    }
+
+def scoreTicker(ticker, activeMetrics=None):
+    """Evaluate a ticker's active metrics and return (metrics, score)."""
+    _, metrics = evaluateSnapshot(ticker, activeMetrics)
+    return metrics, scoreMetrics(metrics)
+
+def jsonNumber(value):
+    """Plain float for JSON output; NaN/inf/missing become None (JSON has no NaN)."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def evaluateRaw(ticker, activeMetrics=None):
+    """
+    Evaluate one stock (no AI) and return raw numbers for the web table.
+    Keys match the /score payload; ratios are decimals (0.15 = 15%) and the
+    browser does all display formatting.  "metrics" lists the metrics that
+    were computed; the others are null.
+    """
+    try:
+        metrics, scoreVal = scoreTicker(ticker, activeMetrics)
+        return {
+            "symbol": ticker,
+            "name": metrics["name"],
+            "country": metrics["country"],
+            "sector": metrics["sector"],
+            "price": jsonNumber(metrics["price"]),
+            "dividendYield": jsonNumber(metrics["divYieldRaw"]),
+            "peRatio": jsonNumber(metrics["peRatio"]),
+            "roce": jsonNumber(metrics["roce"]),
+            "interestCov": jsonNumber(metrics["interestCov"]),
+            "grossMargin": jsonNumber(metrics["grossMargin"]),
+            "netMargin": jsonNumber(metrics["netMargin"]),
+            "ccr": jsonNumber(metrics["ccr"]),
+            "gpAssets": jsonNumber(metrics["gpAssets"]),
+            "score": round(scoreVal),
+            "metrics": resolveMetrics(activeMetrics),
+            # Served from last-known-good data while Yahoo is unavailable
+            "stale": metrics["staleSince"] is not None,
+            "staleSince": metrics["staleSince"],
+        }
+    except CircuitOpenError as e:
+        print(f"Not evaluating {ticker}: {e}")
+        return {"error": str(e), "retryAfter": math.ceil(e.retryAfter)}
+    except Exception as e:
+        print(f"Error evaluating {ticker}: {e}")
+        return {"error": str(e)}
+
+def tickerPercentiles(ticker, peers="sector", weights=None):
+    """
+    Percentile ranks of a ticker's metrics within its peer group and the
+    relative score they add up to.  Tickers already in the peer store are
+    answered from memory; others are evaluated (and stored) first.
+    """
+    metrics, groups = peerSketches.metricsFor(ticker), peerSketches.groupsFor(ticker)
+    if metrics is None:
+        snapshot, metrics = evaluateSnapshot(ticker)
+        groups = peerGroups(snapshot, metrics)
+    return {
+        "symbol": ticker,
+        "peers": peers,
+        "groups": groups,
+        "percentiles": percentiles(metrics, groups, peers),
+        "relativeScore": relativeScore(metrics, groups, weights, peers),
+    }
+
+def evaluateSingleTicker(ticker, runAi=False, activeMetrics=None):
     """
-    Main function to evaluate one stock: fetch yfinance data, calculate all metrics and score,
-    and run qualitative analysis if requested.
+    Main function to evaluate one stock: fetch yfinance data, calculate the metrics
+    (all, or just `activeMetrics`) and score, and run qualitative analysis if requested.
     """
     try:
-        stock = yf.Ticker(ticker)
-        # Pull and compute all numeric metrics
-        metrics = gatherMetrics(stock)
+        # Load each needed statement once (cached on disk), then compute the metrics from it
+        metrics, scoreVal = scoreTicker(ticker, activeMetrics)
         divYield = (
             f"{metrics['divYieldRaw']:.2f}%"
             if metrics['divYieldRaw']
             else "N/A"
         )
-        scoreVal = calculateScore(
-            metrics["roce"],
-            metrics["interestCov"],
-            metrics["grossMargin"],
-            metrics["netMargin"],
-            metrics["ccr"],
-            metrics["gpAssets"],
-            metrics["peRatio"],
-            metrics["divYieldRaw"],
-        )
 
         summary = buildSummary(metrics)
 
@@ -348,14 +787,15 @@ def evaluateSingleTicker(ticker, runAi=False):
             "Price": f"${metrics['price']:.2f}",
             "Dividend Yield": divYield,
             "P/E Ratio": f"{metrics['peRatio']:.2f}" if metrics['peRatio'] else "N/A",
-            "ROCE": f"{round(metrics['roce'] * 100)}%",
-            "Interest Coverage": f"{round(metrics['interestCov'])}x",
-            "Gross Margin": f"{round(metrics['grossMargin'] * 100)}%",
-            "Net Margin": f"{round(metrics['netMargin'] * 100)}%",
-            "Cash Conversion Ratio (FCF)": f"{round(metrics['ccr'] * 100)}%",
-            "Gross Profit / Assets": f"{round(metrics['gpAssets'] * 100)}%",
+            "ROCE": percentText(metrics['roce']),
+            "Interest Coverage": timesText(metrics['interestCov']),
+            "Gross Margin": percentText(metrics['grossMargin']),
+            "Net Margin": percentText(metrics['netMargin']),
+            "Cash Conversion Ratio (FCF)": percentText(metrics['ccr']),
+            "Gross Profit / Assets": percentText(metrics['gpAssets']),
             "Score": f"{round(scoreVal)}/100",
-            "Qualitative": qual
+            "Qualitative": qual,
+            "Stale": metrics["staleSince"] is not None,
         }
     except Exception as e:
         print(f"Error evaluating {ticker}: {e}")
@@ -363,78 +803,123 @@ def evaluateSingleTicker(ticker, runAi=False):
 
 # ==== Batch Screener for Many Tickers (Optional) ====
 
-def screenStocks(tickers, runAi=True):
+def screenOne(ticker, runAi=True, activeMetrics=None):
+    """
+    Evaluate one ticker for a screen; return (screened row, qualitative row).
+    Raises on failure so the batch engine can retry it.
+    """
+    _, metrics = evaluateSnapshot(ticker, activeMetrics)
+    divYield = (
+        f"{round(metrics['divYieldRaw'], 5)}%"
+        if metrics['divYieldRaw']
+        else "N/A"
+    )
+
+    print(
+        f"{ticker}: Price=${metrics['price']:.2f}, DivYld={divYield}, "
+        f"P/E={formatMetric(metrics['peRatio'], '.2f')}, ROCE={formatMetric(metrics['roce'], '.2%')}, "
+        f"IntCov={formatMetric(metrics['interestCov'], '.2f')}, GM={formatMetric(metrics['grossMargin'], '.2%')}, "
+        f"NM={formatMetric(metrics['netMargin'], '.2%')}, CCR={formatMetric(metrics['ccr'], '.2%')}, "
+        f"GP/Assets={formatMetric(metrics['gpAssets'], '.2%')}"
+    )
+
+    scoreVal = round(scoreMetrics(metrics), 2)
+
+    summary = buildSummary(metrics)
+
+    qual = "Qualitative analysis not run."
+    if runAi:
+        qualResp = askQualitativeQuestions(ticker, summary)
+        if qualResp:
+            qual = highlight(qualResp.replace('\n', '<br>'))
+        else:
+            qual = "No qualitative analysis available."
+
+    screened = {
+        "Ticker": ticker,
+        "Company Name": metrics["name"],
+        "Current Price": f"${metrics['price']:.2f}",
+        "Dividend Yield": divYield,
+        "P/E Ratio": f"{metrics['peRatio']:.2f}" if metrics['peRatio'] else "N/A",
+        "ROCE": percentText(metrics['roce']),
+        "Interest Coverage": timesText(metrics['interestCov']),
+        "Gross Margin": percentText(metrics['grossMargin']),
+        "Net Margin": percentText(metrics['netMargin']),
+        "Cash Conversion Ratio (FCF)": percentText(metrics['ccr']),
+        "Gross Profit / Assets": percentText(metrics['gpAssets']),
+        "Score": f"{round(scoreVal)}/100",
+    }
+    qualitative = {
+        "Ticker": ticker,
+        "Qualitative Analysis": qual,
+    }
+    return screened, qualitative
+
+def screenStream(tickers, runAi=True, workers=defaultWorkers, timeout=defaultTimeout, activeMetrics=None):
+    """
+    Evaluate tickers concurrently, yielding (ticker, screened row, qualitative row)
+    as each one finishes.  Failed or timed-out tickers are logged and skipped.
+    """
+    activeMetrics = resolveMetrics(activeMetrics)
+    # Screens are batch work: they queue behind interactive and watchlist calls
+    with upstreamPriority("batch"):
+        results = runBatch(tickers, lambda t: screenOne(t, runAi, activeMetrics), workers=workers, timeout=timeout)
+        for ticker, result, error in results:
+            if error is not None:
+                print(f"Failed to evaluate {ticker}: {error}")
+                continue
+            screened, qualitative = result
+            yield ticker, screened, qualitative
+
+def evaluateMany(tickers, workers=defaultWorkers, timeout=defaultTimeout, activeMetrics=None):
+    """
+    Evaluate many tickers concurrently (no AI), yielding each evaluateRaw dict
+    as soon as it is ready.  Failures are yielded as {"symbol", "error"} rows.
+    """
+    activeMetrics = resolveMetrics(activeMetrics)
+    results = runBatch(tickers, lambda t: evaluateRaw(t, activeMetrics), workers=workers, timeout=timeout, retries=0)
+    for ticker, result, error in results:
+        if error is not None:
+            result = {"error": str(error) or type(error).__name__}
+        yield {"symbol": ticker, **result}
+
+def screenStocks(tickers, runAi=True, workers=defaultWorkers, timeout=defaultTimeout, activeMetrics=None):
     """
     Evaluate and screen a batch of tickers; return (dataframe, qualitative dataframe).
+    Rows keep the order of the input list.  With `activeMetrics` only those
+    metrics are computed (and only their statements fetched).
     """
-    screened = []
-    qualitativeList = []
-
-    for ticker in tickers:
-        print(f"Evaluating {ticker}...")
-        try:
-            stock = yf.Ticker(ticker)
-            metrics = gatherMetrics(stock)
-            divYield = (
-                f"{round(metrics['divYieldRaw'], 5)}%"
-                if metrics['divYieldRaw']
-                else "N/A"
-            )
-
-            print(
-                f"{ticker}: Price=${metrics['price']:.2f}, DivYld={divYield}, "
-                f"P/E={metrics['peRatio']:.2f}, ROCE={metrics['roce']:.2%}, "
-                f"IntCov={metrics['interestCov']:.2f}, GM={metrics['grossMargin']:.2%}, "
-                f"NM={metrics['netMargin']:.2%}, CCR={metrics['ccr']:.2%}, "
-                f"GP/Assets={metrics['gpAssets']:.2%}"
-            )
-
-            scoreVal = round(
-                calculateScore(
-                    metrics['roce'],
-                    metrics['interestCov'],
-                    metrics['grossMargin'],
-                    metrics['netMargin'],
-                    metrics['ccr'],
-                    metrics['gpAssets'],
-                    metrics['peRatio'],
-                    metrics['divYieldRaw'],
-                ),
-                2,
-            )
-
-            summary = buildSummary(metrics)
-
-            qual = "Qualitative analysis not run."
-            if runAi:
-                qualResp = askQualitativeQuestions(ticker, summary)
-                if qualResp:
-                    qual = highlight(qualResp.replace('\n', '<br>'))
-                else:
-                    qual = "No qualitative analysis available."
-
-            screened.append({
-                "Ticker": ticker,
-                "Company Name": metrics["name"],
-                "Current Price": f"${metrics['price']:.2f}",
-                "Dividend Yield": divYield,
-                "P/E Ratio": f"{metrics['peRatio']:.2f}" if metrics['peRatio'] else "N/A",
-                "ROCE": f"{round(metrics['roce'] * 100)}%",
-                "Interest Coverage": f"{round(metrics['interestCov'])}x",
-                "Gross Margin": f"{round(metrics['grossMargin'] * 100)}%",
-                "Net Margin": f"{round(metrics['netMargin'] * 100)}%",
-                "Cash Conversion Ratio (FCF)": f"{round(metrics['ccr'] * 100)}%",
-                "Gross Profit / Assets": f"{round(metrics['gpAssets'] * 100)}%",
-                "Score": f"{round(scoreVal)}/100",
-            })
-
-            qualitativeList.append({
-                "Ticker": ticker,
-                "Qualitative Analysis": qual,
-            })
-        except Exception as e:
-            print(f"Failed to evaluate {ticker}: {e}")
-
-    dfScreened = pd.DataFrame(screened)
-    dfQual = pd.DataFrame(qualitativeList)
+    tickers = list(tickers)
+    order = {ticker: i for i, ticker in enumerate(tickers)}
+    rows = sorted(
+        screenStream(tickers, runAi, workers, timeout, activeMetrics),
+        key=lambda r: order[r[0]],
+    )
+    dfScreened = pd.DataFrame([screened for _, screened, _ in rows])
+    dfQual = pd.DataFrame([qualitative for _, _, qualitative in rows])
     return dfScreened, dfQual
+
+def backfillHistory(tickers, workers=defaultWorkers, timeout=defaultTimeout):
+    """
+    Load every ticker (from cache where possible) and record its metric
+    history, so backtests can run locally afterwards.  Tickers only
+    available as stale fallback data are reported and skipped.  Returns the
+    number of tickers recorded.
+    """
+    def record(ticker):
+        snapshot = loadSnapshot(ticker)
+        # Same rule as evaluateSnapshot: never record history from stale fallback data
+        if snapshot.staleFields:
+            return snapshot.staleFields
+        recordHistory(snapshot, gatherMetrics(snapshot))
+        return ()
+
+    recorded = 0
+    for ticker, staleFields, error in runBatch(tickers, record, workers=workers, timeout=timeout):
+        if error is not None:
+            print(f"Failed to record history for {ticker}: {error}")
+        elif staleFields:
+            print(f"Skipped history for {ticker}: only stale data for {', '.join(staleFields)}")
+        else:
+            recorded += 1
+    return recorded
@@ -2,43 +2,165 @@
 
 """Flask application exposing endpoints for the StockEval web interface."""
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 import pandas as pd
 import os
-from datetime import datetime, timedelta
-from StockEval import evaluateSingleTicker  # Core stock evaluation logic
-from tickerFetcher import main as fetchMain  # Script used to refresh tickers
+import json
+import math
+import time
+from StockEval import evaluateSingleTicker, evaluateRaw, evaluateMany, streamQualitativeHtml, tickerPercentiles  # Core stock evaluation logic
+from scoring import scoreFrame, scoreArrays, normalizeWeights  # Vectorized scoring for many rows at once
+from metricHistory import scoreHistory  # Locally stored per-period metrics
+from tickerRefresh import UniverseHolder, startRefreshSchedule  # Live ticker list + background refresh
+from universeStore import loadUniverse, saveUniverse  # Memory-mapped ticker store
+from jobQueue import JobQueue  # Background queue for AI analysis runs
+from screenTable import queryScreen, iterateScreen, startScreenSchedule  # Nightly universe-wide screen
+from screenTable import exportColumns as screenColumns, textColumns as screenTextColumns
+from exportWriters import exportFormats, exportStream  # Streaming CSV/XLSX/Parquet downloads
+from quotes import refreshQuotes  # Batched price refresh against cached fundamentals
+from metricRegistry import resolveMetrics  # Metric subsets -> statements to fetch
+from peerStats import sketches as peerSketches, relativeScore, startPeerSchedule  # Peer-group percentile scoring
+from periodic import holdLeadership  # One worker runs the once-per-machine tasks
+from diskCache import cachePath
+from circuitBreaker import CircuitOpenError
+from upstreamScheduler import setPriority, upstreamPriority  # Interactive calls go ahead of batch work
+import instrumentation  # Stage timings, counters and /metrics export
+from compression import compressResponse, conditionalJson  # gzip/brotli bodies, ETags and 304s
 
 app = Flask(__name__)
 
-# Path to the cached ticker list
+# Limits for POST /evaluate: tickers per request and concurrent evaluations
+maxBulkTickers = int(os.getenv("BULK_EVALUATE_MAX", 500))
+bulkWorkers = int(os.getenv("BULK_EVALUATE_WORKERS", 8))
+# Tickers per POST /export request (a whole-universe export is ~8,800)
+maxExportTickers = int(os.getenv("EXPORT_MAX", 10000))
+# Tickers per POST /quotes request
+maxQuoteTickers = int(os.getenv("QUOTES_MAX", 1000))
+# Longest a /jobs/<id>/stream connection is held open (seconds)
+jobStreamTimeout = float(os.getenv("JOB_STREAM_TIMEOUT", 3600))
+
+# Watchlist export columns: /evaluate rows plus an error
+watchlistColumns = [
+    "symbol", "name", "country", "sector", "price", "dividendYield", "peRatio", "roce",
+    "interestCov", "grossMargin", "netMargin", "ccr", "gpAssets", "score", "error",
+]
+watchlistTextColumns = {"symbol", "name", "country", "sector", "error"}
+
+# CSV export of the ticker list, used to seed the binary store on first start
 tickersCsv = "tickers.csv"
-# DataFrame holding all available tickers
-tickerDf = pd.DataFrame()
+
+# Set by gunicorn.conf.py: start background threads in each worker after fork
+# (threads don't survive a fork) instead of at import in the preloading master
+deferBackgroundTasks = os.getenv("DEFER_BACKGROUND_TASKS", "").lower() in ("1", "true", "yes")
 
 # ==== Helpers ====
 
-def isFileOlderThanMonths(filePath, months):
-    """Check if a file's last-modified time is older than N months."""
-    if not os.path.exists(filePath):
-        return True
-    fileTime = datetime.fromtimestamp(os.path.getmtime(filePath))
-    return datetime.now() - fileTime > timedelta(days=30 * months)
-
-# ==== Ticker CSV Initialization ====
-
-try:
-    # Refresh tickers if CSV is old, otherwise use cached
-    if isFileOlderThanMonths(tickersCsv, 3):
-        print("Ticker CSV is older than 3 months. Refreshing...")
-        fetchMain()  # Updates the CSV file
-    tickerDf = pd.read_csv(tickersCsv)
-except Exception as e:
-    print(f"Using cached tickers due to error: {e}")
-    if os.path.exists(tickersCsv):
-        tickerDf = pd.read_csv(tickersCsv)
-    else:
-        tickerDf = pd.DataFrame(columns=["Symbol", "Name", "Market", "Market Cap"])  # fallback/empty
+def loadTickers():
+    """
+    Load the ticker universe from the memory-mapped store.
+    On first start the store is built from the bundled CSV export.
+    """
+    try:
+        return loadUniverse()
+    except FileNotFoundError:
+        if not os.path.exists(tickersCsv):
+            return pd.DataFrame(columns=["Symbol", "Name", "Market Cap", "Country"])  # fallback/empty
+        print("Building ticker store from tickers.csv")
+        fetchedAt = os.path.getmtime(tickersCsv)
+        saveUniverse(pd.read_csv(tickersCsv), fetchedAt=fetchedAt)
+        return loadUniverse()
+
+def requestedMetrics(value):
+    """
+    Metric subset from a request: a comma-separated string or a list of
+    metric keys.  Empty means all metrics; unknown keys raise ValueError.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    return resolveMetrics([key.strip() for key in value if key.strip()])
+
+def clientId():
+    """Who a request is from, for fair queuing (first proxy hop if behind one)."""
+    forwarded = request.headers.get("X-Forwarded-For", "")
+    return forwarded.split(",")[0].strip() or request.remote_addr or "unknown"
+
+def screenQuery(args):
+    """Filters, sort column and direction for a /screen query string."""
+    filters = {key: args.getlist(key) for key in ("country", "capBand") if key in args}
+    filters.update({
+        key: value for key, value in args.items()
+        if key.startswith(("min_", "max_"))
+    })
+    return filters, args.get("sort", "score"), args.get("order", "desc").lower() != "asc"
+
+def exportResponse(fmt, body, name):
+    """Stream an export body as a file download."""
+    mimetype, extension = exportFormats[fmt]
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{name}.{extension}"',
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+# ==== Ticker Store Initialization ====
+
+# Live ticker DataFrame + search index; refreshes swap both in at once.
+# Under gunicorn this runs once in the master; workers inherit it copy-on-write
+# (only the numeric universe columns stay memory-mapped and shared).
+universe = UniverseHolder(loadTickers)
+
+# ==== Background Jobs ====
+
+def qualitativeForTicker(ticker):
+    """Job worker: run the AI analysis for one ticker and return its HTML."""
+    with upstreamPriority("batch"):
+        result = evaluateSingleTicker(ticker, runAi=True)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result["Qualitative"]
+
+qualitativeJobs = JobQueue(qualitativeForTicker)
+
+def startBackgroundTasks():
+    """Start this process's background threads (every worker reloads the universe; the leader does the rest)."""
+    # Checks the store on a schedule and re-downloads the lists when stale,
+    # so requests never wait on a refresh
+    startRefreshSchedule(universe)
+    # Loads the peer distributions and picks up evaluations other workers stored
+    startPeerSchedule()
+    if holdLeadership(cachePath("leader.lock")):
+        # Re-screens the whole universe nightly into a ranked table served by /screen
+        startScreenSchedule(lambda: universe.current.df)
+        # Pick up tickers left unfinished by a previous worker
+        qualitativeJobs.resume()
+
+if not deferBackgroundTasks:
+    startBackgroundTasks()
+
+# ==== Request Instrumentation ====
+
+@app.before_request
+def startRequestTrace():
+    """Start timing the request and collecting its stages."""
+    g.traceToken = instrumentation.startTrace()
+    g.requestStart = time.perf_counter()
+    # Upstream calls made for a request are interactive unless the route says
+    # otherwise, and are queued fairly per client
+    setPriority("interactive", clientId())
+
+@app.after_request
+def finishRequestTrace(response):
+    """Record request latency by route and log the stage breakdown if tracing is on."""
+    seconds = time.perf_counter() - g.requestStart
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    instrumentation.requestSeconds.observe(seconds, endpoint=endpoint, status=response.status_code)
+    instrumentation.finishTrace(g.traceToken, f"{request.method} {request.path}", seconds)
+    return response
+
+# Compress JSON/HTML bodies (and the NDJSON stream) for clients that accept it
+app.after_request(compressResponse)
 
 # ==== Routes ====
 
@@ -69,50 +191,225 @@ def searchTicker():
     print(f"Search query: {query}")
     if not query:
         return jsonify([])
-
-    # First, grab tickers whose names or symbols *start* with the query
-    startsWith = tickerDf[
-        tickerDf['Name'].str.lower().str.startswith(query) |
-        tickerDf['Symbol'].str.lower().str.startswith(query)
-    ]
-    # Then search for tickers that merely *contain* the query and haven't
-    # already been matched above
-    contains = tickerDf[
-        ~tickerDf.index.isin(startsWith.index) & (
-            tickerDf['Name'].str.lower().str.contains(query) |
-            tickerDf['Symbol'].str.lower().str.contains(query)
-        )
-    ]
-    startsWith = startsWith.sort_values(by='Market Cap', ascending=False)
-    contains = contains.sort_values(by='Market Cap', ascending=False)
-
-    # Combine, trim to 10, and add a short country code
-    matches = pd.concat([startsWith, contains]).head(10)
-
-    def countryShort(c):
-        """Return a short country code for display in the UI."""
-        if isinstance(c, str):
-            if c.lower() == 'canada':
-                return 'CAD'
-            if c.lower() == 'united states':
-                return 'USA'
-            return c[:3].upper()  # Fallback to first three characters
-        return ''
-
-    matches['CountryShort'] = matches['Country'].apply(countryShort)
-
-    # Build JSON response for search box
-    filtered = matches[['Name', 'Symbol', 'CountryShort']]
-    results = filtered.to_dict(orient='records')
-    return jsonify(results)
+    with instrumentation.timed("search"):
+        results = universe.current.index.search(query)
+    return conditionalJson(jsonify(results))
 
 @app.route('/evaluate/<ticker>')
 def evaluate(ticker):
-    """Evaluate a ticker and return its data for the table (no AI)."""
+    """
+    Evaluate a ticker and return its raw metrics for the table (no AI).
+    ?metrics=roce,peRatio limits it to those metrics (and their statements).
+    Unchanged results are answered with 304 when the client sends its ETag.
+    """
     print(f"Evaluating ticker: {ticker}")
-    result = evaluateSingleTicker(ticker.upper(), runAi=False)
+    try:
+        activeMetrics = requestedMetrics(request.args.get("metrics"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = evaluateRaw(ticker.upper(), activeMetrics)
+    response = jsonify(result)
+    if "retryAfter" in result:
+        # Yahoo's circuit breaker is open and nothing is cached for this ticker
+        response.status_code = 503
+        response.headers["Retry-After"] = str(result["retryAfter"])
+        return response
+    if "error" in result:
+        return response
+    # Let the browser keep the result but revalidate it every time
+    response.headers["Cache-Control"] = "no-cache"
+    return conditionalJson(response)
+
+@app.route("/evaluate", methods=["POST"])
+def evaluateBulk():
+    """
+    Evaluate a list of tickers concurrently and stream the results as NDJSON,
+    one /evaluate/<ticker>-style object per line in completion order
+    (failures as {"symbol", "error"}).
+    Body: {"tickers": ["AAPL", "MSFT", ...], "metrics": ["roce", ...] (optional)}
+    """
+    setPriority("watchlist")
+    data = request.json or {}
+    try:
+        activeMetrics = requestedMetrics(data.get("metrics"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Upper-case and de-duplicate while keeping the submitted order
+    tickers = list(dict.fromkeys(t.strip().upper() for t in data.get("tickers", []) if t and t.strip()))
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+    if len(tickers) > maxBulkTickers:
+        return jsonify({"error": f"At most {maxBulkTickers} tickers per request"}), 400
+    print(f"Bulk evaluating {len(tickers)} tickers")
+
+    def lines():
+        for result in evaluateMany(tickers, workers=bulkWorkers, activeMetrics=activeMetrics):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/quotes", methods=["POST"])
+def quotes():
+    """
+    Refresh prices for many tickers in one batched download, with P/E,
+    dividend yield and the score change re-derived from cached fundamentals.
+    Body: {"tickers": ["AAPL", ...]}
+    """
+    setPriority("watchlist")
+    data = request.json or {}
+    tickers = list(dict.fromkeys(t.strip().upper() for t in data.get("tickers", []) if t and t.strip()))
+    if len(tickers) > maxQuoteTickers:
+        return jsonify({"error": f"At most {maxQuoteTickers} tickers per request"}), 400
+    if not tickers:
+        return jsonify([])
+    return jsonify(refreshQuotes(tickers))
+
+@app.route("/score", methods=["POST"])
+def scoreWatchlist():
+    """
+    Re-score a submitted watchlist under custom weights in one vectorized pass.
+    Body: {"weights": {"roce": 30, ...}, "rows": [{"symbol": "AAPL", "roce": 0.5, ...}]}
+    "mode": "relative" scores each metric by its percentile among the ticker's
+    peers instead of the fixed thresholds; "peers" picks the group (sector,
+    country, capBand or all; default sector).
+    """
+    data = request.json or {}
+    rows = data.get("rows", [])
+    if not rows:
+        return jsonify([])
+    try:
+        if data.get("mode", "absolute") == "relative":
+            peers = data.get("peers", "sector")
+            scores = [
+                relativeScore(row, peerSketches.groupsFor(str(row.get("symbol", "")).upper()), data.get("weights"), peers)
+                for row in rows
+            ]
+        else:
+            scores = scoreFrame(pd.DataFrame(rows), data.get("weights"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+    return jsonify([
+        {"symbol": row.get("symbol"), "score": int(score)}
+        for row, score in zip(rows, scores)
+    ])
+
+@app.route("/percentiles/<ticker>")
+def peerPercentiles(ticker):
+    """
+    Percentile rank of each of a ticker's metrics among its peers, from the
+    precomputed distributions (no other ticker is fetched).
+    Query args: peers (sector, country, capBand or all; default sector).
+    """
+    try:
+        result = tickerPercentiles(ticker.upper(), request.args.get("peers", "sector"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except CircuitOpenError as e:
+        # Same as /evaluate: Yahoo's breaker is open and nothing is cached for this ticker
+        response = jsonify({"error": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(math.ceil(e.retryAfter))
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
     return jsonify(result)
 
+@app.route("/screen")
+def screen():
+    """
+    Page through the nightly universe screen.
+    Query args: country / capBand (repeatable), min_<column> / max_<column>,
+    sort (any column, default score), order (asc/desc), page, pageSize.
+    """
+    args = request.args
+    filters, sort, descending = screenQuery(args)
+    try:
+        result = queryScreen(
+            filters,
+            sort=sort,
+            descending=descending,
+            page=args.get("page", 1),
+            pageSize=args.get("pageSize", 100),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+@app.route("/screen/export")
+def screenExport():
+    """
+    Download the whole nightly screen (or the part matching the /screen
+    filters and sort) as one file, streamed from the table in chunks.
+    Query args: format (csv, xlsx or parquet; default csv) plus /screen's filters.
+    """
+    filters, sort, descending = screenQuery(request.args)
+    fmt = request.args.get("format", "csv").lower()
+    try:
+        rows = iterateScreen(filters, sort, descending)
+        body = exportStream(fmt, screenColumns, rows, screenTextColumns, normalizeWeights(), sheetName="Screen")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return exportResponse(fmt, body, "screen")
+
+@app.route("/export", methods=["POST"])
+def exportWatchlist():
+    """
+    Evaluate a list of tickers and stream them straight into a download,
+    rows in completion order with raw numeric values and the score under
+    the given weights.  Failed tickers keep their row with an "error".
+    Body: {"format": "xlsx", "tickers": [...], "weights": {...} (optional),
+           "metrics": [...] (optional), "analysis": {"AAPL": "text"} (XLSX only)}
+    """
+    setPriority("watchlist")
+    data = request.json or {}
+    fmt = str(data.get("format", "xlsx")).lower()
+    tickers = list(dict.fromkeys(t.strip().upper() for t in data.get("tickers", []) if t and t.strip()))
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+    if len(tickers) > maxExportTickers:
+        return jsonify({"error": f"At most {maxExportTickers} tickers per request"}), 400
+    try:
+        activeMetrics = requestedMetrics(data.get("metrics"))
+        weights = normalizeWeights(data.get("weights"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    def rows():
+        for result in evaluateMany(tickers, workers=bulkWorkers, activeMetrics=activeMetrics):
+            if "error" not in result:
+                result["score"] = int(scoreArrays({key: [result.get(key)] for key in weights}, weights)[0])
+            yield result
+
+    try:
+        body = exportStream(fmt, watchlistColumns, rows(), watchlistTextColumns, weights,
+                            sheetName="Watchlist", analysis=data.get("analysis"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return exportResponse(fmt, body, "watchlist")
+
+@app.route("/history/<ticker>", methods=["GET", "POST"])
+def tickerHistory(ticker):
+    """
+    Score history for a ticker from the local metric store, one entry per fiscal year.
+    POST a body of {"weights": {...}} to score under a custom weight profile.
+    """
+    weights = (request.json or {}).get("weights") if request.method == "POST" else None
+    try:
+        history = scoreHistory(ticker.upper(), weights)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid weights: {e}"}), 400
+    history.index = history.index.strftime("%Y-%m-%d")
+    return jsonify([
+        {"periodEnd": periodEnd, **row}
+        for periodEnd, row in history.astype(object).where(history.notna(), None).iterrows()
+    ])
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (stage latencies, upstream calls, fallbacks, cache hits)."""
+    return Response(instrumentation.renderMetrics(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/run_qualitative", methods=["POST"])
 def runQualitative():
     """
@@ -121,6 +418,8 @@ def runQualitative():
     """
     data = request.json
     tickers = data.get("tickers", [])
+    # One ticker is a user waiting on a row; a list is a bulk run
+    setPriority("interactive" if len(tickers) == 1 else "batch")
     print(f"Running qualitative for: {tickers}")
     if not tickers:
         return jsonify({"error": "No tickers provided"}), 400
@@ -137,6 +436,78 @@ def runQualitative():
 
     return jsonify(results)
 
+@app.route("/qualitative_stream/<ticker>")
+def qualitativeStream(ticker):
+    """Stream one ticker's AI analysis as Server-Sent Events while the model writes it."""
+    ticker = ticker.upper()
+    print(f"Streaming qualitative for: {ticker}")
+
+    def events():
+        try:
+            for html in streamQualitativeHtml(ticker):
+                yield f"data: {json.dumps({'html': html})}\n\n"
+        except Exception as e:
+            print(f"Error streaming qualitative for {ticker}: {e}")
+            yield f"event: failed\ndata: {json.dumps({'error': str(e)})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/jobs/qualitative", methods=["POST"])
+def submitQualitativeJob():
+    """Queue AI analysis for a list of tickers; returns a job id to poll or stream."""
+    data = request.json or {}
+    tickers = [t.upper() for t in data.get("tickers", []) if t]
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+    jobId = qualitativeJobs.submit(tickers)
+    print(f"Queued qualitative job {jobId} for: {tickers}")
+    return jsonify({"jobId": jobId, "total": len(tickers)}), 202
+
+@app.route("/jobs/<jobId>")
+def jobStatus(jobId):
+    """Current progress and finished results for a job."""
+    status = qualitativeJobs.status(jobId)
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(status)
+
+@app.route("/jobs/<jobId>/stream")
+def jobStream(jobId):
+    """
+    Server-Sent Events stream emitting each ticker's result as it finishes.
+    Ends with a "failed" event if items are stuck with a dead worker or the
+    stream outlives JOB_STREAM_TIMEOUT, so it never holds a thread forever.
+    """
+    if qualitativeJobs.status(jobId) is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    def events():
+        sent = set()
+        deadline = time.monotonic() + jobStreamTimeout
+        while True:
+            status = qualitativeJobs.status(jobId)
+            if status is None:
+                # Pruned while we were streaming
+                yield f"event: failed\ndata: {json.dumps({'error': 'Job no longer exists'})}\n\n"
+                return
+            for item in status["results"]:
+                if item["position"] not in sent:
+                    sent.add(item["position"])
+                    yield f"data: {json.dumps(item)}\n\n"
+            if status["complete"]:
+                yield "event: done\ndata: {}\n\n"
+                return
+            if status["stalled"] or time.monotonic() > deadline:
+                reason = f"{status['stalled']} items stalled" if status["stalled"] else "Timed out"
+                yield f"event: failed\ndata: {json.dumps({'error': reason})}\n\n"
+                return
+            time.sleep(0.5)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
 # ==== Run the app ====
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,110 @@
+"""Bounded-parallelism batch runner that streams per-item results as they finish."""
+
+import contextvars
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from circuitBreaker import CircuitOpenError
+
+# ==== Configuration ====
+
+defaultWorkers = 8
+defaultTimeout = 120  # Seconds allowed per item, retries included
+defaultRetries = 2
+defaultBackoff = 1.0  # Base delay (seconds) for exponential backoff
+
+# ==== Helpers ====
+
+def callWithRetries(fn, item, retries=defaultRetries, backoff=defaultBackoff):
+    """
+    Call fn(item), retrying failures with jittered exponential backoff.
+    A call shed by an open circuit breaker fails at once: retrying within
+    the backoff would only hold a worker until it is refused again.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn(item)
+        except CircuitOpenError:
+            raise
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+# ==== Main Entry ====
+
+def runBatch(items, fn, workers=defaultWorkers, timeout=defaultTimeout,
+             retries=defaultRetries, backoff=defaultBackoff):
+    """
+    Run fn over items with at most `workers` calls in flight.
+    Yields (item, result, error) tuples in completion order; exactly one of
+    result/error is set.  An item's `timeout` starts when a thread picks it
+    up, not when it is queued.  Items that exceed it are reported with a
+    TimeoutError and abandoned; their thread finishes in the background, so
+    the batch moves its queued items to a fresh pool instead of waiting
+    behind the hung calls.
+    """
+    items = iter(items)
+    pools = [ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")]
+    inFlight = {}  # future -> (item, [startedAt, or None while queued])
+
+    def submit(item):
+        startedAt = [None]
+
+        def run():
+            startedAt[0] = time.monotonic()
+            return callWithRetries(fn, item, retries, backoff)
+
+        # Run in a copy of the caller's context (upstream priority, request trace)
+        context = contextvars.copy_context()
+        inFlight[pools[-1].submit(context.run, run)] = (item, startedAt)
+
+    def submitNext():
+        for item in items:
+            submit(item)
+            return True
+        return False
+
+    def replacePool():
+        """Retire the current pool (its threads are stuck) and requeue what hasn't started."""
+        retired = pools[-1]
+        pools.append(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch"))
+        for future, (item, _) in list(inFlight.items()):
+            if future.cancel():
+                inFlight.pop(future)
+                submit(item)
+        retired.shutdown(wait=False)
+
+    try:
+        for _ in range(workers):
+            if not submitNext():
+                break
+        while inFlight:
+            # Queued items can't expire before a whole timeout from now
+            started = [startedAt[0] for _, startedAt in inFlight.values() if startedAt[0] is not None]
+            waitFor = max(0, min(started) + timeout - time.monotonic()) if started else timeout
+            done, _ = wait(list(inFlight), timeout=waitFor, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, _ = inFlight.pop(future)
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+                submitNext()
+            now = time.monotonic()
+            expired = [
+                (future, item) for future, (item, startedAt) in inFlight.items()
+                if startedAt[0] is not None and now - startedAt[0] >= timeout
+            ]
+            for future, item in expired:
+                inFlight.pop(future)
+                yield item, None, TimeoutError(f"Timed out after {timeout}s")
+            if expired:
+                replacePool()
+                while len(inFlight) < workers and submitNext():
+                    pass
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,34 @@
+"""Synthetic NASDAQ screener and TSX workbook payloads served in place of the real downloads."""
+
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import tickerFetcher  # noqa: E402
+from tickerPipeline import syntheticListings  # noqa: E402
+
+# ==== Payloads ====
+
+def listingPayloads(rows, seed=7):
+    """(NASDAQ JSON bytes, TSX .xlsx bytes) for a synthetic universe of about `rows` listings."""
+    data, sheet = syntheticListings(rows, seed=seed)
+    workbook = io.BytesIO()
+    # The real workbook has a 9-row preamble above the header
+    sheet.to_excel(workbook, sheet_name="TSX Issuers September 2026", startrow=9, index=False)
+    return json.dumps(data).encode("utf-8"), workbook.getvalue()
+
+# ==== Stand-in for the downloads ====
+
+def install(nasdaqBytes, tsxBytes):
+    """Serve the payloads from tickerFetcher.downloadAll instead of the network."""
+    payloads = {"api.nasdaq.com": nasdaqBytes, "www.tsx.com": tsxBytes}
+
+    def download(url):
+        for host, payload in payloads.items():
+            if host in url:
+                return io.BytesIO(payload)
+        return ValueError(f"No fake payload for {url}")
+
+    tickerFetcher.downloadAll = lambda downloads: [download(url) for url, _, _ in downloads]
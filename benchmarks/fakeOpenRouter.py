@@ -0,0 +1,120 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Answers with a canned analysis after a configurable delay, optionally
+streamed as Server-Sent Events, and can throttle with 429s.
+
+    python benchmarks/fakeOpenRouter.py --latency 1.5 --rate-limit-every 5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==== Configuration ====
+
+cannedAnswer = """- Yes (Wide Moat) Strong brand and switching costs.
+- Yes (Scalable) Software-like margins on incremental revenue.
+- Yes (Cash Flow Focus) Consistent free cash flow.
+- No (Low Reinvestment) Heavy R&D spending.
+- Yes (Pricing Power) Raised prices without losing volume.
+- Yes (Predictability) Recurring revenue base.
+- Yes (Organic Growth) Few acquisitions.
+- Yes (Growth Strategy) Clear expansion plan.
+
+Final Score: 7/8
+Confidence: 80%"""
+
+# ==== Server ====
+
+class FakeOpenRouter(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with knobs for latency and throttling.
+    `latency` is the seconds before the answer (split across chunks when
+    streaming); every `rateLimitEvery`-th request (0 = never) and a random
+    `rateLimitShare` of requests get a 429.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.5, rateLimitEvery=0, rateLimitShare=0.0, chunks=20):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.rateLimitEvery = rateLimitEvery
+        self.rateLimitShare = rateLimitShare
+        self.chunks = chunks
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1/chat/completions"
+
+    def shouldThrottle(self):
+        with self._lock:
+            self.requests += 1
+            throttle = (
+                (self.rateLimitEvery and self.requests % self.rateLimitEvery == 0)
+                or random.random() < self.rateLimitShare
+            )
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    def startInBackground(self):
+        threading.Thread(target=self.serve_forever, name="fake-openrouter", daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, contentType="application/json", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        if server.shouldThrottle():
+            self._send(429, json.dumps({"error": {"message": "Rate limit exceeded"}}), headers=[("Retry-After", "1")])
+            return
+        if not payload.get("stream"):
+            time.sleep(server.latency)
+            self._send(200, json.dumps({"choices": [{"message": {"role": "assistant", "content": cannedAnswer}}]}))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        size = max(len(cannedAnswer) // server.chunks, 1)
+        for start in range(0, len(cannedAnswer), size):
+            time.sleep(server.latency / server.chunks)
+            delta = {"choices": [{"delta": {"content": cannedAnswer[start:start + size]}}]}
+            self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+# ==== Run script directly ====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenRouter server for benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--rate-limit-share", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeOpenRouter(args.port, args.latency, args.rate_limit_every, args.rate_limit_share)
+    print(f"Serving fake OpenRouter at {server.url}")
+    server.serve_forever()
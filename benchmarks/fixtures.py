@@ -0,0 +1,185 @@
+"""
+Recorded yfinance statement fixtures and an offline stand-in for yf.Ticker.
+
+    python benchmarks/fixtures.py record AAPL MSFT ...   # needs network
+    python benchmarks/fixtures.py record --universe 300  # top 300 by market cap
+    python benchmarks/fixtures.py synthetic 300          # offline, generated data
+"""
+
+import argparse
+import os
+import pickle
+import random
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import tickerSnapshot  # noqa: E402
+from tickerSnapshot import statementFields  # noqa: E402
+
+# ==== Configuration ====
+
+fixturesDir = os.getenv("BENCH_FIXTURES", os.path.join(os.path.dirname(__file__), "fixtures"))
+
+# ==== Fixture Files ====
+
+def fixturePath(symbol, baseDir=fixturesDir):
+    return os.path.join(baseDir, f"{symbol.upper()}.pickle")
+
+
+def saveFixture(symbol, values, baseDir=fixturesDir):
+    """Write one ticker's {field: value} statements."""
+    os.makedirs(baseDir, exist_ok=True)
+    with open(fixturePath(symbol, baseDir), "wb") as f:
+        pickle.dump(values, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loadFixture(symbol, baseDir=fixturesDir):
+    with open(fixturePath(symbol, baseDir), "rb") as f:
+        return pickle.load(f)
+
+
+def fixtureSymbols(baseDir=fixturesDir):
+    """Symbols with a recorded fixture, sorted."""
+    if not os.path.isdir(baseDir):
+        return []
+    return sorted(name[:-len(".pickle")] for name in os.listdir(baseDir) if name.endswith(".pickle"))
+
+# ==== Recording ====
+
+def recordFixtures(symbols, baseDir=fixturesDir):
+    """Fetch every statement for the symbols from yfinance and save them as fixtures."""
+    recorded = 0
+    for symbol in symbols:
+        values, trace = tickerSnapshot.fetchFields(symbol)
+        if "info" not in values:
+            print(f"Skipping {symbol}: {[t.error for t in trace if t.error]}")
+            continue
+        saveFixture(symbol, {field: values.get(field) for field in statementFields}, baseDir)
+        recorded += 1
+    print(f"Recorded {recorded} fixtures to {baseDir}")
+    return recorded
+
+
+def syntheticStatements(symbol, rng):
+    """Statements shaped like yfinance's (labels, newest-first period columns) with random values."""
+    years = pd.to_datetime([f"{y}-12-31" for y in range(2024, 2020, -1)])
+    quarters = pd.date_range(end="2025-06-30", periods=5, freq="QE")[::-1]
+    revenue = rng.uniform(1e8, 1e11)
+    margin = rng.uniform(-0.1, 0.5)
+
+    def yearly(base, spread=0.1):
+        return [base * rng.uniform(1 - spread, 1 + spread) for _ in years]
+
+    financials = pd.DataFrame(
+        [yearly(revenue * margin), yearly(-revenue * 0.01), yearly(revenue),
+         yearly(revenue * rng.uniform(0.2, 0.7)), yearly(revenue * margin * 0.7)],
+        index=["Operating Income", "Interest Expense", "Total Revenue", "Gross Profit", "Net Income"],
+        columns=years,
+    )
+    assets = revenue * rng.uniform(0.5, 3)
+    balanceSheet = pd.DataFrame(
+        [yearly(assets), yearly(assets * rng.uniform(0.1, 0.4))],
+        index=["Total Assets", "Current Liabilities"], columns=years,
+    )
+    cashflow = pd.DataFrame([yearly(revenue * margin * 0.8)], index=["Operating Cash Flow"], columns=years)
+    quarterlyFinancials = pd.DataFrame(
+        [[revenue * margin * 0.7 / 4 * rng.uniform(0.8, 1.2) for _ in quarters],
+         [revenue / 4 * rng.uniform(0.9, 1.1) for _ in quarters]],
+        index=["Net Income", "Total Revenue"], columns=quarters,
+    )
+    quarterlyCashflow = pd.DataFrame(
+        [[revenue * margin * 0.8 / 4 * rng.uniform(0.8, 1.2) for _ in quarters]],
+        index=["Operating Cash Flow"], columns=quarters,
+    )
+    # Some tickers lack data, like real small caps, to exercise the fallback paths
+    if rng.random() < 0.05:
+        quarterlyCashflow = pd.DataFrame()
+    info = {
+        "longName": f"{symbol} Holdings Inc.",
+        "currentPrice": round(rng.uniform(2, 500), 2),
+        "country": rng.choice(["United States", "Canada"]),
+        "sector": rng.choice(["Technology", "Industrials", "Energy", "Financial Services", "Healthcare"]),
+        "dividendYield": rng.choice([None, round(rng.uniform(0, 0.06), 4)]),
+        "trailingPE": rng.choice([None, round(rng.uniform(5, 60), 2)]),
+        "forwardPE": round(rng.uniform(5, 40), 2),
+        "grossMargins": float(financials.loc["Gross Profit"].iloc[0] / revenue),
+        "grossProfits": float(financials.loc["Gross Profit"].iloc[0]),
+    }
+    return {
+        "info": info,
+        "financials": financials,
+        "balance_sheet": balanceSheet,
+        "cashflow": cashflow,
+        "quarterly_financials": quarterlyFinancials,
+        "quarterly_cashflow": quarterlyCashflow,
+    }
+
+
+def syntheticFixtures(count, baseDir=fixturesDir, seed=11):
+    """Generate `count` offline fixtures (used when no recorded set exists)."""
+    rng = random.Random(seed)
+    symbols = [f"SYN{i:04d}" for i in range(count)]
+    for symbol in symbols:
+        saveFixture(symbol, syntheticStatements(symbol, rng), baseDir)
+    return symbols
+
+# ==== Stand-in for yf.Ticker ====
+
+class FixtureTicker:
+    """
+    Serves statements from fixtures with a simulated per-call upstream delay.
+    Unknown symbols raise on `info`, like a delisted ticker.
+    """
+    latency = 0.0   # Mean seconds per attribute read
+    jitter = 0.5    # +/- fraction of the latency
+    baseDir = fixturesDir
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        try:
+            self._values = loadFixture(symbol, self.baseDir)
+        except FileNotFoundError:
+            self._values = None
+
+    def _read(self, field):
+        if self.latency:
+            time.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+        if self._values is None:
+            raise KeyError(f"No fixture for {self.symbol}")
+        value = self._values.get(field)
+        return value.copy() if isinstance(value, (pd.DataFrame, dict)) else value
+
+
+for _field in statementFields:
+    setattr(FixtureTicker, _field, property(lambda self, field=_field: self._read(field)))
+
+
+def install(latency=0.0, baseDir=fixturesDir):
+    """Route every snapshot fetch through FixtureTicker."""
+    FixtureTicker.latency = latency
+    FixtureTicker.baseDir = baseDir
+    tickerSnapshot.tickerFactory = FixtureTicker
+
+# ==== Run script directly ====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or generate benchmark fixtures.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="record real statements from yfinance")
+    record.add_argument("symbols", nargs="*")
+    record.add_argument("--universe", type=int, default=0, help="record the N largest tickers")
+    synthetic = sub.add_parser("synthetic", help="generate offline fixtures")
+    synthetic.add_argument("count", type=int, nargs="?", default=300)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        symbols = list(args.symbols)
+        if args.universe:
+            universe = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "tickers.csv"))
+            universe = universe.assign(cap=pd.to_numeric(universe["Market Cap"], errors="coerce"))
+            symbols += universe.nlargest(args.universe, "cap")["Symbol"].tolist()
+        recordFixtures(symbols)
+    else:
+        print(f"Generated {len(syntheticFixtures(args.count))} fixtures in {fixturesDir}")
@@ -0,0 +1,353 @@
+"""
+Offline benchmark suite for StockEval.
+
+Runs every benchmark against recorded (or synthetic) statement fixtures, a
+local fake OpenRouter and synthetic exchange listings, then writes the
+results to benchmarks/results/<timestamp>.json.
+
+    python benchmarks/run.py                       # everything
+    python benchmarks/run.py --only search batch   # a subset
+    python benchmarks/run.py --compare benchmarks/results/<older>.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+benchDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(benchDir)
+workDir = tempfile.mkdtemp(prefix="stockeval-bench-")
+
+# Isolate every store and lift the upstream rate limits before the app modules read them
+os.environ.update({
+    "CACHE_DIR": os.path.join(workDir, "cache"),
+    "UNIVERSE_DIR": os.path.join(workDir, "universe"),
+    "TICKERS_CSV": os.path.join(workDir, "tickers.csv"),
+    "YAHOO_RATE": "100000",
+    "YAHOO_BURST": "100000",
+    "OPENROUTER_RATE": "100000",
+    "OPENROUTER_BURST": "100000",
+    "HTTP_BACKOFF": "0.05",
+    "API_KEY": "benchmark",
+})
+sys.path.insert(0, repoDir)
+sys.path.insert(0, benchDir)
+
+import pandas as pd  # noqa: E402
+import diskCache  # noqa: E402
+import fundamentalsCache  # noqa: E402
+import instrumentation  # noqa: E402
+import llmCache  # noqa: E402
+import StockEval  # noqa: E402
+import upstreamScheduler  # noqa: E402
+from rateLimit import TokenBucket  # noqa: E402
+import fixtures  # noqa: E402
+import fakeListings  # noqa: E402
+from fakeOpenRouter import FakeOpenRouter  # noqa: E402
+from searchIndex import SearchIndex  # noqa: E402
+
+resultsDir = os.path.join(benchDir, "results")
+
+# ==== Helpers ====
+
+def percentiles(samples):
+    """Summary statistics (milliseconds) for a list of durations in seconds."""
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "meanMs": statistics.fmean(ordered) * 1000,
+        "p50Ms": pick(0.50),
+        "p95Ms": pick(0.95),
+        "p99Ms": pick(0.99),
+        "maxMs": ordered[-1] * 1000,
+    }
+
+
+def freshCaches():
+    """Point the fundamentals and AI caches at an empty directory so the next run is cold."""
+    diskCache.cacheDir = tempfile.mkdtemp(dir=workDir)
+    fundamentalsCache._cache = None
+    llmCache._cache = None
+
+
+def timeEach(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+# ==== Benchmarks ====
+
+def benchEvaluate(symbols, args):
+    """Single-ticker evaluate latency, cold (upstream fetch) and warm (cached)."""
+    sample = symbols[:args.evaluations]
+    freshCaches()
+    cold = timeEach(lambda s: StockEval.evaluateSingleTicker(s), sample)
+    warm = timeEach(lambda s: StockEval.evaluateSingleTicker(s), sample)
+    return {"upstreamLatencyMs": args.latency * 1000, "cold": percentiles(cold), "warm": percentiles(warm)}
+
+
+def benchBatch(symbols, args):
+    """screenStocks throughput at several concurrency levels, each from a cold cache."""
+    results = {}
+    for workers in args.workers:
+        freshCaches()
+        start = time.perf_counter()
+        screened, _ = StockEval.screenStocks(symbols[:args.batch], runAi=False, workers=workers)
+        seconds = time.perf_counter() - start
+        results[str(workers)] = {
+            "tickers": len(screened),
+            "seconds": seconds,
+            "tickersPerSecond": len(screened) / seconds if seconds else 0,
+        }
+    return results
+
+
+def benchProfile(symbols, args):
+    """Cold screen with every metric vs. a two-metric (P/E + yield) profile: time and upstream calls."""
+    results = {}
+    for label, metrics in (("all", None), ("peYield", ["peRatio", "dividendYield"])):
+        freshCaches()
+        before = sum(instrumentation.upstreamCalls._values.values())
+        start = time.perf_counter()
+        screened, _ = StockEval.screenStocks(symbols[:args.batch], runAi=False, activeMetrics=metrics)
+        seconds = time.perf_counter() - start
+        results[label] = {
+            "tickers": len(screened),
+            "seconds": seconds,
+            "upstreamCalls": sum(instrumentation.upstreamCalls._values.values()) - before,
+        }
+    return results
+
+
+def benchPriority(symbols, args):
+    """
+    Interactive evaluate latency under a real Yahoo budget, idle vs. while a
+    batch screen saturates it (the scheduler should keep the two close).
+    """
+    budget = upstreamScheduler.PriorityGate("yahoo", TokenBucket(args.priority_rate, 1))
+    upstreamScheduler._gates["yahoo"] = budget
+    interactive = symbols[:args.ai]
+    screen = symbols[args.ai:args.ai + args.batch]
+    try:
+        freshCaches()
+        with upstreamScheduler.upstreamPriority("interactive", "bench"):
+            idle = timeEach(lambda s: StockEval.evaluateSingleTicker(s), interactive)
+
+        freshCaches()
+        thread = threading.Thread(
+            target=lambda: StockEval.screenStocks(screen, runAi=False, workers=16), daemon=True
+        )
+        thread.start()
+        time.sleep(1)
+        depth = budget.depth()["batch"]
+        with upstreamScheduler.upstreamPriority("interactive", "bench"):
+            busy = timeEach(lambda s: StockEval.evaluateSingleTicker(s), interactive)
+        thread.join()
+    finally:
+        upstreamScheduler._gates.pop("yahoo", None)
+    return {
+        "yahooRate": args.priority_rate,
+        "batchQueued": depth,
+        "idle": percentiles(idle),
+        "duringScreen": percentiles(busy),
+    }
+
+
+def benchAi(symbols, args):
+    """AI analysis latency against the fake OpenRouter, blocking and streamed, with and without 429s."""
+    results = {}
+    for label, every in (("ok", 0), ("throttled", args.rate_limit_every)):
+        server = FakeOpenRouter(latency=args.llm_latency, rateLimitEvery=every).startInBackground()
+        StockEval.apiUrl = server.url
+        freshCaches()
+        sample = symbols[:args.ai]
+        blocking = timeEach(lambda s: StockEval.evaluateSingleTicker(s, runAi=True), sample)
+
+        freshCaches()
+        firstChunk, total = [], []
+        for symbol in sample:
+            start = time.perf_counter()
+            first = None
+            for _ in StockEval.streamQualitativeHtml(symbol):
+                if first is None:
+                    first = time.perf_counter() - start
+            total.append(time.perf_counter() - start)
+            firstChunk.append(first if first is not None else total[-1])
+        server.shutdown()
+        results[label] = {
+            "llmLatencyMs": args.llm_latency * 1000,
+            "requests": server.requests,
+            "throttled": server.throttled,
+            "blocking": percentiles(blocking),
+            "streamFirstChunk": percentiles(firstChunk),
+            "streamTotal": percentiles(total),
+        }
+    return results
+
+
+def benchSearch(symbols, args):
+    """Search index build time and per-query latency over realistic autocomplete input."""
+    tickerDf = pd.read_csv(os.path.join(repoDir, "tickers.csv"))
+    start = time.perf_counter()
+    index = SearchIndex(tickerDf)
+    buildSeconds = time.perf_counter() - start
+
+    rng = random.Random(3)
+    words = [str(v) for v in pd.concat([tickerDf["Name"], tickerDf["Symbol"]]).dropna()]
+    queries = []
+    for _ in range(args.queries):
+        word = rng.choice(words).lower()
+        # Keystroke-style prefixes plus mid-word substrings
+        if rng.random() < 0.7:
+            queries.append(word[:rng.randint(1, min(len(word), 8))])
+        else:
+            offset = rng.randint(0, max(len(word) - 3, 0))
+            queries.append(word[offset:offset + rng.randint(3, 6)])
+    samples = timeEach(index.search, queries)
+    return {"entries": len(index), "buildSeconds": buildSeconds, "query": percentiles(samples)}
+
+
+def benchRefresh(symbols, args):
+    """Full ticker refresh (download stand-in, parse, dedup, diff, store) on synthetic listings."""
+    import tickerRefresh
+    from universeStore import saveUniverse
+
+    nasdaqBytes, tsxBytes = fakeListings.listingPayloads(args.listings)
+    fakeListings.install(nasdaqBytes, tsxBytes)
+
+    saveUniverse(pd.DataFrame(columns=["Symbol", "Name", "Market Cap", "Country"]))
+    holder = tickerRefresh.UniverseHolder()
+    start = time.perf_counter()
+    first = tickerRefresh.refreshUniverse(holder)
+    initialSeconds = time.perf_counter() - start
+    start = time.perf_counter()
+    second = tickerRefresh.refreshUniverse(holder)
+    unchangedSeconds = time.perf_counter() - start
+    return {
+        "listings": args.listings,
+        "initialSeconds": initialSeconds,
+        "initialAdded": len(first["added"]),
+        "unchangedSeconds": unchangedSeconds,
+        "unchangedDiff": sum(len(v) for v in second.values()),
+    }
+
+
+benchmarks = {
+    "evaluate": benchEvaluate,
+    "batch": benchBatch,
+    "profile": benchProfile,
+    "priority": benchPriority,
+    "ai": benchAi,
+    "search": benchSearch,
+    "refresh": benchRefresh,
+}
+
+# ==== Reporting ====
+
+def flatten(tree, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1} for numeric leaves."""
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(current, previousPath):
+    """Print every numeric result next to the same value from an earlier run."""
+    with open(previousPath, encoding="utf-8") as f:
+        previous = flatten(json.load(f)["results"])
+    print(f"\nCompared with {previousPath}:")
+    for path, value in flatten(current).items():
+        if path in previous and previous[path]:
+            change = (value - previous[path]) / previous[path] * 100
+            print(f"  {path:<50} {previous[path]:>12.3f} -> {value:>12.3f} ({change:+.1f}%)")
+
+
+def gitCommit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=repoDir, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StockEval offline benchmark suite.")
+    parser.add_argument("--only", nargs="*", choices=list(benchmarks), default=list(benchmarks))
+    parser.add_argument("--fixtures", type=int, default=300, help="synthetic fixtures to generate if none are recorded")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per yfinance call")
+    parser.add_argument("--evaluations", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4, 8, 16])
+    parser.add_argument("--ai", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--rate-limit-every", type=int, default=4)
+    parser.add_argument("--priority-rate", type=float, default=60, help="Yahoo calls per second for the priority benchmark")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--listings", type=int, default=12000)
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--output", help="where to write results (default benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    symbols = fixtures.fixtureSymbols()
+    if not symbols:
+        print(f"No recorded fixtures; generating {args.fixtures} synthetic ones")
+        symbols = fixtures.syntheticFixtures(args.fixtures)
+    fixtures.install(latency=args.latency)
+
+    results = {}
+    try:
+        for name in args.only:
+            print(f"Running {name}...")
+            start = time.perf_counter()
+            # The app logs every evaluation; keep that out of the report
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results[name] = benchmarks[name](symbols, args)
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": gitCommit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fixtures": len(symbols),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(resultsDir, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"\nSaved results to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark the ticker-list pipeline on a synthetic listing.
+
+Times each stage (NASDAQ parse, TSX parse, dedup, ".TO" suffix) of the
+columnar pipeline in tickerFetcher against the original row-by-row
+implementation, and checks both produce the same universe.
+
+    python benchmarks/tickerPipeline.py --rows 100000 [--xlsx]
+"""
+
+import argparse
+import io
+import os
+import random
+import string
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import tickerFetcher  # noqa: E402
+
+# ==== Synthetic Data ====
+
+suffixes = ["Common Stock", "Class A Ordinary Shares", "American Depositary Shares (ADR)", "Units", "Inc.", ""]
+capHeader = "Market Cap (C$)\n30-Sep-2026"
+
+
+def randomSymbol(rng):
+    return "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5)))
+
+
+def syntheticListings(rows, tsxShare=0.15, overlapShare=0.02, seed=7):
+    """Nasdaq screener JSON plus a raw TSX sheet, with some symbol/name pairs listed on both."""
+    rng = random.Random(seed)
+    tsxCount = int(rows * tsxShare)
+    nasdaqRows = []
+    for i in range(rows - tsxCount):
+        nasdaqRows.append({
+            "symbol": f"{randomSymbol(rng)}{i}",
+            "name": f"Company {i} {rng.choice(suffixes)}",
+            "marketCap": str(rng.randint(1, 10 ** 12)),
+            "country": rng.choice(["United States", "United States", "Canada", "Israel", ""]),
+        })
+    # A few blank rows the parser has to skip
+    nasdaqRows += [{"symbol": "", "name": "Blank"}, {"symbol": "X", "name": None}]
+
+    overlap = nasdaqRows[:int(rows * overlapShare)]
+    tsxSymbols = [r["symbol"] for r in overlap] + [f"T{randomSymbol(rng)}{i}" for i in range(tsxCount - len(overlap))]
+    tsxNames = [tickerFetcher.cleanName(r["name"]) for r in overlap] + [f"Maple {i} Corp" for i in range(tsxCount - len(overlap))]
+    sheet = pd.DataFrame({
+        "Root\nTicker": tsxSymbols,
+        "Name": tsxNames,
+        capHeader: [rng.randint(1, 10 ** 11) for _ in tsxSymbols],
+        "Empty": None,
+    })
+    return {"data": {"rows": nasdaqRows}}, sheet
+
+# ==== Original Row-by-Row Pipeline ====
+
+def legacyNasdaq(data):
+    cleanedRows = []
+    for row in data.get("data", {}).get("rows", []):
+        if row.get("symbol") and row.get("name"):
+            cleanedRow = {
+                "Symbol": row.get("symbol", ""), "Name": tickerFetcher.cleanName(row.get("name", "")),
+                "Market Cap": row.get("marketCap", ""), "Country": row.get("country", ""),
+            }
+            cleanedRows.append(cleanedRow)
+    return cleanedRows
+
+
+def legacyTsx(sheet):
+    df = sheet.dropna(axis=1, how="all")
+    df = df[df['Root\nTicker'].notna()]
+    capCol = [col for col in df.columns if col.startswith("Market Cap (C$)")]
+    capCol = capCol[0] if capCol else None
+    rows = []
+    for _, row in df.iterrows():
+        rows.append({
+            "Symbol": str(row['Root\nTicker']).strip(),
+            "Name": str(row['Name']).strip(),
+            "Market Cap": row.get(capCol, 0) if capCol else 0,
+            "Country": "Canada",
+        })
+    return rows
+
+
+def legacyDedup(nasdaqRows, tsxRows):
+    dedup = {}
+    for row in nasdaqRows + tsxRows:
+        dedup[(row["Symbol"].upper(), tickerFetcher.normalizeName(row["Name"]))] = dict(row)
+    return list(dedup.values())
+
+
+def legacySuffix(rows):
+    for row in rows:
+        if row["Country"].lower() == "canada":
+            row["Symbol"] = f"{row['Symbol']}.TO"
+    return pd.DataFrame(rows, columns=tickerFetcher.outFields)
+
+# ==== Runner ====
+
+def timed(results, stage, fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    results[stage] = time.perf_counter() - start
+    return value
+
+
+def runPipelines(data, sheet):
+    legacy, columnar = {}, {}
+    nasdaqRows = timed(legacy, "nasdaq parse", legacyNasdaq, data)
+    tsxRows = timed(legacy, "tsx parse", legacyTsx, sheet)
+    rows = timed(legacy, "dedup", legacyDedup, nasdaqRows, tsxRows)
+    legacyDf = timed(legacy, "suffix", legacySuffix, rows)
+
+    nasdaqDf = timed(columnar, "nasdaq parse", tickerFetcher.parseNasdaq, data)
+    tsxDf = timed(columnar, "tsx parse", tickerFetcher.parseTsx, sheet)
+    deduped = timed(columnar, "dedup", tickerFetcher.dedupListings, nasdaqDf, tsxDf)
+    columnarDf = timed(columnar, "suffix", tickerFetcher.addYahooSuffix, deduped)
+    return legacy, columnar, legacyDf, columnarDf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--xlsx", action="store_true", help="also time the in-memory TSX workbook read")
+    args = parser.parse_args()
+
+    data, sheet = syntheticListings(args.rows)
+    legacy, columnar, legacyDf, columnarDf = runPipelines(data, sheet)
+
+    pd.testing.assert_frame_equal(
+        legacyDf.astype(str).reset_index(drop=True), columnarDf.astype(str).reset_index(drop=True)
+    )
+    print(f"{len(columnarDf)} tickers from {args.rows} synthetic rows (outputs match)\n")
+    print(f"{'stage':<14}{'row loop':>12}{'columnar':>12}{'speedup':>10}")
+    for stage in legacy:
+        print(f"{stage:<14}{legacy[stage]:>11.3f}s{columnar[stage]:>11.3f}s{legacy[stage] / columnar[stage]:>9.1f}x")
+    print(f"{'total':<14}{sum(legacy.values()):>11.3f}s{sum(columnar.values()):>11.3f}s"
+          f"{sum(legacy.values()) / sum(columnar.values()):>9.1f}x")
+
+    if args.xlsx:
+        buffer = io.BytesIO()
+        # Mirror the real workbook: issuers sheet with a 9-row preamble
+        sheet.to_excel(buffer, sheet_name="TSX Issuers September 2026", startrow=9, index=False)
+        buffer.seek(0)
+        start = time.perf_counter()
+        tickerFetcher.readTsxSheet(buffer)
+        print(f"\nxlsx read      {time.perf_counter() - start:.3f}s ({len(sheet)} rows, in memory)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Per-upstream circuit breakers: stop calling a throttled or failing host, probe it, then resume."""
+
+import os
+import threading
+import time
+from collections import deque
+from instrumentation import Counter, registerCollector
+
+# ==== Configuration ====
+
+# Outcomes older than this (seconds) no longer count towards tripping
+windowSeconds = float(os.getenv("CIRCUIT_WINDOW", 60))
+# Calls needed in the window before the breaker may trip
+minCalls = int(os.getenv("CIRCUIT_MIN_CALLS", 10))
+# Trip when this share of recent calls failed...
+errorRateThreshold = float(os.getenv("CIRCUIT_ERROR_RATE", 0.5))
+# ...or this share took longer than the host's slow-call time (seconds)
+slowCallSeconds = {
+    "yahoo": float(os.getenv("YAHOO_SLOW_SECONDS", 10)),
+    "openrouter": float(os.getenv("OPENROUTER_SLOW_SECONDS", 45)),
+}
+slowRateThreshold = float(os.getenv("CIRCUIT_SLOW_RATE", 0.8))
+# First open period; doubled after each failed probe up to maxOpenSeconds
+openSeconds = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+maxOpenSeconds = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", 600))
+# Trial calls let through at once while half-open
+probeCalls = int(os.getenv("CIRCUIT_PROBE_CALLS", 1))
+
+# FetchTrace error recorded for calls the breaker refused to make
+shedMessage = "circuit open"
+
+circuitRejections = Counter(
+    "stockeval_circuit_rejections_total", "Upstream calls refused by an open circuit breaker.", ["host"]
+)
+
+# ==== Errors ====
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is refused because its upstream's breaker is open."""
+
+    def __init__(self, host, retryAfter):
+        super().__init__(f"{host} is temporarily unavailable; retry in {retryAfter:.0f}s")
+        self.host = host
+        self.retryAfter = retryAfter
+
+# ==== Breaker ====
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and their outcomes are tracked over a rolling
+    window.  Too many failures or slow calls trip it open, and every call is
+    refused at once instead of queueing for a doomed request.  After the
+    open period it goes half-open and lets `probeCalls` trial calls through:
+    a healthy probe closes it, a bad one re-opens it for twice as long.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.slowSeconds = slowCallSeconds.get(host, 10)
+        self.state = "closed"
+        self._calls = deque()  # (time, failed, slow)
+        self._openedAt = 0.0
+        self._openFor = openSeconds
+        self._probing = 0
+        self._lock = threading.Lock()
+
+    def _trip(self, reason):
+        self.state = "open"
+        self._openedAt = time.monotonic()
+        self._calls.clear()
+        self._probing = 0
+        print(f"Circuit {self.host} open for {self._openFor:.0f}s: {reason}")
+
+    def retryAfter(self):
+        """Seconds until the next probe is allowed (0 unless open)."""
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(self._openFor - (time.monotonic() - self._openedAt), 0.0)
+
+    def isOpen(self):
+        """True while calls are being refused outright (no state change)."""
+        return self.retryAfter() > 0
+
+    def allow(self):
+        """Whether a call may go ahead now.  A True while half-open reserves a probe."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._openedAt < self._openFor:
+                    circuitRejections.inc(host=self.host)
+                    return False
+                self.state = "halfOpen"
+                self._probing = 0
+            if self.state == "halfOpen":
+                if self._probing >= probeCalls:
+                    circuitRejections.inc(host=self.host)
+                    return False
+                self._probing += 1
+            return True
+
+    def record(self, ok, seconds):
+        """Report the outcome of a call that allow() let through."""
+        slow = seconds >= self.slowSeconds
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "halfOpen":
+                self._probing = max(self._probing - 1, 0)
+                if ok and not slow:
+                    self.state = "closed"
+                    self._openFor = openSeconds
+                    print(f"Circuit {self.host} closed: probe succeeded")
+                else:
+                    self._openFor = min(self._openFor * 2, maxOpenSeconds)
+                    self._trip("probe failed")
+                return
+            if self.state == "open":
+                # A call admitted before the trip finished; it changes nothing
+                return
+            self._calls.append((now, not ok, slow))
+            while self._calls and now - self._calls[0][0] > windowSeconds:
+                self._calls.popleft()
+            if len(self._calls) < minCalls:
+                return
+            failures = sum(failed for _, failed, _ in self._calls)
+            slowCalls = sum(isSlow for _, _, isSlow in self._calls)
+            if failures / len(self._calls) >= errorRateThreshold:
+                self._trip(f"{failures}/{len(self._calls)} recent calls failed")
+            elif slowCalls / len(self._calls) >= slowRateThreshold:
+                self._trip(f"{slowCalls}/{len(self._calls)} recent calls took over {self.slowSeconds:.0f}s")
+
+# ==== Registry ====
+
+_breakers = {}
+_breakersLock = threading.Lock()
+
+
+def breakerFor(host):
+    """The process-wide CircuitBreaker for an upstream host."""
+    with _breakersLock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def _prometheusLines():
+    states = ["closed", "halfOpen", "open"]
+    lines = [
+        "# HELP stockeval_circuit_state Circuit breaker state per upstream (1 for the current state).",
+        "# TYPE stockeval_circuit_state gauge",
+    ]
+    with _breakersLock:
+        breakers = sorted(_breakers.items())
+    for host, breaker in breakers:
+        for state in states:
+            lines.append(f'stockeval_circuit_state{{host="{host}",state="{state}"}} {int(breaker.state == state)}')
+    return lines
+
+registerCollector(_prometheusLines)
@@ -0,0 +1,102 @@
+"""Response compression (brotli or gzip) and conditional-GET helpers for Flask."""
+
+import gzip
+import os
+import zlib
+from flask import request
+
+try:
+    import brotli  # Optional; gzip is used when it is missing
+except ImportError:
+    brotli = None
+
+# ==== Configuration ====
+
+# Bodies smaller than this are sent as-is; compressing them saves nothing
+minimumSize = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+gzipLevel = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+brotliQuality = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+
+compressibleTypes = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+
+# ==== Helpers ====
+
+def chooseEncoding(acceptEncoding):
+    """Best encoding the client accepts: "br", "gzip" or None."""
+    if brotli is not None and acceptEncoding["br"]:
+        return "br"
+    if acceptEncoding["gzip"]:
+        return "gzip"
+    return None
+
+
+def compressBody(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=brotliQuality)
+    return gzip.compress(data, compresslevel=gzipLevel, mtime=0)
+
+
+def compressStream(chunks, encoding):
+    """
+    Compress a streamed body chunk by chunk, flushing after each one so the
+    client still sees every line as soon as it is produced.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=brotliQuality)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(gzipLevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+# ==== Main Entry ====
+
+def conditionalJson(response):
+    """
+    Tag a JSON response with an ETag of its body and answer 304 Not Modified
+    when the client already holds that version (If-None-Match).
+    """
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def compressResponse(response):
+    """
+    after_request hook: compress text and JSON responses the client accepts
+    compressed.  Static files and event streams are left alone.
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in compressibleTypes
+    ):
+        return response
+    encoding = chooseEncoding(request.accept_encodings)
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compressStream(response.iter_encoded(), encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < minimumSize:
+            return response
+        response.set_data(compressBody(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed body differs byte-for-byte, so only a weak validator still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,156 @@
+"""Small SQLite-backed key/value cache with LRU, size-bounded eviction."""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# ==== Configuration ====
+
+# Directory holding all local cache databases
+cacheDir = os.getenv("CACHE_DIR", "cache")
+# Seconds a write waits for another process's transaction before giving up
+busyTimeout = float(os.getenv("SQLITE_BUSY_TIMEOUT", 30))
+# Reads only refresh an entry's LRU time once it is this many seconds old,
+# and the refreshes are written in batches rather than one commit per hit
+touchResolution = 60.0
+touchBatch = 100
+
+
+def cachePath(fileName):
+    """Return the path of a cache file inside the cache directory, creating it if needed."""
+    os.makedirs(cacheDir, exist_ok=True)
+    return os.path.join(cacheDir, fileName)
+
+
+def openDatabase(path):
+    """
+    Open a SQLite file shared by every worker process.
+    WAL lets readers carry on while one process writes, and the busy timeout
+    makes concurrent writers queue instead of failing with "database is locked".
+    Open it after forking: a connection must not cross into a child process.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=busyTimeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Safe with WAL (only the last commits can be lost on power failure) and much faster
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+# ==== Cache ====
+
+class DiskCache:
+    """
+    Pickled values stored in a SQLite file, keyed by string.
+    Each entry remembers when it was stored (for TTL checks by the caller) and
+    when it was last read; once the stored bytes exceed `maxBytes` the least
+    recently read entries are evicted.  Cache hits don't write: read times
+    are queued and flushed in batches, and the total size is kept as a
+    running sum next to the entries instead of being re-added on every set.
+    """
+
+    def __init__(self, path, maxBytes=200 * 1024 * 1024):
+        self.path = path
+        self.maxBytes = maxBytes
+        self._lock = threading.Lock()
+        self._touches = {}  # key -> read time not yet written
+        self._flushedAt = time.monotonic()
+        self._conn = openDatabase(path)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                storedAt REAL NOT NULL,
+                accessedAt REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idxAccessed ON entries (accessedAt);
+            CREATE TABLE IF NOT EXISTS totals (
+                name TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO totals (name, bytes)
+                SELECT 'entries', COALESCE(SUM(size), 0) FROM entries;"""
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """Return (value, storedAt) for a key, or None if it isn't cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, storedAt, accessedAt FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[2] > touchResolution:
+                self._touches[key] = now
+            if len(self._touches) >= touchBatch or (
+                self._touches and time.monotonic() - self._flushedAt > touchResolution
+            ):
+                self._flushTouches()
+                self._conn.commit()
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            # Unreadable entry (e.g. written by an incompatible version)
+            self.delete(key)
+            return None
+
+    def set(self, key, value):
+        """Store a value under a key and evict old entries if over budget."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            # The size change is worked out inside the same write transaction as the insert
+            self._conn.execute(
+                "UPDATE totals SET bytes = bytes + ? - COALESCE((SELECT size FROM entries WHERE key = ?), 0) "
+                "WHERE name = 'entries'",
+                (len(payload), key),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, payload, size, storedAt, accessedAt) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._touches.pop(key, None)
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        """Remove a key from the cache."""
+        with self._lock:
+            self._remove(key)
+            self._conn.commit()
+
+    def _remove(self, key):
+        self._conn.execute(
+            "UPDATE totals SET bytes = bytes - COALESCE((SELECT size FROM entries WHERE key = ?), 0) "
+            "WHERE name = 'entries'",
+            (key,),
+        )
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._touches.pop(key, None)
+
+    def _flushTouches(self):
+        """Write queued read times (the caller commits)."""
+        self._conn.executemany(
+            "UPDATE entries SET accessedAt = ? WHERE key = ? AND accessedAt < ?",
+            [(at, key, at) for key, at in self._touches.items()],
+        )
+        self._touches.clear()
+        self._flushedAt = time.monotonic()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in maxBytes."""
+        total = self._conn.execute("SELECT bytes FROM totals WHERE name = 'entries'").fetchone()[0]
+        if total <= self.maxBytes:
+            return
+        # Recent reads must count before choosing what to drop
+        self._flushTouches()
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessedAt").fetchall()
+        for key, size in rows:
+            if total <= self.maxBytes:
+                break
+            self._remove(key)
+            total -= size
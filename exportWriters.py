@@ -0,0 +1,171 @@
+"""Streaming CSV / XLSX / Parquet writers for screen and watchlist exports."""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+# ==== Configuration ====
+
+# Rows per CSV write / Parquet row group
+chunkRows = int(os.getenv("EXPORT_CHUNK_ROWS", 1000))
+# Bytes per chunk when streaming a finished file
+fileChunkBytes = 64 * 1024
+
+# format -> (mimetype, file extension)
+exportFormats = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# "Scoring Weight" sheet labels, as read back by importFromExcel in script.js
+weightLabels = [
+    ("ROCE", "roce"),
+    ("Interest Coverage", "interestCov"),
+    ("Gross Margin", "grossMargin"),
+    ("Net Margin", "netMargin"),
+    ("Cash Conversion Ratio", "ccr"),
+    ("Gross Profit / Assets", "gpAssets"),
+    ("P/E Ratio", "peRatio"),
+    ("Dividend Yield", "dividendYield"),
+]
+
+# ==== Helpers ====
+
+def chunked(rows, size=chunkRows):
+    """Group an iterable of rows into lists of at most `size`."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def streamFile(file):
+    """Yield a file's contents from the start in fixed-size chunks, then close it."""
+    with file:
+        file.seek(0)
+        while True:
+            data = file.read(fileChunkBytes)
+            if not data:
+                return
+            yield data
+
+
+class ChunkSink:
+    """Write-only file object that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+# ==== Writers ====
+
+def writeCsv(columns, rows):
+    """CSV with a header row, yielded every chunkRows rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns, extrasaction="ignore")
+    writer.writeheader()
+    for chunk in chunked(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def writeXlsx(columns, rows, weights, sheetName, analysis=None):
+    """
+    XLSX built with openpyxl's write-only mode: rows go straight to a temp
+    file per sheet instead of staying in memory.  Sheets: `sheetName`, then
+    "Qualitative Analysis" (if given as {symbol: text}) and "Scoring Weight".
+    The zip is assembled on save, so the download starts once all rows are in.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheetName)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([row.get(column) for column in columns])
+
+    if analysis:
+        aiSheet = workbook.create_sheet("Qualitative Analysis")
+        aiSheet.append(["Ticker", "Qualitative Analysis"])
+        for symbol, text in analysis.items():
+            lines = str(text).split("\n")
+            aiSheet.append([symbol, lines[0]])
+            for line in lines[1:]:
+                aiSheet.append(["", line])
+            aiSheet.append(["", ""])
+
+    weightSheet = workbook.create_sheet("Scoring Weight")
+    weightSheet.append(["Metric", "Weight"])
+    for label, key in weightLabels:
+        weightSheet.append([label, weights.get(key, 0)])
+
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    yield from streamFile(file)
+
+
+def writeParquet(columns, rows, weights, textColumns):
+    """
+    Parquet with one row group per chunkRows rows, each streamed out as soon
+    as it is written.  Numeric columns are float64; the weights go in the
+    file's key/value metadata.
+    """
+    schema = pa.schema(
+        [(column, pa.string() if column in textColumns else pa.float64()) for column in columns],
+        metadata={"scoringWeights": json.dumps(weights)},
+    )
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in chunked(rows):
+        table = pa.Table.from_pylist([{column: row.get(column) for column in columns} for row in chunk], schema=schema)
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+# ==== Main Entry ====
+
+def exportStream(fmt, columns, rows, textColumns, weights, sheetName="Export", analysis=None):
+    """
+    Body generator for exporting `rows` (dicts, consumed lazily) as `fmt`.
+    `textColumns` are strings, every other column numeric.
+    Unknown formats raise ValueError.
+    """
+    if fmt not in exportFormats:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "csv":
+        return writeCsv(columns, rows)
+    if fmt == "xlsx":
+        return writeXlsx(columns, rows, weights, sheetName, analysis)
+    return writeParquet(columns, rows, weights, textColumns)
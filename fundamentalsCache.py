@@ -0,0 +1,150 @@
+"""On-disk cache of yfinance statements with stale-while-revalidate refreshes."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from diskCache import DiskCache, cachePath
+from tickerSnapshot import statementFields, fetchFields, buildSnapshot
+from circuitBreaker import breakerFor, shedMessage, CircuitOpenError
+from instrumentation import cacheRequests
+
+# ==== Configuration ====
+
+# `info` carries the live price, so it expires after minutes
+pricesTtl = float(os.getenv("PRICE_CACHE_TTL", 5 * 60))
+# Annual/quarterly statements change a few times a year
+statementsTtl = float(os.getenv("STATEMENT_CACHE_TTL", 3 * 24 * 3600))
+# How long past its TTL an entry may still be served while a refresh runs
+staleWindow = float(os.getenv("CACHE_STALE_WINDOW", 7 * 24 * 3600))
+# Upper bound on the cache file size before LRU eviction kicks in
+maxCacheBytes = int(os.getenv("FUNDAMENTALS_CACHE_BYTES", 500 * 1024 * 1024))
+
+_cache = None
+_cacheLock = threading.Lock()
+_refreshPool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+# Fields with a background refresh already queued, as (symbol, field)
+_refreshing = set()
+_refreshingLock = threading.Lock()
+
+# ==== Helpers ====
+
+def getCache():
+    """Open the shared fundamentals cache on first use."""
+    global _cache
+    with _cacheLock:
+        if _cache is None:
+            _cache = DiskCache(cachePath("fundamentals.sqlite"), maxBytes=maxCacheBytes)
+        return _cache
+
+
+def ttlFor(field):
+    """Seconds before a cached field is considered stale."""
+    return pricesTtl if field == "info" else statementsTtl
+
+
+def cacheKey(symbol, field):
+    return f"{symbol.upper()}:{field}"
+
+
+def storeFields(symbol, values):
+    """Write freshly fetched field values to the cache."""
+    cache = getCache()
+    for field, value in values.items():
+        cache.set(cacheKey(symbol, field), value)
+
+
+def _refresh(symbol, fields):
+    """Background job: re-fetch stale fields and store them."""
+    try:
+        values, _ = fetchFields(symbol, fields)
+        storeFields(symbol, values)
+    except Exception as e:
+        print(f"Background refresh failed for {symbol}: {e}")
+    finally:
+        with _refreshingLock:
+            for field in fields:
+                _refreshing.discard((symbol, field))
+
+
+def scheduleRefresh(symbol, fields):
+    """Queue a background refresh unless one is already running for these fields."""
+    with _refreshingLock:
+        pending = [f for f in fields if (symbol, f) not in _refreshing]
+        _refreshing.update((symbol, f) for f in pending)
+    if pending:
+        _refreshPool.submit(_refresh, symbol, pending)
+
+# ==== Main Entry ====
+
+def cachedInfo(symbol):
+    """The cached `info` dict for a symbol whatever its age, or None. Never fetches."""
+    entry = getCache().get(cacheKey(symbol, "info"))
+    return None if entry is None else entry[0]
+
+
+def loadSnapshot(symbol, fields=statementFields):
+    """
+    Return a TickerSnapshot for a symbol, served from the cache where possible.
+    Fresh fields are used as-is; fields within the stale window are served
+    immediately and refreshed in the background; anything older or missing is
+    fetched synchronously.  Only `fields` are loaded (it must include "info");
+    the others are left empty in the snapshot.
+
+    When a fetch fails or Yahoo's circuit breaker sheds it, the last known
+    good copy is served however old, and listed in the snapshot's
+    staleFields.  A field with no copy at all raises rather than being
+    scored as zeros: CircuitOpenError if the breaker shed it, RuntimeError
+    if the fetch failed.
+    """
+    cache = getCache()
+    now = time.time()
+    values = {}
+    cachedFields = []
+    stale = []
+    missing = []
+    # Entries too old to serve normally, kept as a fallback if the fetch fails
+    expired = {}
+    for field in fields:
+        entry = cache.get(cacheKey(symbol, field))
+        if entry is None:
+            missing.append(field)
+            continue
+        value, storedAt = entry
+        age = now - storedAt
+        if age > ttlFor(field) + staleWindow:
+            missing.append(field)
+            expired[field] = entry
+            continue
+        values[field] = value
+        cachedFields.append(field)
+        if age > ttlFor(field):
+            stale.append(field)
+        else:
+            cacheRequests.inc(cache="fundamentals", result="hit")
+
+    cacheRequests.inc(len(stale), cache="fundamentals", result="stale")
+    cacheRequests.inc(len(missing), cache="fundamentals", result="miss")
+
+    trace = []
+    fallback = {}
+    if missing:
+        fetched, trace = fetchFields(symbol, missing)
+        storeFields(symbol, fetched)
+        values.update(fetched)
+        fallback = {field: entry for field, entry in expired.items() if field not in fetched}
+        # A failed field with no copy at all would be scored as zeros, so fail instead
+        lost = [t for t in trace if t.error and t.field not in fetched and t.field not in fallback]
+        if any(t.error == shedMessage for t in lost):
+            breaker = breakerFor("yahoo")
+            raise CircuitOpenError(breaker.host, breaker.retryAfter())
+        if lost:
+            raise RuntimeError(f"Could not fetch {lost[0].field} for {symbol}: {lost[0].error}")
+        for field, (value, _) in fallback.items():
+            values[field] = value
+        if fallback:
+            cacheRequests.inc(len(fallback), cache="fundamentals", result="fallback")
+    if stale:
+        scheduleRefresh(symbol, stale)
+    staleSince = min((storedAt for _, storedAt in fallback.values()), default=None)
+    return buildSnapshot(symbol, values, trace, cachedFields, list(fallback), staleSince)
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for running StockEval with several worker processes.
+
+    gunicorn app:app              # picks this file up automatically
+
+The app is imported once in the master (preload_app) so every worker starts
+from the master's ticker universe and search index.  Only the numeric
+universe columns are memory-mapped and stay shared; the strings and the
+index are Python objects, copied as each worker touches them.  Caches,
+history, jobs and the upstream rate limits live in SQLite under CACHE_DIR,
+shared by all workers.  Each worker runs gthread threads: requests mostly
+wait on Yahoo/OpenRouter or stream SSE/NDJSON, so threads keep a worker busy
+without extra memory.
+"""
+
+import multiprocessing
+import os
+
+# Read by the app at import, which happens after this file is loaded
+os.environ.setdefault("SHARED_RATE_LIMITS", "1")
+os.environ.setdefault("DEFER_BACKGROUND_TASKS", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# WEB_CONCURRENCY is what Heroku sizes per dyno type
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+preload_app = True
+# AI analysis can take a while; with gthread this is a heartbeat, not a per-request limit
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+keepalive = 5
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    """Threads don't survive fork, so each worker starts its own schedules."""
+    from app import startBackgroundTasks
+    startBackgroundTasks()
@@ -0,0 +1,150 @@
+"""Shared HTTP client: pooled keep-alive connections, timeouts, retries and per-host limits."""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from upstreamScheduler import admit
+from instrumentation import upstreamCalls
+
+# ==== Configuration ====
+
+connectTimeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+readTimeout = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+maxRetries = int(os.getenv("HTTP_RETRIES", 3))
+backoffBase = float(os.getenv("HTTP_BACKOFF", 0.5))  # Seconds, doubled per attempt
+backoffCap = 30.0
+# Concurrent requests allowed to any one host from this process
+hostConcurrency = int(os.getenv("HTTP_HOST_CONCURRENCY", 8))
+
+# Base class of every network error raised by request()
+RequestError = requests.RequestException
+# ...and by requestAsync() (timeouts raise asyncio.TimeoutError)
+AsyncRequestError = aiohttp.ClientError
+
+# Status codes worth retrying: throttling and transient server errors
+retryStatuses = {429, 500, 502, 503, 504}
+
+_session = None
+_sessionLock = threading.Lock()
+_hostSemaphores = {}
+
+# ==== Helpers ====
+
+def getSession():
+    """Return the process-wide requests.Session (created on first use)."""
+    global _session
+    with _sessionLock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=hostConcurrency * 2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def hostSemaphore(host):
+    """Semaphore bounding concurrent requests to one host."""
+    with _sessionLock:
+        if host not in _hostSemaphores:
+            _hostSemaphores[host] = threading.BoundedSemaphore(hostConcurrency)
+        return _hostSemaphores[host]
+
+
+def backoffDelay(attempt, response=None):
+    """Jittered exponential backoff, honoring a numeric Retry-After header."""
+    if response is not None:
+        retryAfter = response.headers.get("Retry-After", "")
+        if retryAfter.isdigit():
+            return min(float(retryAfter), backoffCap)
+    return min(backoffBase * (2 ** attempt), backoffCap) * random.uniform(0.5, 1.5)
+
+# ==== Main Entry ====
+
+def request(method, url, timeout=None, retries=maxRetries, rateHost=None, **kwargs):
+    """
+    Send a request over the shared session.
+    Retries connection errors and 429/5xx responses with jittered backoff;
+    after the last attempt the final response (or exception) is returned to
+    the caller unchanged.  `timeout` defaults to (connect, read) from config.
+    With `rateHost` set, every retry first waits for its own turn under that
+    host's rate budget; the caller admits the first attempt itself, so it can
+    time the call without the queueing.
+    """
+    timeout = timeout or (connectTimeout, readTimeout)
+    host = urlparse(url).hostname or ""
+    attempt = 0
+    while True:
+        response = None
+        try:
+            with hostSemaphore(host):
+                response = getSession().request(method, url, timeout=timeout, **kwargs)
+            upstreamCalls.inc(host=host, outcome=response.status_code)
+            if response.status_code not in retryStatuses or attempt >= retries:
+                return response
+        except (requests.ConnectionError, requests.Timeout):
+            upstreamCalls.inc(host=host, outcome="error")
+            if attempt >= retries:
+                raise
+        delay = backoffDelay(attempt, response)
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+        if rateHost:
+            admit(rateHost)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+# ==== Asyncio Variant ====
+
+def asyncSession():
+    """
+    New aiohttp session with the sync client's timeouts and per-host limit.
+    aiohttp sessions belong to one event loop, so open one per fan-out
+    (`async with asyncSession() as session:`) rather than sharing it.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=hostConcurrency),
+        timeout=aiohttp.ClientTimeout(sock_connect=connectTimeout, sock_read=readTimeout),
+    )
+
+
+async def requestAsync(session, method, url, timeout=None, retries=maxRetries, **kwargs):
+    """
+    request() for asyncio: same retries, backoff and Retry-After handling.
+    The body is read before returning, so the response stays usable after
+    the session closes.  `timeout` is (connect, read) like request().
+    """
+    if timeout is not None:
+        timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    else:
+        timeout = session.timeout
+    host = urlparse(url).hostname or ""
+    attempt = 0
+    while True:
+        response = None
+        try:
+            response = await session.request(method, url, timeout=timeout, **kwargs)
+            await response.read()
+            upstreamCalls.inc(host=host, outcome=response.status)
+            if response.status not in retryStatuses or attempt >= retries:
+                return response
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            upstreamCalls.inc(host=host, outcome="error")
+            if attempt >= retries:
+                raise
+        await asyncio.sleep(backoffDelay(attempt, response))
+        attempt += 1
@@ -0,0 +1,190 @@
+"""Lightweight stage timing, counters and Prometheus text export (no extra dependencies)."""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# ==== Configuration ====
+
+# Log a one-line breakdown of every request's stages
+traceRequests = os.getenv("TRACE_REQUESTS", "").lower() in ("1", "true", "yes")
+
+# Histogram bucket upper bounds in seconds (covers in-memory calcs to slow upstream calls)
+defaultBuckets = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+_collectors = []
+# Stages recorded during the current request: list of (stage, seconds), or None
+_currentTrace = contextvars.ContextVar("currentTrace", default=None)
+
+# ==== Metric Types ====
+
+def _labelText(labelNames, labelValues, extra=()):
+    pairs = list(zip(labelNames, labelValues)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, help, labelNames=()):
+        self.name, self.help, self.labelNames = name, help, tuple(labelNames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelNames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labelText(self.labelNames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name, help, labelNames=(), buckets=defaultBuckets):
+        self.name, self.help, self.labelNames = name, help, tuple(labelNames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelNames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            state[index] += 1
+            state[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_labelText(self.labelNames, key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labelText(self.labelNames, key)} {state[-1]}")
+                lines.append(f"{self.name}_count{_labelText(self.labelNames, key)} {cumulative}")
+        return lines
+
+# ==== Application Metrics ====
+
+stageSeconds = Histogram(
+    "stockeval_stage_seconds", "Time spent in each evaluation stage.", ["stage"]
+)
+requestSeconds = Histogram(
+    "stockeval_request_seconds", "HTTP request latency by endpoint.", ["endpoint", "status"]
+)
+upstreamCalls = Counter(
+    "stockeval_upstream_calls_total", "Calls made to upstream services.", ["host", "outcome"]
+)
+metricFallbacks = Counter(
+    "stockeval_metric_fallbacks_total",
+    "Metric calculations that fell back to 0 (reason: error = exception, zero = missing data).",
+    ["metric", "reason"],
+)
+cacheRequests = Counter(
+    "stockeval_cache_requests_total", "Cache lookups by cache and result (hit, stale, miss, fallback).", ["cache", "result"]
+)
+
+# ==== Recording Helpers ====
+
+def recordStage(stage, seconds):
+    """Record a finished stage in the histogram and the current request's trace."""
+    stageSeconds.observe(seconds, stage=stage)
+    trace = _currentTrace.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    """Time the enclosed block as `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recordStage(stage, time.perf_counter() - start)
+
+
+def timedStage(stage):
+    """Decorator form of timed()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def metricStage(metric):
+    """
+    Decorator for calc* functions: times them as "calc.<metric>" and counts
+    a 0 result as a fallback.  Exceptions the function swallows are counted
+    separately through metricError().
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(f"calc.{metric}"):
+                value = fn(*args, **kwargs)
+            if not value:
+                metricFallbacks.inc(metric=metric, reason="zero")
+            return value
+        return wrapper
+    return decorate
+
+
+def metricError(metric):
+    """Count a metric calculation that raised and was replaced by 0."""
+    metricFallbacks.inc(metric=metric, reason="error")
+
+
+def registerCollector(fn):
+    """Add a callback returning extra Prometheus lines at scrape time (e.g. from existing stats)."""
+    _collectors.append(fn)
+
+# ==== Request Tracing ====
+
+def startTrace():
+    """Begin collecting stages for the current request; returns a token for finishTrace."""
+    return _currentTrace.set([])
+
+
+def finishTrace(token, label, seconds):
+    """Stop collecting and, if TRACE_REQUESTS is on, log the request's stage breakdown."""
+    trace = _currentTrace.get()
+    _currentTrace.reset(token)
+    if traceRequests and trace is not None:
+        stages = " ".join(f"{stage}={value * 1000:.1f}ms" for stage, value in trace)
+        print(f"trace {label} {seconds * 1000:.1f}ms {stages}")
+
+# ==== Export ====
+
+def renderMetrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    for collector in _collectors:
+        lines += collector()
+    return "\n".join(lines) + "\n"
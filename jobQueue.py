@@ -0,0 +1,194 @@
+"""Persistent background job queue for per-ticker work such as AI analysis."""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from diskCache import cachePath, openDatabase
+
+# ==== Configuration ====
+
+jobWorkers = int(os.getenv("JOB_WORKERS", 4))
+# Finished jobs older than this are pruned from the store
+jobRetention = float(os.getenv("JOB_RETENTION", 24 * 3600))
+# A running item claimed longer ago than this is treated as abandoned
+claimTimeout = float(os.getenv("JOB_CLAIM_TIMEOUT", 15 * 60))
+
+# ==== Helpers ====
+
+def pidAlive(pid):
+    """True if a process with this pid is still running on this machine."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# ==== Job Queue ====
+
+class JobQueue:
+    """
+    Runs `processFn(ticker)` for every ticker of a submitted job on a worker pool.
+    Jobs and per-ticker results live in SQLite so any worker process can report
+    progress, and unfinished items are picked up again after a restart.
+    """
+
+    def __init__(self, processFn, path=None, workers=jobWorkers):
+        self.processFn = processFn
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._lock = threading.Lock()
+        self.path = path
+        self._conn = None
+
+    def _connection(self):
+        """
+        Open the store on first use (call with _lock held).  Deferring this
+        past import keeps the connection out of gunicorn's pre-fork master.
+        """
+        if self._conn is not None:
+            return self._conn
+        conn = openDatabase(self.path or cachePath("jobs.sqlite"))
+        conn.executescript(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                createdAt REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS jobItems (
+                jobId TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                ticker TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                claimedBy INTEGER,
+                claimedAt REAL,
+                finishedAt REAL,
+                PRIMARY KEY (jobId, position)
+            );"""
+        )
+        # Stores created before claim times were recorded
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(jobItems)")]
+        if "claimedAt" not in columns:
+            conn.execute("ALTER TABLE jobItems ADD COLUMN claimedAt REAL")
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            conn = self._connection()
+            cur = conn.execute(sql, params)
+            conn.commit()
+            return cur
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def submit(self, tickers):
+        """Create a job for the tickers, queue every item, and return its id."""
+        self.prune()
+        jobId = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT INTO jobs (id, createdAt) VALUES (?, ?)", (jobId, time.time()))
+            conn.executemany(
+                "INSERT INTO jobItems (jobId, position, ticker, status) VALUES (?, ?, ?, 'pending')",
+                [(jobId, i, t) for i, t in enumerate(tickers)],
+            )
+            conn.commit()
+        for position in range(len(tickers)):
+            self._pool.submit(self._run, jobId, position)
+        return jobId
+
+    def _run(self, jobId, position):
+        """Claim one pending item, process it, and store the outcome."""
+        claimed = self._execute(
+            "UPDATE jobItems SET status = 'running', claimedBy = ?, claimedAt = ? "
+            "WHERE jobId = ? AND position = ? AND status = 'pending'",
+            (os.getpid(), time.time(), jobId, position),
+        ).rowcount
+        if not claimed:
+            return  # Another worker got it first
+        ticker = self._query(
+            "SELECT ticker FROM jobItems WHERE jobId = ? AND position = ?", (jobId, position)
+        )[0][0]
+        try:
+            result = self.processFn(ticker)
+            self._execute(
+                "UPDATE jobItems SET status = 'done', result = ?, finishedAt = ? "
+                "WHERE jobId = ? AND position = ?",
+                (result, time.time(), jobId, position),
+            )
+        except Exception as e:
+            print(f"Job {jobId} failed for {ticker}: {e}")
+            self._execute(
+                "UPDATE jobItems SET status = 'error', error = ?, finishedAt = ? "
+                "WHERE jobId = ? AND position = ?",
+                (str(e), time.time(), jobId, position),
+            )
+
+    def resume(self):
+        """
+        Re-queue items left unfinished by a previous process: pending ones and
+        running ones whose worker process is gone.
+        """
+        rows = self._query("SELECT jobId, position, status, claimedBy FROM jobItems WHERE status IN ('pending', 'running')")
+        for jobId, position, status, claimedBy in rows:
+            if status == "running":
+                # Our own pid can only be a leftover from a restarted container
+                if claimedBy and claimedBy != os.getpid() and pidAlive(claimedBy):
+                    continue
+                self._execute(
+                    "UPDATE jobItems SET status = 'pending', claimedBy = NULL, claimedAt = NULL "
+                    "WHERE jobId = ? AND position = ? AND status = 'running'",
+                    (jobId, position),
+                )
+            self._pool.submit(self._run, jobId, position)
+        if rows:
+            print(f"Resumed {len(rows)} unfinished job items")
+
+    def status(self, jobId):
+        """
+        Progress for a job: counts plus every finished item. None for unknown jobs.
+        "stalled" counts running items whose worker process is gone or whose
+        claim is older than claimTimeout; nothing will finish those.
+        """
+        if not self._query("SELECT 1 FROM jobs WHERE id = ?", (jobId,)):
+            return None
+        rows = self._query(
+            "SELECT position, ticker, status, result, error, claimedBy, claimedAt "
+            "FROM jobItems WHERE jobId = ? ORDER BY position",
+            (jobId,),
+        )
+        finished = [r for r in rows if r[2] in ("done", "error")]
+        now = time.time()
+        stalled = [
+            r for r in rows
+            if r[2] == "running" and (
+                (r[5] and not pidAlive(r[5])) or (r[6] and now - r[6] > claimTimeout)
+            )
+        ]
+        return {
+            "jobId": jobId,
+            "total": len(rows),
+            "finished": len(finished),
+            "complete": len(finished) == len(rows),
+            "stalled": len(stalled),
+            "results": [
+                {"position": position, "Symbol": ticker, "status": status, "Qualitative": result, "error": error}
+                for position, ticker, status, result, error, _, _ in finished
+            ],
+        }
+
+    def prune(self):
+        """Delete jobs older than the retention window."""
+        cutoff = time.time() - jobRetention
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM jobItems WHERE jobId IN (SELECT id FROM jobs WHERE createdAt < ?)", (cutoff,))
+            conn.execute("DELETE FROM jobs WHERE createdAt < ?", (cutoff,))
+            conn.commit()
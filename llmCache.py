@@ -0,0 +1,125 @@
+"""Content-addressed cache for LLM analyses with single-flight de-duplication."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from diskCache import DiskCache, cachePath
+from instrumentation import registerCollector
+
+# ==== Configuration ====
+
+# Seconds a cached analysis stays valid
+analysisTtl = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+maxCacheBytes = int(os.getenv("LLM_CACHE_BYTES", 50 * 1024 * 1024))
+
+_cache = None
+_lock = threading.Lock()
+# Cache key -> Future shared by every caller waiting on the same upstream call
+_inFlight = {}
+# Counters for monitoring; read them through cacheStats()
+_stats = {"hits": 0, "misses": 0, "shared": 0, "quotaErrors": 0, "errors": 0}
+
+# ==== Helpers ====
+
+def getCache():
+    """Open the analysis cache on first use."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = DiskCache(cachePath("llm.sqlite"), maxBytes=maxCacheBytes)
+        return _cache
+
+
+def analysisKey(model, template, ticker, summary):
+    """Hash of everything that determines the model's answer."""
+    raw = json.dumps([model, template, ticker.upper(), summary], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def recordEvent(name):
+    """Bump a counter for calls made outside getOrCompute (e.g. streamed answers)."""
+    _count(name)
+
+
+def cacheStats():
+    """Snapshot of the hit/miss/error counters."""
+    with _lock:
+        return dict(_stats)
+
+# ==== Main Entry ====
+
+def lookup(model, template, ticker, summary):
+    """Return an unexpired cached analysis (counting a hit), or None."""
+    entry = getCache().get(analysisKey(model, template, ticker, summary))
+    if entry is not None and time.time() - entry[1] <= analysisTtl:
+        _count("hits")
+        return entry[0]
+    return None
+
+
+def store(model, template, ticker, summary, value):
+    """Cache an analysis produced outside getOrCompute (e.g. a finished stream)."""
+    cache = getCache()
+    cache.set(analysisKey(model, template, ticker, summary), value)
+    # Also kept per ticker whatever the summary, as the last known good answer
+    cache.set(analysisKey(model, template, ticker, None), value)
+
+
+def lastKnown(model, template, ticker):
+    """The latest analysis stored for a ticker under any summary, ignoring the TTL: (value, storedAt) or None."""
+    return getCache().get(analysisKey(model, template, ticker, None))
+
+
+def getOrCompute(model, template, ticker, summary, computeFn):
+    """
+    Return the cached analysis for (model, template, ticker, summary), or call
+    computeFn() once to produce it.  Concurrent callers for the same key wait
+    on that single call.  Exceptions are not cached; ones with a truthy
+    `quota` attribute are counted as quota errors.
+    """
+    key = analysisKey(model, template, ticker, summary)
+    cached = lookup(model, template, ticker, summary)
+    if cached is not None:
+        return cached
+
+    with _lock:
+        future = _inFlight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inFlight[key] = future
+    if not leader:
+        _count("shared")
+        return future.result()
+
+    _count("misses")
+    try:
+        value = computeFn()
+        store(model, template, ticker, summary, value)
+        future.set_result(value)
+        return value
+    except Exception as e:
+        _count("quotaErrors" if getattr(e, "quota", False) else "errors")
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inFlight.pop(key, None)
+
+
+def _prometheusLines():
+    """Expose the counters on /metrics."""
+    name = "stockeval_llm_cache_events_total"
+    lines = [f"# HELP {name} AI analysis cache events (hits, misses, shared waits, errors).", f"# TYPE {name} counter"]
+    lines += [f'{name}{{event="{event}"}} {count}' for event, count in sorted(cacheStats().items())]
+    return lines
+
+registerCollector(_prometheusLines)
@@ -0,0 +1,141 @@
+"""Point-in-time store of per-period metrics, with score history and backtests."""
+
+import os
+import threading
+import time
+import pandas as pd
+from diskCache import cachePath, openDatabase
+from scoring import metricKeys, aliases, scoreFrame
+
+# ==== Configuration ====
+
+# Days after a fiscal period ends before its statements count as public.
+# Backtests only use a period once this lag has passed, to avoid look-ahead.
+reportingLag = pd.Timedelta(days=int(os.getenv("HISTORY_REPORTING_LAG_DAYS", 90)))
+
+# Period types kept in the store
+annualPeriod = "annual"      # One row per fiscal year from the annual statements
+snapshotPeriod = "snapshot"  # One row per day a ticker was evaluated (adds P/E and yield)
+
+_conn = None
+_lock = threading.Lock()
+
+# ==== Helpers ====
+
+def getConnection():
+    """Open the history database on first use."""
+    global _conn
+    with _lock:
+        if _conn is None:
+            conn = openDatabase(cachePath("history.sqlite"))
+            metricColumns = ",\n".join(f"{key} REAL" for key in metricKeys)
+            conn.executescript(
+                f"""CREATE TABLE IF NOT EXISTS metricHistory (
+                    symbol TEXT NOT NULL,
+                    periodType TEXT NOT NULL,
+                    periodEnd TEXT NOT NULL,
+                    {metricColumns},
+                    recordedAt REAL NOT NULL,
+                    PRIMARY KEY (symbol, periodType, periodEnd)
+                );"""
+            )
+            conn.commit()
+            _conn = conn
+        return _conn
+
+
+def _value(value):
+    """SQLite-friendly float (missing -> NULL)."""
+    return None if pd.isna(value) else float(value)
+
+# ==== Writing ====
+
+def storePeriods(symbol, periods, periodType=annualPeriod):
+    """
+    Upsert one row per period for a symbol.
+    `periods` is a DataFrame indexed by period end date with metric columns;
+    metrics it lacks are stored as NULL.  Re-stated periods overwrite.
+    """
+    if periods is None or periods.empty:
+        return 0
+    recordedAt = time.time()
+    rows = [
+        (symbol.upper(), periodType, pd.Timestamp(periodEnd).strftime("%Y-%m-%d"))
+        + tuple(_value(row.get(key)) for key in metricKeys)
+        + (recordedAt,)
+        for periodEnd, row in periods.iterrows()
+    ]
+    columns = ", ".join(["symbol", "periodType", "periodEnd"] + metricKeys + ["recordedAt"])
+    placeholders = ", ".join("?" * (len(metricKeys) + 4))
+    conn = getConnection()
+    with _lock:
+        conn.executemany(f"INSERT OR REPLACE INTO metricHistory ({columns}) VALUES ({placeholders})", rows)
+        conn.commit()
+    return len(rows)
+
+
+def storeObservation(symbol, metrics):
+    """Record today's metrics for a symbol (one row per day, last write wins)."""
+    metrics = {aliases.get(key, key): value for key, value in metrics.items()}
+    today = pd.Timestamp.now(tz="UTC").normalize().tz_localize(None)
+    return storePeriods(symbol, pd.DataFrame([metrics], index=[today]), periodType=snapshotPeriod)
+
+# ==== Queries ====
+
+def loadHistory(symbols=None, periodType=annualPeriod):
+    """
+    All stored rows of one period type (optionally only some symbols) as a
+    DataFrame with symbol, periodEnd (datetime) and the metric columns.
+    """
+    sql = f"SELECT symbol, periodEnd, {', '.join(metricKeys)} FROM metricHistory WHERE periodType = ?"
+    params = [periodType]
+    if symbols is not None:
+        symbols = [s.upper() for s in symbols]
+        sql += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+        params += symbols
+    conn = getConnection()
+    with _lock:
+        df = pd.read_sql_query(sql + " ORDER BY symbol, periodEnd", conn, params=params)
+    df["periodEnd"] = pd.to_datetime(df["periodEnd"])
+    return df
+
+
+def scoreHistory(symbol, weights=None, periodType=annualPeriod):
+    """
+    A symbol's metrics and score for every stored period, oldest first,
+    scored under `weights` (defaults when None).  Annual periods carry no
+    price, so P/E and dividend yield contribute nothing to their scores.
+    """
+    df = loadHistory([symbol], periodType)
+    df["score"] = scoreFrame(df, weights)
+    return df.drop(columns="symbol").set_index("periodEnd")
+
+
+def backtest(dates, weights=None, periodType=annualPeriod, lag=reportingLag, symbols=None):
+    """
+    Score the universe under `weights` as it would have looked on each date.
+    For every (date, symbol) the latest period that was public by then
+    (period end + lag) is used.  Returns a DataFrame of scores, one row per
+    date and one column per symbol (NaN where nothing was public yet).
+    Runs entirely on local data.
+    """
+    history = loadHistory(symbols, periodType)
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).sort_values()
+    if history.empty or dates.empty:
+        return pd.DataFrame(index=dates, dtype=float)
+    # Scores don't depend on the date, so score every stored period once
+    history["score"] = scoreFrame(history, weights)
+    history["availableAt"] = history["periodEnd"] + (lag if periodType == annualPeriod else pd.Timedelta(0))
+    history = history.sort_values("availableAt")
+
+    grid = pd.MultiIndex.from_product(
+        [dates, history["symbol"].unique()], names=["date", "symbol"]
+    ).to_frame(index=False)
+    merged = pd.merge_asof(
+        grid.sort_values("date"),
+        history[["symbol", "availableAt", "score"]],
+        left_on="date",
+        right_on="availableAt",
+        by="symbol",
+    )
+    return merged.pivot(index="date", columns="symbol", values="score")
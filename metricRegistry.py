@@ -0,0 +1,59 @@
+"""Registry of scored metrics and the yfinance statements each one reads."""
+
+from dataclasses import dataclass
+from tickerSnapshot import statementFields
+
+# ==== Configuration ====
+
+# Fields every evaluation needs whatever the metrics (name, price, country)
+baseFields = ("info",)
+
+# metric key -> Metric, in registration order
+registry = {}
+
+# ==== Registry ====
+
+@dataclass(frozen=True)
+class Metric:
+    """A scored metric: its key, calc function (snapshot -> value) and the statements it reads."""
+    key: str
+    calc: callable
+    fields: tuple
+
+
+def registerMetric(key, *fields):
+    """
+    Decorator adding a calc function to the registry under `key`, declaring
+    the snapshot fields (statementFields names) it reads.  New metrics only
+    need this; the fetch path picks their statements up automatically.
+    """
+    unknown = set(fields) - set(statementFields)
+    if unknown:
+        raise ValueError(f"Metric {key} reads unknown fields: {sorted(unknown)}")
+
+    def decorate(fn):
+        registry[key] = Metric(key, fn, tuple(fields))
+        return fn
+    return decorate
+
+
+def resolveMetrics(keys=None):
+    """
+    Validate a metric subset and return it in registry order.
+    None means every registered metric; unknown keys raise ValueError.
+    """
+    if keys is None:
+        return list(registry)
+    unknown = [key for key in keys if key not in registry]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+    wanted = set(keys)
+    return [key for key in registry if key in wanted]
+
+
+def fieldsFor(keys=None):
+    """The union of statements the metrics need (plus the base fields), in fetch order."""
+    needed = set(baseFields)
+    for key in resolveMetrics(keys):
+        needed.update(registry[key].fields)
+    return tuple(field for field in statementFields if field in needed)
@@ -0,0 +1,301 @@
+"""Per-country, per-sector and per-cap-band metric distributions for percentile (relative) scoring."""
+
+import bisect
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from diskCache import cachePath, openDatabase
+from periodic import startPeriodic
+from scoring import metricKeys, aliases, normalizeWeights
+
+# ==== Configuration ====
+
+# Peer groupings a ticker is ranked within ("all" is the whole evaluated universe)
+peerDimensions = ["sector", "country", "capBand"]
+# Smaller groups fall back to ranking against everyone
+minPeers = int(os.getenv("PEER_MIN_COUNT", 20))
+# How often each process picks up evaluations stored by other workers
+peerReloadInterval = float(os.getenv("PEER_RELOAD_INTERVAL", 300))
+
+# Quantiles kept per group and metric (every percent, 0..100)
+quantileGrid = np.linspace(0, 1, 101)
+
+# Market-cap bands, as (name, lower bound) from largest to smallest
+capBands = [
+    ("mega", 200e9),
+    ("large", 10e9),
+    ("mid", 2e9),
+    ("small", 300e6),
+    ("micro", 0),
+]
+
+# Metrics where a lower value ranks better
+lowerIsBetter = {"peRatio"}
+
+_conn = None
+_lock = threading.Lock()
+
+# ==== Helpers ====
+
+def getConnection():
+    """Open the peer metrics database on first use."""
+    global _conn
+    with _lock:
+        if _conn is None:
+            conn = openDatabase(cachePath("peers.sqlite"))
+            metricColumns = ",\n".join(f"{key} REAL" for key in metricKeys)
+            conn.executescript(
+                f"""CREATE TABLE IF NOT EXISTS peerMetrics (
+                    symbol TEXT PRIMARY KEY,
+                    sector TEXT,
+                    country TEXT,
+                    capBand TEXT,
+                    {metricColumns},
+                    updatedAt REAL NOT NULL
+                );"""
+            )
+            conn.commit()
+            _conn = conn
+        return _conn
+
+
+def capBand(marketCap):
+    """Name of the market-cap band a value falls in (None if unknown)."""
+    if marketCap is None or pd.isna(marketCap):
+        return None
+    for name, lower in capBands:
+        if marketCap >= lower:
+            return name
+    return capBands[-1][0]
+
+
+def _value(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+def belongsInPeers(metric, value):
+    """Whether a value goes in a metric's distribution (a zero P/E means no earnings, not cheap)."""
+    return value is not None and (metric != "peRatio" or value > 0)
+
+
+def sortedQuantiles(values):
+    """The quantileGrid quantiles of an already sorted list (as np.quantile, without a full pass)."""
+    positions = quantileGrid * (len(values) - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    low = np.array([values[i] for i in lower])
+    high = np.array([values[i] for i in upper])
+    return low + (high - low) * (positions - lower)
+
+
+def rankInSketch(quantiles, value):
+    """Share (0-100) of the distribution below `value`, with ties counted half."""
+    below = np.searchsorted(quantiles, value, side="left")
+    notAbove = np.searchsorted(quantiles, value, side="right")
+    # Below the minimum ranks 0, above the maximum 100
+    return round((below + notAbove) / 2 / len(quantiles) * 100, 1)
+
+# ==== Sketches ====
+
+class PeerSketches:
+    """
+    Latest metrics for every evaluated ticker (shared through SQLite) and,
+    per peer group, each metric's values kept in a sorted list.  An
+    evaluation moves its ticker's values within its own groups (a binary
+    search and an insert per list) and marks those groups' 101-point
+    quantile sketches dirty; a dirty sketch is re-read from the sorted
+    values on next use, without scanning the rest of the universe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}  # symbol -> {dimension: group, metric: value}
+        self._sorted = {}  # (dimension, group) -> {metric: sorted values}
+        self._sketches = {}  # (dimension, group) -> {metric: (count, quantiles)}
+        self._loadedUntil = None  # updatedAt of the newest stored row seen
+
+    @staticmethod
+    def _groupsOf(row):
+        groups = [(dimension, row[dimension]) for dimension in peerDimensions if row[dimension] is not None]
+        return [("all", None)] + groups
+
+    def _add(self, symbol, row):
+        self._rows[symbol] = row
+        for key in self._groupsOf(row):
+            lists = self._sorted.setdefault(key, {metric: [] for metric in metricKeys})
+            for metric in metricKeys:
+                if belongsInPeers(metric, row[metric]):
+                    bisect.insort(lists[metric], row[metric])
+            self._sketches.pop(key, None)
+
+    def _remove(self, symbol):
+        row = self._rows.pop(symbol, None)
+        if row is None:
+            return
+        for key in self._groupsOf(row):
+            lists = self._sorted[key]
+            for metric in metricKeys:
+                if belongsInPeers(metric, row[metric]):
+                    values = lists[metric]
+                    del values[bisect.bisect_left(values, row[metric])]
+            self._sketches.pop(key, None)
+
+    def _rebuild(self, rows):
+        """Replace everything with `rows` ({symbol: row}), sorting each list once."""
+        self._rows, self._sorted, self._sketches = {}, {}, {}
+        for symbol, row in rows.items():
+            self._rows[symbol] = row
+            for key in self._groupsOf(row):
+                lists = self._sorted.setdefault(key, {metric: [] for metric in metricKeys})
+                for metric in metricKeys:
+                    if belongsInPeers(metric, row[metric]):
+                        lists[metric].append(row[metric])
+        for lists in self._sorted.values():
+            for values in lists.values():
+                values.sort()
+
+    def reloadIfChanged(self):
+        """Apply the evaluations other processes stored since the last load."""
+        columns = peerDimensions + metricKeys
+        conn = getConnection()
+        query = f"SELECT symbol, {', '.join(columns)}, updatedAt FROM peerMetrics"
+        with _lock:
+            if self._loadedUntil is None:
+                stored = conn.execute(query).fetchall()
+            else:
+                # >= so rows written in the same instant as the last one seen aren't missed
+                stored = conn.execute(query + " WHERE updatedAt >= ?", (self._loadedUntil,)).fetchall()
+        if not stored:
+            return False
+        rows = {symbol: dict(zip(columns, values)) for symbol, *values, _ in stored}
+        newest = max(updatedAt for *_, updatedAt in stored)
+        with self._lock:
+            if self._loadedUntil is None:
+                self._rebuild(rows)
+            else:
+                for symbol, row in rows.items():
+                    if self._rows.get(symbol) != row:
+                        self._remove(symbol)
+                        self._add(symbol, row)
+            self._loadedUntil = max(newest, self._loadedUntil or 0)
+        return True
+
+    def observe(self, symbol, groups, metrics):
+        """
+        Store a ticker's latest metrics and peer groups (`groups` maps
+        sector/country/capBand to values), replacing its previous entry.
+        """
+        metrics = {aliases.get(key, key): value for key, value in metrics.items()}
+        row = {
+            dimension: groups.get(dimension) if pd.notna(groups.get(dimension)) else None
+            for dimension in peerDimensions
+        }
+        row.update({key: _value(metrics.get(key)) for key in metricKeys})
+        columns = ["symbol"] + list(row) + ["updatedAt"]
+        conn = getConnection()
+        with _lock:
+            conn.execute(
+                f"INSERT OR REPLACE INTO peerMetrics ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [symbol] + list(row.values()) + [time.time()],
+            )
+            conn.commit()
+        with self._lock:
+            self._remove(symbol)
+            self._add(symbol, row)
+
+    def sketch(self, dimension, group):
+        """{metric: (peer count, quantiles)} for one group, read off its sorted values."""
+        key = (dimension, group)
+        with self._lock:
+            if key not in self._sketches:
+                lists = self._sorted.get(key, {})
+                self._sketches[key] = {
+                    metric: (len(values), sortedQuantiles(values)) for metric, values in lists.items() if values
+                }
+            return self._sketches[key]
+
+    def groupsFor(self, symbol):
+        """A stored ticker's peer groups, e.g. {"sector": "Technology", ...} (empty if unknown)."""
+        with self._lock:
+            row = self._rows.get(symbol)
+            return {} if row is None else dict(self._groupsOf(row)[1:])
+
+    def metricsFor(self, symbol):
+        """A stored ticker's latest metrics, or None."""
+        with self._lock:
+            row = self._rows.get(symbol)
+            return None if row is None else {key: row[key] for key in metricKeys}
+
+    def percentile(self, metric, value, dimension="sector", group=None):
+        """
+        Share of peers (0-100) this value beats, where lower is better for P/E.
+        Groups with fewer than minPeers values fall back to the whole universe.
+        Returns (percentile, peer count, group used), or (None, 0, None) with no data.
+        """
+        value = _value(value)
+        if value is None:
+            return None, 0, None
+        candidates = [(dimension, group)] if dimension != "all" and group is not None else []
+        for dim, grp in candidates + [("all", None)]:
+            count, quantiles = self.sketch(dim, grp).get(metric, (0, None))
+            if count >= minPeers or (dim == "all" and count):
+                break
+        else:
+            return None, 0, None
+        if metric == "peRatio" and value <= 0:
+            return 0.0, count, grp if dim != "all" else "all"
+        rank = rankInSketch(quantiles, value)
+        if metric in lowerIsBetter:
+            rank = 100 - rank
+        return float(rank), count, grp if dim != "all" else "all"
+
+
+sketches = PeerSketches()
+
+# ==== Main Entry ====
+
+def observePeer(symbol, groups, metrics):
+    """Record one evaluation in the peer distributions. Failures are logged, never raised."""
+    try:
+        sketches.observe(symbol.upper(), groups, metrics)
+    except Exception as e:
+        print(f"Could not record peer metrics for {symbol}: {e}")
+
+
+def percentiles(metrics, groups, peers="sector"):
+    """
+    Percentile rank of every metric against the ticker's `peers` group
+    ("sector", "country", "capBand" or "all").
+    Returns {metric: {"percentile", "peers", "group"}}.
+    """
+    if peers not in peerDimensions + ["all"]:
+        raise ValueError(f"Unknown peer group: {peers}")
+    metrics = {aliases.get(key, key): value for key, value in metrics.items()}
+    group = groups.get(peers)
+    result = {}
+    for metric in metricKeys:
+        rank, count, used = sketches.percentile(metric, metrics.get(metric), peers, group)
+        result[metric] = {"percentile": rank, "peers": count, "group": used}
+    return result
+
+
+def relativeScore(metrics, groups, weights=None, peers="sector"):
+    """
+    0-100 score from percentile ranks instead of fixed thresholds: each
+    metric earns its weight times the share of peers it beats.
+    """
+    weights = normalizeWeights(weights)
+    ranks = percentiles(metrics, groups, peers)
+    total = sum(weights[key] * (ranks[key]["percentile"] or 0) / 100 for key in metricKeys)
+    return min(round(total), 100)
+
+
+def startPeerSchedule():
+    """Load the stored distributions now and pick up other workers' evaluations periodically."""
+    return startPeriodic(sketches.reloadIfChanged, peerReloadInterval, "peer-sketches")
@@ -0,0 +1,79 @@
+"""Tiny scheduler for recurring background tasks (daemon threads)."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Not available on Windows
+except ImportError:
+    fcntl = None
+
+# Open lock file while this process is the leader (kept open until exit)
+_leaderFile = None
+
+# ==== Main Entry ====
+
+def startPeriodic(fn, interval, name, initialDelay=0):
+    """
+    Call fn() every `interval` seconds on a daemon thread.
+    Errors are printed and the loop keeps going, so one bad run never stops
+    the schedule.  Returns the thread.
+    """
+    def loop():
+        time.sleep(initialDelay)
+        while True:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Periodic task {name} failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+@contextmanager
+def exclusive(lockPath):
+    """
+    Non-blocking lock on a file shared by every process, so a scheduled task
+    runs in only one of them at a time.  Yields False if someone else holds
+    it.  Without fcntl (Windows) it always yields True.
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(os.path.dirname(lockPath) or ".", exist_ok=True)
+    with open(lockPath, "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def holdLeadership(lockPath):
+    """
+    Try to become the single process, among several gunicorn workers, that
+    runs once-per-machine background work.  The lock stays held until this
+    process exits, at which point a replacement worker can take over.
+    Without fcntl (Windows, where only one process serves) it is always True.
+    """
+    global _leaderFile
+    if fcntl is None or _leaderFile is not None:
+        return True
+    os.makedirs(os.path.dirname(lockPath) or ".", exist_ok=True)
+    f = open(lockPath, "w")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return False
+    _leaderFile = f
+    return True
@@ -0,0 +1,215 @@
+"""Batched price quotes, and the price-driven metrics (P/E, dividend yield) re-derived from them."""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from diskCache import DiskCache, cachePath
+from fundamentalsCache import cachedInfo
+from tickerSnapshot import isOutage
+from upstreamScheduler import admit
+from circuitBreaker import breakerFor
+from scoring import scoreArrays
+from instrumentation import recordStage, upstreamCalls
+
+# ==== Configuration ====
+
+# Quotes younger than this are served from the cache instead of re-downloaded
+quoteTtl = float(os.getenv("QUOTE_CACHE_TTL", 60))
+# Symbols per yf.download call
+batchSize = int(os.getenv("QUOTE_BATCH_SIZE", 200))
+# Upper bound on the quote cache file size
+maxCacheBytes = int(os.getenv("QUOTE_CACHE_BYTES", 20 * 1024 * 1024))
+
+# Batched price download (swappable for offline runs)
+downloadFn = yf.download
+
+# Last quote per symbol, shared by every worker process
+_cache = None
+_cacheLock = threading.Lock()
+# Symbol -> Future shared by every caller waiting on the same download
+_inFlight = {}
+_inFlightLock = threading.Lock()
+
+# ==== Helpers ====
+
+def getCache():
+    """Open the shared quote cache on first use."""
+    global _cache
+    with _cacheLock:
+        if _cache is None:
+            _cache = DiskCache(cachePath("quotes.sqlite"), maxBytes=maxCacheBytes)
+        return _cache
+
+
+def quoteKey(symbol):
+    return f"{symbol.upper()}:price"
+
+# ==== Fetching ====
+
+def downloadPrices(symbols):
+    """
+    Latest close for each symbol from one batched download; symbols without
+    a price are left out.  Nothing is downloaded while Yahoo's breaker is open.
+    yf.download requests each symbol separately, so every symbol takes its
+    own turn under the rate budget and counts as one upstream call.
+    """
+    breaker = breakerFor("yahoo")
+    if not breaker.allow():
+        return {}
+    for _ in symbols:
+        admit("yahoo")
+        if breaker.isOpen():
+            # Tripped while this batch waited for its turns
+            return {}
+    start = time.perf_counter()
+    try:
+        frame = downloadFn(
+            symbols, period="5d", interval="1d", auto_adjust=False,
+            progress=False, threads=True,
+        )
+        outcome = "ok"
+        outage = False
+    except Exception as e:
+        print(f"Quote download failed for {len(symbols)} tickers: {e}")
+        frame = None
+        outcome = "error"
+        outage = isOutage(e)
+    seconds = time.perf_counter() - start
+    breaker.record(not outage, seconds)
+    recordStage("fetch.quotes", seconds)
+    upstreamCalls.inc(len(symbols), host="yahoo", outcome=outcome)
+    if frame is None or frame.empty:
+        return {}
+
+    close = frame["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(symbols[0])
+    # Carry the last traded close forward over holidays / missing rows
+    latest = close.ffill().iloc[-1]
+    return {
+        str(symbol): float(price)
+        for symbol, price in latest.items()
+        if pd.notna(price) and price > 0
+    }
+
+
+def _settle(futures, fetched):
+    """Hand each waiting caller its symbol's price (None if the download missed it)."""
+    with _inFlightLock:
+        for symbol in futures:
+            _inFlight.pop(symbol, None)
+    for symbol, future in futures.items():
+        future.set_result(fetched.get(symbol))
+
+
+def getPrices(symbols):
+    """
+    ({symbol: price}, stale symbols), downloading only the symbols without a
+    recent quote.  A symbol another caller is already downloading is waited
+    on instead of downloaded again.  Symbols the download missed fall back to
+    their last quote, however old, and are reported as stale.
+    """
+    cache = getCache()
+    now = time.time()
+    prices, missing, lastKnown = {}, [], {}
+    for symbol in symbols:
+        entry = cache.get(quoteKey(symbol))
+        if entry is not None and now - entry[1] < quoteTtl:
+            prices[symbol] = entry[0]
+        else:
+            missing.append(symbol)
+            if entry is not None:
+                lastKnown[symbol] = entry[0]
+
+    led, waiting = {}, {}
+    with _inFlightLock:
+        for symbol in missing:
+            future = _inFlight.get(symbol)
+            if future is None:
+                future = _inFlight[symbol] = Future()
+                led[symbol] = future
+            else:
+                waiting[symbol] = future
+    batches = list(led)
+    try:
+        while batches:
+            batch, batches = batches[:batchSize], batches[batchSize:]
+            fetched = downloadPrices(batch)
+            for symbol, price in fetched.items():
+                cache.set(quoteKey(symbol), price)
+            prices.update(fetched)
+            _settle({symbol: led.pop(symbol) for symbol in batch}, fetched)
+    finally:
+        # Don't leave waiters hanging if a download raised
+        _settle(led, {})
+    # Downloads we led come first, so two callers never wait on each other
+    for symbol, future in waiting.items():
+        price = future.result()
+        if price is not None:
+            prices[symbol] = price
+
+    stale = set()
+    for symbol in missing:
+        if symbol not in prices and symbol in lastKnown:
+            prices[symbol] = lastKnown[symbol]
+            stale.add(symbol)
+    return prices, stale
+
+# ==== Re-pricing ====
+
+def repriceMetrics(info, price):
+    """
+    P/E and dividend yield at a new price, scaled from the cached `info`.
+    Earnings and dividends don't move with the price, so both ratios simply
+    scale by price / cached price (same P/E fallbacks as calcPeRatio).
+    Returns (cached P/E, cached yield, new P/E, new yield).
+    """
+    basePrice = info.get("currentPrice") or 0
+    pe = info.get("trailingPE") or info.get("forwardPE") or 0
+    divYield = info.get("dividendYield") or 0
+    if not basePrice:
+        return pe, divYield, pe, divYield
+    return pe, divYield, pe * price / basePrice, divYield * basePrice / price
+
+# ==== Main Entry ====
+
+def refreshQuotes(symbols):
+    """
+    Fresh prices for many tickers plus their re-derived P/E and dividend
+    yield.  Only prices are downloaded; everything else comes from the
+    cached fundamentals, so tickers never evaluated get a price only.
+    `scoreDelta` is the change in default-weight score from the move, and
+    `stale` marks a last known price served because Yahoo is unavailable.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    prices, stalePrices = getPrices(symbols)
+
+    rows, before, after = [], [], []
+    for symbol in symbols:
+        price = prices.get(symbol)
+        if price is None:
+            rows.append({"symbol": symbol, "error": "No quote available"})
+            continue
+        row = {"symbol": symbol, "price": price, "stale": symbol in stalePrices}
+        info = cachedInfo(symbol)
+        if info is not None:
+            oldPe, oldYield, row["peRatio"], row["dividendYield"] = repriceMetrics(info, price)
+            before.append((oldPe, oldYield))
+            after.append((row["peRatio"], row["dividendYield"]))
+        rows.append(row)
+
+    # Only the two price-driven metrics move, so score just those in one pass
+    if before:
+        before, after = np.array(before), np.array(after)
+        deltas = (
+            scoreArrays({"peRatio": after[:, 0], "dividendYield": after[:, 1]})
+            - scoreArrays({"peRatio": before[:, 0], "dividendYield": before[:, 1]})
+        )
+        repriced = (row for row in rows if "peRatio" in row)
+        for row, delta in zip(repriced, deltas):
+            row["scoreDelta"] = int(delta)
+    return rows
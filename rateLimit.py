@@ -0,0 +1,149 @@
+"""Token-bucket rate limiting for upstream hosts (Yahoo Finance, OpenRouter)."""
+
+import os
+import threading
+import time
+from diskCache import cachePath, openDatabase
+
+# ==== Configuration ====
+
+# Requests per second and burst size allowed for each upstream
+hostLimits = {
+    "yahoo": (
+        float(os.getenv("YAHOO_RATE", 5)),
+        int(os.getenv("YAHOO_BURST", 10)),
+    ),
+    "openrouter": (
+        float(os.getenv("OPENROUTER_RATE", 0.5)),
+        int(os.getenv("OPENROUTER_BURST", 2)),
+    ),
+}
+
+# Share each host's budget between worker processes through SQLite, so
+# N gunicorn workers together stay within one quota (set by gunicorn.conf.py)
+sharedLimits = os.getenv("SHARED_RATE_LIMITS", "").lower() in ("1", "true", "yes")
+
+# ==== Token Bucket ====
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until `tokens` are available and take them.
+        Returns False if `timeout` seconds pass first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in a SQLite row, so every process on the
+    machine draws from the same budget.  Each acquire is one short write
+    transaction; waiting happens outside it.
+    """
+
+    def __init__(self, name, rate, capacity, path=None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.path = path or cachePath("ratelimit.sqlite")
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = openDatabase(self.path)
+            conn.isolation_level = None  # Transactions are managed explicitly below
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updatedAt REAL NOT NULL
+                )"""
+            )
+            self._conn = conn
+        return self._conn
+
+    def _take(self, tokens):
+        """Refill and try to take tokens atomically; returns seconds to wait (0 if taken)."""
+        with self._lock:
+            conn = self._connection()
+            # IMMEDIATE takes the write lock up front so two processes can't both read the same balance
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute("SELECT tokens, updatedAt FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                available = self.capacity if row is None else min(
+                    self.capacity, row[0] + max(now - row[1], 0) * self.rate
+                )
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updatedAt) VALUES (?, ?, ?)",
+                    (self.name, available, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return wait
+
+    def acquire(self, tokens=1, timeout=None):
+        """Same contract as TokenBucket.acquire, across processes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+# ==== Per-host Registry ====
+
+_limiters = {}
+_limitersLock = threading.Lock()
+
+
+def limiterFor(host):
+    """Return the shared TokenBucket for an upstream host."""
+    with _limitersLock:
+        if host not in _limiters:
+            rate, burst = hostLimits.get(host, (5, 10))
+            if sharedLimits:
+                _limiters[host] = SharedTokenBucket(host, rate, burst)
+            else:
+                _limiters[host] = TokenBucket(rate, burst)
+        return _limiters[host]
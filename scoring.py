@@ -0,0 +1,113 @@
+"""Vectorized composite scoring for many stocks at once."""
+
+import numpy as np
+import pandas as pd
+
+# ==== Configuration ====
+
+# Metrics in scoring order (matches the weight keys used by the front end)
+metricKeys = [
+    "roce",
+    "interestCov",
+    "grossMargin",
+    "netMargin",
+    "ccr",
+    "gpAssets",
+    "peRatio",
+    "dividendYield",
+]
+
+# Default points per metric; they add up to 100
+defaultWeights = {
+    "roce": 30,
+    "interestCov": 30,
+    "grossMargin": 10,
+    "netMargin": 10,
+    "ccr": 5,
+    "gpAssets": 5,
+    "peRatio": 5,
+    "dividendYield": 5,
+}
+
+# Metric value that earns the full weight (P/E is inverted: 20 / P/E)
+targets = {
+    "roce": 0.15,
+    "interestCov": 10,
+    "grossMargin": 0.40,
+    "netMargin": 0.15,
+    "ccr": 0.90,
+    "gpAssets": 0.3,
+    "peRatio": 20,
+    "dividendYield": 0.03,
+}
+
+# Other names the same metrics go by (gatherMetrics output, calculateScore args)
+aliases = {
+    "divYieldRaw": "dividendYield",
+    "divYield": "dividendYield",
+}
+
+# ==== Helpers ====
+
+def normalizeWeights(weights=None):
+    """
+    Return a weight per metric key.
+    No weights means the defaults; otherwise unspecified metrics get 0.
+    """
+    if weights is None:
+        return dict(defaultWeights)
+    normalized = {key: 0.0 for key in metricKeys}
+    for key, value in weights.items():
+        key = aliases.get(key, key)
+        if key in normalized:
+            normalized[key] = float(value or 0)
+    return normalized
+
+
+def metricColumn(values, key, length=None):
+    """Pull one metric out of a mapping/DataFrame as a float array (missing/NaN -> 0)."""
+    column = None
+    for name in [key] + [a for a, target in aliases.items() if target == key]:
+        if name in values:
+            column = values[name]
+            break
+    if column is None:
+        return np.zeros(length or 0)
+    try:
+        column = np.asarray(column, dtype=float)
+    except (TypeError, ValueError):
+        # Mixed input such as None or "N/A" strings from JSON
+        column = pd.to_numeric(pd.Series(np.asarray(column, dtype=object)), errors="coerce").to_numpy(dtype=float)
+    return np.where(np.isnan(column), 0.0, column)
+
+# ==== Main Entry ====
+
+def scoreArrays(values, weights=None):
+    """
+    Score many stocks in one pass.
+    `values` maps metric keys to equal-length arrays (a DataFrame works too).
+    Gives the same result as StockEval.calculateScore row by row, including
+    a zero P/E earning no valuation points.
+    """
+    weights = normalizeWeights(weights)
+    length = len(values) if isinstance(values, pd.DataFrame) else None
+    if length is None:
+        lengths = [len(np.atleast_1d(v)) for v in values.values()]
+        length = max(lengths, default=0)
+    total = np.zeros(length)
+    # Accumulate column by column so the float sums match the scalar version
+    for key in metricKeys:
+        weight = weights[key]
+        column = metricColumn(values, key, length)
+        if key == "peRatio":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(column != 0, targets[key] / column, 0.0)
+        else:
+            ratio = column / targets[key]
+        total += np.clip(ratio * weight, 0, max(weight, 0))
+    return np.minimum(np.round(total), 100).astype(int)
+
+
+def scoreFrame(df, weights=None):
+    """Score every row of a metrics DataFrame; returns a Series aligned to df.index."""
+    return pd.Series(scoreArrays(df, weights), index=df.index, name="score")
@@ -0,0 +1,259 @@
+"""Universe-wide screen, materialized on a schedule and served as a ranked table."""
+
+import os
+import threading
+import time
+import pandas as pd
+from batchEngine import runBatch
+from diskCache import cachePath, openDatabase
+from periodic import startPeriodic, exclusive
+from peerStats import capBand
+from upstreamScheduler import upstreamPriority
+from StockEval import evaluateSnapshot, scoreMetrics
+
+# ==== Configuration ====
+
+# Only tickers at or above this market cap are screened (0 = whole universe)
+minMarketCap = float(os.getenv("SCREEN_MIN_CAP", 300e6))
+# UTC hour the nightly run starts in, and the minimum gap between runs
+screenHour = int(os.getenv("SCREEN_HOUR", 3))
+screenInterval = float(os.getenv("SCREEN_INTERVAL", 20 * 3600))
+screenWorkers = int(os.getenv("SCREEN_WORKERS", 8))
+
+defaultPageSize = 100
+maxPageSize = 500
+
+# Numeric columns that can be filtered (min_/max_) and sorted on
+numericColumns = [
+    "score", "marketCap", "price", "peRatio", "dividendYield",
+    "roce", "interestCov", "grossMargin", "netMargin", "ccr", "gpAssets",
+]
+textColumns = ["symbol", "name", "country", "capBand"]
+# Columns returned by queries and exports, in order
+exportColumns = textColumns + numericColumns + ["evaluatedAt"]
+
+_conn = None
+_lock = threading.Lock()
+
+# ==== Helpers ====
+
+def getConnection():
+    """Open the screen database on first use."""
+    global _conn
+    with _lock:
+        if _conn is None:
+            conn = openDatabase(cachePath("screen.sqlite"))
+            numeric = ",\n".join(f"{column} REAL" for column in numericColumns)
+            conn.executescript(
+                f"""CREATE TABLE IF NOT EXISTS screenResults (
+                    symbol TEXT PRIMARY KEY,
+                    name TEXT,
+                    country TEXT,
+                    capBand TEXT,
+                    {numeric},
+                    evaluatedAt REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS screenByScore ON screenResults (score DESC);
+                CREATE TABLE IF NOT EXISTS screenRuns (
+                    startedAt REAL NOT NULL,
+                    finishedAt REAL,
+                    total INTEGER,
+                    succeeded INTEGER
+                );"""
+            )
+            conn.commit()
+            _conn = conn
+        return _conn
+
+
+def screenRow(ticker, listing):
+    """Evaluate one ticker into a screenResults row. Raises on failure."""
+    # The same evaluation and scoring as /evaluate (history and peer store included)
+    _, metrics = evaluateSnapshot(ticker)
+    score = scoreMetrics(metrics)
+    marketCap = listing["Market Cap"]
+    band = capBand(marketCap)
+    return {
+        "symbol": ticker,
+        "name": listing["Name"] or metrics["name"],
+        "country": listing["Country"],
+        "capBand": band,
+        "score": score,
+        "marketCap": None if pd.isna(marketCap) else float(marketCap),
+        "price": metrics["price"],
+        "peRatio": metrics["peRatio"],
+        "dividendYield": metrics["divYieldRaw"],
+        "roce": metrics["roce"],
+        "interestCov": metrics["interestCov"],
+        "grossMargin": metrics["grossMargin"],
+        "netMargin": metrics["netMargin"],
+        "ccr": metrics["ccr"],
+        "gpAssets": metrics["gpAssets"],
+        "evaluatedAt": time.time(),
+    }
+
+
+def _upsert(row):
+    columns = list(row)
+    conn = getConnection()
+    with _lock:
+        conn.execute(
+            f"INSERT OR REPLACE INTO screenResults ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [row[c] for c in columns],
+        )
+        conn.commit()
+
+# ==== Materialization ====
+
+def materializeScreen(tickerDf, minCap=minMarketCap, workers=screenWorkers):
+    """
+    Evaluate every ticker in the universe with market cap >= minCap and
+    write the results table.  Rows are upserted as they finish, so the
+    previous run's rows keep serving until replaced; tickers that left the
+    universe are removed at the end.  Returns (screened, succeeded).
+    """
+    caps = pd.to_numeric(tickerDf["Market Cap"].astype(object), errors="coerce")
+    listings = tickerDf[caps.fillna(0) >= minCap] if minCap else tickerDf
+    listings = listings.drop_duplicates("Symbol").set_index("Symbol")
+    startedAt = time.time()
+    print(f"Screen run: evaluating {len(listings)} tickers")
+
+    succeeded = 0
+    with upstreamPriority("batch"):
+        results = runBatch(list(listings.index), lambda t: screenRow(t, listings.loc[t]), workers=workers)
+        for ticker, row, error in results:
+            if error is not None:
+                print(f"Screen run: {ticker} failed: {error}")
+                continue
+            _upsert(row)
+            succeeded += 1
+
+    conn = getConnection()
+    with _lock:
+        # Drop tickers no longer screened, but keep ones that merely failed this time
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS screened (symbol TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM screened")
+        conn.executemany("INSERT OR IGNORE INTO screened VALUES (?)", [(s,) for s in listings.index])
+        conn.execute("DELETE FROM screenResults WHERE symbol NOT IN (SELECT symbol FROM screened)")
+        conn.execute(
+            "INSERT INTO screenRuns (startedAt, finishedAt, total, succeeded) VALUES (?, ?, ?, ?)",
+            (startedAt, time.time(), len(listings), succeeded),
+        )
+        conn.commit()
+    print(f"Screen run: {succeeded}/{len(listings)} tickers in {time.time() - startedAt:.0f}s")
+    return len(listings), succeeded
+
+
+def lastRun():
+    """The most recent completed run as a dict, or None."""
+    conn = getConnection()
+    with _lock:
+        row = conn.execute(
+            "SELECT startedAt, finishedAt, total, succeeded FROM screenRuns ORDER BY finishedAt DESC LIMIT 1"
+        ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(["startedAt", "finishedAt", "total", "succeeded"], row))
+
+# ==== Queries ====
+
+def _screenSql(filters, sort, descending):
+    """WHERE / ORDER BY clauses and parameters for a filtered, sorted screen query."""
+    filters = filters or {}
+    where, params = [], []
+    for key, value in filters.items():
+        if key in ("country", "capBand"):
+            values = value if isinstance(value, (list, tuple)) else [value]
+            where.append(f"{key} IN ({', '.join('?' * len(values))})")
+            params += list(values)
+        elif key.startswith(("min_", "max_")) and key[4:] in numericColumns:
+            where.append(f"{key[4:]} {'>=' if key.startswith('min_') else '<='} ?")
+            params.append(float(value))
+        else:
+            raise ValueError(f"Unknown filter: {key}")
+    if sort not in numericColumns + textColumns:
+        raise ValueError(f"Unknown sort column: {sort}")
+
+    whereSql = f"WHERE {' AND '.join(where)}" if where else ""
+    # NULLs sort last either way; symbol breaks ties so pages are stable
+    orderSql = f"ORDER BY {sort} IS NULL, {sort} {'DESC' if descending else 'ASC'}, symbol"
+    return whereSql, orderSql, params
+
+
+def queryScreen(filters=None, sort="score", descending=True, page=1, pageSize=defaultPageSize):
+    """
+    One page of the materialized screen.
+    `filters` may hold "country" / "capBand" (a value or list of values) and
+    "min_<column>" / "max_<column>" bounds for any numeric column.
+    Returns {"total", "page", "pageSize", "run", "rows"}.
+    Unknown filter or sort columns raise ValueError.
+    """
+    whereSql, orderSql, params = _screenSql(filters, sort, descending)
+    page = max(int(page), 1)
+    pageSize = min(max(int(pageSize), 1), maxPageSize)
+
+    conn = getConnection()
+    with _lock:
+        total = conn.execute(f"SELECT COUNT(*) FROM screenResults {whereSql}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {', '.join(exportColumns)} FROM screenResults {whereSql} {orderSql} LIMIT ? OFFSET ?",
+            params + [pageSize, (page - 1) * pageSize],
+        ).fetchall()
+    return {
+        "total": total,
+        "page": page,
+        "pageSize": pageSize,
+        "run": lastRun(),
+        "rows": [dict(zip(exportColumns, row)) for row in rows],
+    }
+
+
+def iterateScreen(filters=None, sort="score", descending=True, chunkSize=maxPageSize):
+    """
+    Every row of the screen matching `filters` (same arguments as
+    queryScreen), read `chunkSize` rows at a time so exports of the whole
+    universe never hold it in memory.  Validation errors raise up front.
+    """
+    whereSql, orderSql, params = _screenSql(filters, sort, descending)
+    sql = f"SELECT {', '.join(exportColumns)} FROM screenResults {whereSql} {orderSql} LIMIT ? OFFSET ?"
+
+    def rows():
+        conn = getConnection()
+        offset = 0
+        while True:
+            with _lock:
+                chunk = conn.execute(sql, params + [chunkSize, offset]).fetchall()
+            for row in chunk:
+                yield dict(zip(exportColumns, row))
+            if len(chunk) < chunkSize:
+                return
+            offset += chunkSize
+    return rows()
+
+# ==== Scheduling ====
+
+def checkForScreen(getTickers):
+    """Run the screen if it is the nightly hour (or there never was a run) and the last one is old enough."""
+    run = lastRun()
+    if run is not None:
+        if time.gmtime().tm_hour != screenHour or time.time() - run["finishedAt"] < screenInterval:
+            return
+    with exclusive(cachePath("screen.lock")) as acquired:
+        run = lastRun()
+        if acquired and (run is None or time.time() - run["finishedAt"] >= screenInterval):
+            materializeScreen(getTickers())
+
+
+def startScreenSchedule(getTickers):
+    """
+    Check hourly on a background thread whether the nightly screen is due.
+    `getTickers` returns the current universe DataFrame.
+    """
+    return startPeriodic(lambda: checkForScreen(getTickers), 3600, "screen-materialize", initialDelay=60)
+
+# ==== Run script directly ====
+
+if __name__ == "__main__":
+    from universeStore import loadUniverse
+    materializeScreen(loadUniverse())
@@ -0,0 +1,128 @@
+"""Prebuilt in-memory autocomplete index over the ticker universe."""
+
+from bisect import bisect_left
+import heapq
+import pandas as pd
+
+# ==== Configuration ====
+
+maxResults = 10
+# Prefixes up to this length have their top results precomputed
+precomputedPrefixLength = 3
+# Substring postings are kept for n-grams up to this length
+maxGram = 3
+
+# ==== Helpers ====
+
+def countryShort(c):
+    """Return a short country code for display in the UI."""
+    if isinstance(c, str):
+        if c.lower() == 'canada':
+            return 'CAD'
+        if c.lower() == 'united states':
+            return 'USA'
+        return c[:3].upper()  # Fallback to first three characters
+    return ''
+
+
+def lowerKey(value):
+    """Lowercased search key; missing values become empty strings."""
+    return value.lower() if isinstance(value, str) else ''
+
+# ==== Index ====
+
+class SearchIndex:
+    """
+    Autocomplete index built once from the ticker DataFrame.
+    Every entry gets a rank by descending market cap, so all lookups work on
+    rank-sorted integer lists and never touch pandas per request.
+    """
+
+    def __init__(self, tickerDf):
+        ordered = tickerDf.assign(_cap=pd.to_numeric(tickerDf['Market Cap'], errors='coerce'))
+        ordered = ordered.sort_values('_cap', ascending=False, kind='stable', na_position='last')
+        # Ready-to-serve result dicts, indexed by rank
+        self.results = [
+            {'Name': name, 'Symbol': symbol, 'CountryShort': countryShort(country)}
+            for name, symbol, country in zip(ordered['Name'], ordered['Symbol'], ordered['Country'])
+        ]
+        self.names = [lowerKey(n) for n in ordered['Name']]
+        self.symbols = [lowerKey(s) for s in ordered['Symbol']]
+
+        # Sorted (key, rank) pairs over names and symbols for prefix ranges
+        pairs = sorted(
+            [(key, rank) for rank, key in enumerate(self.names)] +
+            [(key, rank) for rank, key in enumerate(self.symbols)]
+        )
+        self.sortedKeys = [key for key, _ in pairs]
+        self.sortedRanks = [rank for _, rank in pairs]
+
+        # Short prefixes match too many keys to scan, so precompute their top hits
+        self.prefixTop = {}
+        for key, rank in pairs:
+            for length in range(1, min(len(key), precomputedPrefixLength) + 1):
+                self.prefixTop.setdefault(key[:length], set()).add(rank)
+        self.prefixTop = {
+            prefix: heapq.nsmallest(maxResults, ranks)
+            for prefix, ranks in self.prefixTop.items()
+        }
+
+        # n-gram -> rank-sorted list of entries whose name or symbol contains it
+        postings = {}
+        for rank in range(len(self.results)):
+            for key in (self.names[rank], self.symbols[rank]):
+                for n in range(1, maxGram + 1):
+                    for i in range(len(key) - n + 1):
+                        postings.setdefault(key[i:i + n], set()).add(rank)
+        self.postings = {gram: sorted(ranks) for gram, ranks in postings.items()}
+
+    def __len__(self):
+        return len(self.results)
+
+    def _prefixMatches(self, query):
+        """Ranks of entries whose name or symbol starts with the query (best first)."""
+        if len(query) <= precomputedPrefixLength:
+            return self.prefixTop.get(query, [])
+        lo = bisect_left(self.sortedKeys, query)
+        ranks = set()
+        for i in range(lo, len(self.sortedKeys)):
+            if not self.sortedKeys[i].startswith(query):
+                break
+            ranks.add(self.sortedRanks[i])
+        return heapq.nsmallest(maxResults, ranks)
+
+    def _containsMatches(self, query, exclude, limit):
+        """Ranks of entries containing the query anywhere, skipping `exclude`."""
+        if len(query) <= maxGram:
+            candidates = self.postings.get(query, [])
+            verify = False
+        else:
+            # Walk the rarest trigram's postings and verify the full substring
+            grams = {query[i:i + maxGram] for i in range(len(query) - maxGram + 1)}
+            lists = [self.postings.get(g, []) for g in grams]
+            candidates = min(lists, key=len)
+            verify = True
+        matches = []
+        for rank in candidates:
+            if rank in exclude:
+                continue
+            if verify and query not in self.names[rank] and query not in self.symbols[rank]:
+                continue
+            matches.append(rank)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def search(self, query):
+        """
+        Return up to maxResults matches for a query: names/symbols starting
+        with it first, then ones merely containing it, each by market cap.
+        """
+        query = query.lower()
+        if not query:
+            return []
+        startsWith = self._prefixMatches(query)
+        ranks = list(startsWith)
+        if len(ranks) < maxResults:
+            ranks += self._containsMatches(query, set(startsWith), maxResults - len(ranks))
+        return [self.results[rank] for rank in ranks]
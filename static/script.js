@@ -177,6 +177,7 @@ function saveWeights() {
     });
     closeWeightModal();
     updateScores();
+    fillMissingMetrics();
     showToast('Scores updated');
 }
 
@@ -202,63 +203,79 @@ function applyColumnVisibility(row) {
 
 // ==== SCORING & RENDERING ====
 
-// Convert metric value (handle %, x, $ etc)
-function parseMetric(val, isPercent) {
-    if (!val) return 0;
-    val = String(val).replace(/[%,x$]/g, '').replace(/,/g, '');
-    let num = parseFloat(val);
-    if (isNaN(num)) return 0;
-    return isPercent ? num / 100 : num;
-}
-
-/** Main financial scoring algorithm based on metrics and weights */
-function calculateScore(metrics) {
-    let score = 0;
-    const wRoce = scoringWeights.roce || 0;
-    const wInt = scoringWeights.interestCov || 0;
-    const wGross = scoringWeights.grossMargin || 0;
-    const wNet = scoringWeights.netMargin || 0;
-    const wCcr = scoringWeights.ccr || 0;
-    const wGp = scoringWeights.gpAssets || 0;
-    const wPe = scoringWeights.peRatio || 0;
-    const wDiv = scoringWeights.dividendYield || 0;
-
-    if (wRoce) score += Math.max(Math.min((metrics.roce / 0.15) * wRoce, wRoce), 0);
-    if (wInt) score += Math.max(Math.min((metrics.interestCov / 10) * wInt, wInt), 0);
-    if (wGross) score += Math.max(Math.min((metrics.grossMargin / 0.40) * wGross, wGross), 0);
-    if (wNet) score += Math.max(Math.min((metrics.netMargin / 0.15) * wNet, wNet), 0);
-    if (wCcr) score += Math.max(Math.min((metrics.ccr / 0.90) * wCcr, wCcr), 0);
-    if (wGp) score += Math.max(Math.min((metrics.gpAssets / 0.3) * wGp, wGp), 0);
-    if (wPe) score += Math.max(Math.min((20 / (metrics.peRatio || 1)) * wPe, wPe), 0);
-    if (wDiv) score += Math.max(Math.min((metrics.dividendYield / 0.03) * wDiv, wDiv), 0);
-    return Math.min(Math.round(score), 100);
-}
-
-/** Update all scores in the watchlist table */
-function updateScores() {
-    document.querySelectorAll('#watchlist-body tr').forEach(row => {
-        const metrics = {
-            roce: parseFloat(row.dataset.roce || 0),
-            interestCov: parseFloat(row.dataset.interestCov || 0),
-            grossMargin: parseFloat(row.dataset.grossMargin || 0),
-            netMargin: parseFloat(row.dataset.netMargin || 0),
-            ccr: parseFloat(row.dataset.ccr || 0),
-            gpAssets: parseFloat(row.dataset.gpAssets || 0),
-            peRatio: parseFloat(row.dataset.peRatio || 0),
-            dividendYield: parseFloat(row.dataset.dividendYield || 0)
-        };
-        const score = calculateScore(metrics);
-        const cell = row.cells[11];
-        if (cell) {
-            const donut = cell.querySelector('.score-donut');
-            if (donut) {
-                updateScoreDonut(donut, score);
-            } else {
-                cell.innerHTML = createScoreDonut(score);
-            }
+const asPercent = v => `${Math.round(v * 100)}%`;
+
+// Metric columns in table order: raw /evaluate key, header label, display
+// format, and the colour thresholds (in displayed units, scaled by `scale`)
+const metricColumns = [
+    { key: 'price', label: 'Price', format: v => `$${v.toFixed(2)}` },
+    { key: 'dividendYield', label: 'Dividend Yield', format: v => v ? `${v.toFixed(2)}%` : 'N/A', good: 3, okay: 1 },
+    { key: 'peRatio', label: 'P/E Ratio', format: v => v ? v.toFixed(2) : 'N/A' },
+    { key: 'roce', label: 'ROCE', format: asPercent, scale: 100, good: 15, okay: 5 },
+    { key: 'interestCov', label: 'Interest Coverage', format: v => `${Math.round(v)}x`, good: 10, okay: 3 },
+    { key: 'grossMargin', label: 'Gross Margin', format: asPercent, scale: 100, good: 30, okay: 15 },
+    { key: 'netMargin', label: 'Net Margin', format: asPercent, scale: 100, good: 15, okay: 5 },
+    { key: 'ccr', label: 'Cash Conversion Ratio (FCF)', format: asPercent, scale: 100, good: 90, okay: 70 },
+    { key: 'gpAssets', label: 'Gross Profit / Assets', format: asPercent, scale: 100, good: 30, okay: 10 }
+];
+// Scored metrics (everything but price), as named by the server's metric registry
+const scoredMetrics = metricColumns.map(c => c.key).filter(key => key !== 'price');
+
+/** Metrics to request from the server: all (null) unless some were removed from scoring */
+function activeMetrics() {
+    return deletedMetrics.size ? scoredMetrics.filter(key => !deletedMetrics.has(key)) : null;
+}
+
+/** Store a raw metric on a row and redraw its cell */
+function setRowMetric(row, column, value) {
+    row.dataset[column.key] = value ?? 0;
+    const cell = row.querySelector(`.col-${column.key}`);
+    if (cell) cell.innerHTML = metricCellHtml(column, value);
+}
+
+/** Apply a score to a watchlist row's donut and dataset */
+function applyScore(row, score) {
+    const cell = row.cells[11];
+    if (cell) {
+        const donut = cell.querySelector('.score-donut');
+        if (donut) {
+            updateScoreDonut(donut, score);
+        } else {
+            cell.innerHTML = createScoreDonut(score);
         }
-        row.dataset.score = score;
-    });
+    }
+    row.dataset.score = score;
+}
+
+/** Re-score every watchlist row server-side under the current weights */
+async function updateScores() {
+    const rows = Array.from(document.querySelectorAll('#watchlist-body tr'));
+    if (rows.length === 0) return;
+    const payload = rows.map(row => ({
+        symbol: row.dataset.symbol,
+        roce: parseFloat(row.dataset.roce || 0),
+        interestCov: parseFloat(row.dataset.interestCov || 0),
+        grossMargin: parseFloat(row.dataset.grossMargin || 0),
+        netMargin: parseFloat(row.dataset.netMargin || 0),
+        ccr: parseFloat(row.dataset.ccr || 0),
+        gpAssets: parseFloat(row.dataset.gpAssets || 0),
+        peRatio: parseFloat(row.dataset.peRatio || 0),
+        dividendYield: parseFloat(row.dataset.dividendYield || 0)
+    }));
+    try {
+        const res = await fetch('/score', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ weights: scoringWeights, rows: payload })
+        });
+        const data = await res.json();
+        if (!Array.isArray(data)) return;
+        data.forEach((item, i) => {
+            if (rows[i]) applyScore(rows[i], item.score);
+        });
+    } catch (err) {
+        console.error("Scoring failed:", err);
+    }
 }
 
 /** Sort table rows based on column and direction */
@@ -364,39 +381,154 @@ function evaluateRawTicker() {
 async function evaluateStock(symbol) {
     if (!symbol) return;
     try {
-        const res = await fetch(`/evaluate/${symbol}`);
+        const metrics = activeMetrics();
+        const res = await fetch(`/evaluate/${symbol}` + (metrics ? `?metrics=${metrics.join(',')}` : ''));
         const data = await res.json();
         if (data.error) {
             alert("Error: " + data.error);
             return;
         }
-        if (document.getElementById(`row-${symbol}`)) return; // avoid duplicates
-        const rowHtml = buildRow(data);
-        const temp = document.createElement('tbody');
-        temp.innerHTML = rowHtml;
-        const rowNode = temp.firstElementChild;
-        // Store metrics for sorting/scoring
-        rowNode.dataset.symbol = data.Symbol || '';
-        rowNode.dataset.company = data["Company Name"] || '';
-        rowNode.dataset.country = data.Country || '';
-        rowNode.dataset.price = parseMetric(data.Price, false);
-        rowNode.dataset.dividendYield = parseMetric(data["Dividend Yield"], true);
-        rowNode.dataset.peRatio = parseMetric(data["P/E Ratio"], false);
-        rowNode.dataset.roce = parseMetric(data.ROCE, true);
-        rowNode.dataset.interestCov = parseMetric(data["Interest Coverage"], false);
-        rowNode.dataset.grossMargin = parseMetric(data["Gross Margin"], true);
-        rowNode.dataset.netMargin = parseMetric(data["Net Margin"], true);
-        rowNode.dataset.ccr = parseMetric(data["Cash Conversion Ratio (FCF)"], true);
-        rowNode.dataset.gpAssets = parseMetric(data["Gross Profit / Assets"], true);
-        rowNode.dataset.ai = 0;
-        applyColumnVisibility(rowNode);
-        document.getElementById("watchlist-body").appendChild(rowNode);
-        updateScores();
+        if (addRowFromData(data)) updateScores();
     } catch (err) {
         console.error("Evaluation failed:", err);
     }
 }
 
+// Evaluate many tickers in one request; rows are added (or, with refresh, updated) as each NDJSON line arrives
+async function evaluateMany(symbols, refresh = false) {
+    if (!symbols.length) return;
+    const failed = [];
+    try {
+        const res = await fetch('/evaluate', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ tickers: symbols, metrics: activeMetrics() })
+        });
+        if (!res.ok) {
+            const data = await res.json().catch(() => ({}));
+            alert("Error: " + (data.error || res.statusText));
+            return;
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        const handleLine = (line) => {
+            if (!line.trim()) return;
+            const data = JSON.parse(line);
+            if (data.error) failed.push(`${data.symbol}: ${data.error}`);
+            else if (refresh) updateRowFromData(data);
+            else addRowFromData(data);
+        };
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.forEach(handleLine);
+        }
+        handleLine(buffer + decoder.decode());
+    } catch (err) {
+        console.error("Bulk evaluation failed:", err);
+    }
+    updateScores();
+    if (failed.length) alert("Could not evaluate:\n" + failed.join('\n'));
+}
+
+// Build a table row from an /evaluate result; returns false for duplicates
+function addRowFromData(data) {
+    if (document.getElementById(`row-${data.symbol}`)) return false; // avoid duplicates
+    const temp = document.createElement('tbody');
+    temp.innerHTML = buildRow(data);
+    const rowNode = temp.firstElementChild;
+    // Keep the raw numbers for sorting/scoring
+    rowNode.dataset.symbol = data.symbol || '';
+    rowNode.dataset.company = data.name || '';
+    rowNode.dataset.country = data.country || '';
+    metricColumns.forEach(({ key }) => {
+        rowNode.dataset[key] = data[key] ?? 0;
+    });
+    rowNode.dataset.metrics = (data.metrics || scoredMetrics).join(',');
+    rowNode.dataset.ai = 0;
+    markStale(rowNode, data.stale, data.staleSince);
+    applyColumnVisibility(rowNode);
+    document.getElementById("watchlist-body").appendChild(rowNode);
+    return true;
+}
+
+// ==== PRICE REFRESH ====
+
+const priceRefreshMs = 60 * 1000;
+const priceColumns = metricColumns.filter(c => ['price', 'peRatio', 'dividendYield'].includes(c.key));
+
+// Pull fresh prices (and the P/E and yield derived from them) for every row, then re-score
+async function refreshPrices() {
+    const rows = Array.from(document.querySelectorAll('#watchlist-body tr'));
+    if (rows.length === 0 || document.hidden) return;
+    try {
+        const res = await fetch('/quotes', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ tickers: rows.map(row => row.dataset.symbol) })
+        });
+        const data = await res.json();
+        if (!Array.isArray(data)) return;
+        let changed = false;
+        data.forEach(quote => {
+            const row = document.getElementById(`row-${quote.symbol}`);
+            if (!row || quote.error) return;
+            row.classList.toggle('stale-price', !!quote.stale);
+            priceColumns.forEach(column => {
+                const value = quote[column.key];
+                if (value === undefined || String(value) === row.dataset[column.key]) return;
+                setRowMetric(row, column, value);
+                changed = true;
+            });
+        });
+        if (changed) updateScores();
+    } catch (err) {
+        console.error("Price refresh failed:", err);
+    }
+}
+// Wait for each refresh before scheduling the next, so slow ones never overlap
+async function priceRefreshLoop() {
+    await refreshPrices();
+    setTimeout(priceRefreshLoop, priceRefreshMs);
+}
+setTimeout(priceRefreshLoop, priceRefreshMs);
+
+// Update an existing row's metrics in place from an /evaluate result
+function updateRowFromData(data) {
+    const row = document.getElementById(`row-${data.symbol}`);
+    if (!row) return;
+    metricColumns.forEach(column => setRowMetric(row, column, data[column.key]));
+    row.dataset.metrics = (data.metrics || scoredMetrics).join(',');
+    markStale(row, data.stale, data.staleSince);
+}
+
+// Flag a row served from last-known-good data while Yahoo Finance is unavailable
+function markStale(row, stale, since) {
+    row.classList.toggle('stale', !!stale);
+    if (!stale) {
+        row.removeAttribute('title');
+        return;
+    }
+    const asOf = since ? ` from ${new Date(since * 1000).toLocaleDateString()}` : '';
+    row.title = `Showing last known data${asOf}; Yahoo Finance is unavailable right now.`;
+}
+
+// Re-evaluate rows that were loaded without a metric that is now back in the scoring
+function fillMissingMetrics() {
+    const wanted = activeMetrics() || scoredMetrics;
+    const symbols = Array.from(document.querySelectorAll('#watchlist-body tr'))
+        .filter(row => {
+            const loaded = (row.dataset.metrics || '').split(',');
+            return wanted.some(key => !loaded.includes(key));
+        })
+        .map(row => row.dataset.symbol);
+    evaluateMany(symbols, true);
+}
+
 /** Remove a stock row by ticker symbol */
 function removeRow(symbol) {
     const row = document.getElementById(`row-${symbol}`);
@@ -405,23 +537,41 @@ function removeRow(symbol) {
 
 // ==== AI ANALYSIS ====
 
-// Run AI qualitative analysis for a single row
-async function runAIForRow(symbol, btn) {
+// Run AI qualitative analysis for a single row, streaming the answer into the modal
+function runAIForRow(symbol, btn) {
     btn.disabled = true;
     btn.innerHTML = `<img src="static/icons/loading.gif" alt="Loading" style="width:25px; height:25px;">`;
-    try {
-        const res = await fetch("/run_qualitative", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ tickers: [symbol] })
-        });
-        const data = await res.json();
-        if (!Array.isArray(data) || data.length === 0) {
+    const title = `${symbol} AI Analysis`;
+    showModal(title, '<div class="stream-body"></div>');
+    const body = document.querySelector("#modal-content .stream-body");
+    let html = '';
+    let finished = false;
+
+    const fail = (message) => {
+        finished = true;
+        source.close();
+        btn.innerText = "Retry";
+        btn.disabled = false;
+        alert(message);
+    };
+
+    const source = new EventSource(`/qualitative_stream/${encodeURIComponent(symbol)}`);
+    source.onmessage = (e) => {
+        html += JSON.parse(e.data).html;
+        // Body is detached if the user opened another modal meanwhile
+        if (body) body.innerHTML = html;
+    };
+    source.addEventListener("failed", () => fail(`Error running AI for ${symbol}`));
+    source.addEventListener("done", () => {
+        if (finished) return;
+        finished = true;
+        source.close();
+        if (!html) {
             btn.innerText = "Retry";
+            btn.disabled = false;
             alert(`No AI result for ${symbol}.`);
             return;
         }
-        const cleanText = data[0].Qualitative.replace(/<br\s*\/?>/gi, "<br>");
         btn.innerHTML = `
             <svg viewBox="0 0 24 24" width="50" height="50" fill="white" xmlns="http://www.w3.org/2000/svg">
             <path d="M14 3h7v7h-2V6.41l-9.29 9.3-1.42-1.42L17.59 5H14V3z"/>
@@ -430,18 +580,36 @@ async function runAIForRow(symbol, btn) {
             <path d="M5 19v-5H3v5c0 1.1.9 2 2 2h5v-2H5z"/>
             </svg>`;
         btn.disabled = false;
-        btn.dataset.analysis = cleanText;
-        btn.onclick = () => showModal(`${symbol} AI Analysis`, cleanText);
+        btn.dataset.analysis = html;
+        btn.onclick = () => showModal(title, html);
         const row = document.getElementById(`row-${symbol}`);
         if (row) row.dataset.ai = 1;
-    } catch (err) {
-        alert(`Error running AI for ${symbol}`);
-        btn.innerText = "Retry";
+    });
+    // Don't let EventSource silently reconnect and restart the analysis
+    source.onerror = () => {
+        if (!finished) fail(`Error running AI for ${symbol}`);
+    };
+}
+
+/** Show a finished AI result on a row's button */
+function applyAIResult(row, symbol, qualitative) {
+    const btn = row.querySelector(".ai-button");
+    if (!btn) return;
+    if (qualitative) {
+        btn.innerText = "View";
         btn.disabled = false;
+        const cleanText = qualitative.replace(/<br\s*\/?>/gi, "<br>");
+        btn.dataset.analysis = cleanText;
+        btn.onclick = () => showModal(`${symbol} AI Analysis`, cleanText);
+        row.dataset.ai = 1;
+    } else {
+        btn.innerText = "N/A";
+        btn.disabled = true;
+        row.dataset.ai = 0;
     }
 }
 
-/** Run AI qualitative analysis for all watchlist stocks */
+/** Run AI qualitative analysis for all watchlist stocks as a background job */
 async function runAllAI() {
     const rows = Array.from(document.querySelectorAll("#watchlist-body tr"));
     const symbols = rows.map(row => row.id.replace("row-", ""));
@@ -455,34 +623,42 @@ async function runAllAI() {
         btn.innerHTML = `<img src="static/icons/loading.gif" alt="Loading" style="width:16px; height:16px;">`;
     });
     try {
-        const res = await fetch("/run_qualitative", {
+        const res = await fetch("/jobs/qualitative", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({ tickers: symbols })
         });
-        const data = await res.json();
-        if (!Array.isArray(data) || data.length === 0) {
+        const job = await res.json();
+        if (!job.jobId) {
             alert("No AI results.");
             return;
         }
-        const resultMap = {};
-        data.forEach(item => { resultMap[item.Symbol] = item.Qualitative; });
-        rows.forEach(row => {
-            const symbol = row.id.replace("row-", "");
-            const btn = row.querySelector(".ai-button");
-            if (resultMap[symbol]) {
-                btn.innerText = "View";
-                btn.disabled = false;
-                const cleanText = resultMap[symbol].replace(/<br\s*\/?>/gi, "<br>");
-                btn.dataset.analysis = cleanText;
-                btn.onclick = () => showModal(`${symbol} AI Analysis`, cleanText);
-                row.dataset.ai = 1;
-            } else {
-                btn.innerText = "N/A";
-                btn.disabled = true;
-                row.dataset.ai = 0;
-            }
+        // Fill in each row as soon as its analysis finishes
+        const source = new EventSource(`/jobs/${job.jobId}/stream`);
+        const pending = new Set(symbols);
+        source.onmessage = (e) => {
+            const item = JSON.parse(e.data);
+            const row = document.getElementById(`row-${item.Symbol}`);
+            pending.delete(item.Symbol);
+            if (row) applyAIResult(row, item.Symbol, item.status === "done" ? item.Qualitative : null);
+        };
+        const finish = () => {
+            source.close();
+            pending.forEach(symbol => {
+                const row = document.getElementById(`row-${symbol}`);
+                if (row) applyAIResult(row, symbol, null);
+            });
+        };
+        source.addEventListener("done", finish);
+        // The job can't finish (e.g. its worker died); stop instead of reconnecting
+        source.addEventListener("failed", (e) => {
+            finish();
+            alert(`AI analysis stopped: ${JSON.parse(e.data).error}`);
         });
+        source.onerror = () => {
+            // Connection dropped; EventSource retries automatically unless closed
+            if (source.readyState === EventSource.CLOSED) alert("Error running AI analysis.");
+        };
     } catch (err) {
         alert("Error running AI analysis.");
     }
@@ -502,12 +678,12 @@ function importFromExcel(event) {
         const sheetName = workbook.SheetNames[0];
         const sheet = workbook.Sheets[sheetName];
         const json = XLSX.utils.sheet_to_json(sheet);
+        const symbols = [];
         json.forEach(row => {
-            const symbol = row.Symbol || row['symbol'];
-            if (symbol && !document.getElementById(`row-${symbol}`)) {
-                evaluateStock(symbol.trim());
-            }
+            const symbol = String(row.Symbol || row['symbol'] || '').trim().toUpperCase();
+            if (symbol && !document.getElementById(`row-${symbol}`)) symbols.push(symbol);
         });
+        evaluateMany(symbols);
 
         // Import custom weights if present
         const weightSheet = workbook.Sheets['Scoring Weight'];
@@ -536,71 +712,50 @@ function importFromExcel(event) {
     reader.readAsArrayBuffer(file);
 }
 
-/** Export table and AI analysis as multi-sheet Excel */
-function exportToExcel() {
-    const originalTable = document.getElementById("watchlist-table");
-    const clonedTable = originalTable.cloneNode(true);
-
-    // Remove sort arrows and settings button
-    clonedTable.querySelectorAll('.sort-arrows').forEach(el => el.remove());
-    const settingsBtn = clonedTable.querySelector('#settings-btn');
-    if (settingsBtn) settingsBtn.remove();
-
-    // Remove last "Delete" column and AI column
-    const headerRow = clonedTable.querySelector("thead tr");
-    if (headerRow) headerRow.removeChild(headerRow.lastElementChild);
-    const headers = Array.from(headerRow.cells);
-    let aiColIndex = headers.findIndex(th => th.textContent.trim().toLowerCase() === "qualitative analysis");
-    if (aiColIndex === -1) aiColIndex = headers.length - 1;
-    if (headerRow.cells[aiColIndex]) headerRow.removeChild(headerRow.cells[aiColIndex]);
-    clonedTable.querySelectorAll("tbody tr").forEach(row => {
-        if (row.cells[aiColIndex]) row.removeChild(row.cells[aiColIndex]);
-        if (row.lastElementChild) row.removeChild(row.lastElementChild);
-    });
-
-    const wb = XLSX.utils.book_new();
-    const watchlistSheet = XLSX.utils.table_to_sheet(clonedTable);
-    XLSX.utils.book_append_sheet(wb, watchlistSheet, "Watchlist");
-
-    // AI analysis sheet
-    const aiRows = [["Ticker", "Qualitative Analysis"]];
+/**
+ * Export the watchlist and AI analysis as a multi-sheet Excel file.
+ * The server re-evaluates the tickers (from its cache) and streams the
+ * workbook with raw numbers, so large watchlists never build it in the page.
+ */
+async function exportToExcel() {
+    const tickers = [];
+    const analysis = {};
     document.querySelectorAll("#watchlist-body tr").forEach(row => {
         const symbol = row.id.replace("row-", "");
-        const btn = row.querySelector(".ai-button");
-        let analysis = btn?.dataset?.analysis;
-        if (analysis) {
-            analysis = analysis.replace(/<br\s*\/?>/gi, '\n')
+        tickers.push(symbol);
+        const text = row.querySelector(".ai-button")?.dataset?.analysis;
+        if (text) {
+            analysis[symbol] = text.replace(/<br\s*\/?>/gi, '\n')
                 .replace(/<\/p>\s*<p>/gi, '\n')
                 .replace(/<[^>]+>/g, '')
                 .trim()
                 .replace(/\n+/g, '\n');
-            const lines = analysis.split('\n');
-            aiRows.push([symbol, lines[0]]);
-            for (let i = 1; i < lines.length; i++) aiRows.push(["", lines[i]]);
-            aiRows.push(["", ""]);
         }
     });
-    if (aiRows.length > 1) {
-        const aiSheet = XLSX.utils.aoa_to_sheet(aiRows);
-        XLSX.utils.book_append_sheet(wb, aiSheet, "Qualitative Analysis");
+    if (!tickers.length) return;
+
+    const res = await fetch('/export', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            format: 'xlsx',
+            tickers,
+            weights: scoringWeights,
+            metrics: activeMetrics(),
+            analysis
+        })
+    });
+    if (!res.ok) {
+        const data = await res.json().catch(() => ({}));
+        alert("Export failed: " + (data.error || res.statusText));
+        return;
     }
-
-    // Scoring weights
-    const weightRows = [
-        ["Metric", "Weight"],
-        ["ROCE", scoringWeights.roce],
-        ["Interest Coverage", scoringWeights.interestCov],
-        ["Gross Margin", scoringWeights.grossMargin],
-        ["Net Margin", scoringWeights.netMargin],
-        ["Cash Conversion Ratio", scoringWeights.ccr],
-        ["Gross Profit / Assets", scoringWeights.gpAssets],
-        ["P/E Ratio", scoringWeights.peRatio],
-        ["Dividend Yield", scoringWeights.dividendYield]
-    ];
-    const weightSheet = XLSX.utils.aoa_to_sheet(weightRows);
-    XLSX.utils.book_append_sheet(wb, weightSheet, "Scoring Weight");
-
-    XLSX.writeFile(wb, "watchlist.xlsx");
+    const url = URL.createObjectURL(await res.blob());
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = "watchlist.xlsx";
+    link.click();
+    URL.revokeObjectURL(url);
 }
 
 // ==== MODAL HANDLING ====
@@ -694,65 +849,40 @@ window.showResults = function () {
     if (infoBtn) infoBtn.style.display = 'flex';
 };
 
-/** Build a table row (HTML) for a new stock */
+/** Build a table row (HTML) for a new stock from its raw /evaluate numbers */
 function buildRow(data) {
-    const preferredOrder = [
-        "Symbol", "Price", "Dividend Yield", "P/E Ratio",
-        "ROCE", "Interest Coverage", "Gross Margin", "Net Margin",
-        "Cash Conversion Ratio (FCF)", "Gross Profit / Assets", "Score"
-    ];
-    const classMap = {
-        "Price": "price",
-        "Dividend Yield": "dividendYield",
-        "P/E Ratio": "peRatio",
-        "ROCE": "roce",
-        "Interest Coverage": "interestCov",
-        "Gross Margin": "grossMargin",
-        "Net Margin": "netMargin",
-        "Cash Conversion Ratio (FCF)": "ccr",
-        "Gross Profit / Assets": "gpAssets",
-        "Score": "score"
-    };
-    let row = `<tr id="row-${data.Symbol}" data-company="${data["Company Name"] || ''}" data-country="${data.Country || ''}">`;
+    let row = `<tr id="row-${data.symbol}" data-company="${data.name || ''}" data-country="${data.country || ''}">`;
     // Symbol
-    row += `<td>${data.Symbol || 'N/A'}</td>`;
+    row += `<td>${data.symbol || 'N/A'}</td>`;
     // Company and country
-    const company = data["Company Name"] || 'N/A';
-    const country = data.Country || '';
+    const company = data.name || 'N/A';
+    const country = data.country || '';
     row += `<td><div>${company}</div><div class="country-sub">${country}</div></td>`;
-    preferredOrder.slice(1).forEach(key => {
-        let val = data[key] || "N/A";
-        switch (key) {
-            case "ROCE": val = colorMetric(val, 15, 5); break;
-            case "Interest Coverage": val = colorMetric(val, 10, 3); break;
-            case "Gross Margin": val = colorMetric(val, 30, 15); break;
-            case "Net Margin": val = colorMetric(val, 15, 5); break;
-            case "Cash Conversion Ratio (FCF)": val = colorMetric(val, 90, 70); break;
-            case "Gross Profit / Assets": val = colorMetric(val, 30, 10); break;
-            case "Dividend Yield": val = colorMetric(val, 3, 1); break;
-            case "Score":
-                const num = parseFloat(String(val).replace('/100', '')) || 0;
-                val = createScoreDonut(num);
-                break;
-        }
-        const cls = classMap[key] || key.toLowerCase().replace(/\s+|\//g, '_');
-        row += `<td data-label="${key}" class="col-${cls}">${val}</td>`;
+    metricColumns.forEach(column => {
+        row += `<td data-label="${column.label}" class="col-${column.key}">${metricCellHtml(column, data[column.key])}</td>`;
     });
+    row += `<td data-label="Score" class="col-score">${createScoreDonut(data.score || 0)}</td>`;
     row += `<td class="ai-cell">
-        <button class="ai-button" onclick="runAIForRow('${data.Symbol}', this)">
+        <button class="ai-button" onclick="runAIForRow('${data.symbol}', this)">
             ▶
         </button>
     </td>`;
 
-    row += `<td class="delete-cell"><button class="delete-button" onclick="removeRow('${data.Symbol}')">❌</button></td>`;
+    row += `<td class="delete-cell"><button class="delete-button" onclick="removeRow('${data.symbol}')">❌</button></td>`;
     row += "</tr>";
     return row;
 }
 
-/** Color code metrics based on thresholds */
-function colorMetric(value, good, okay) {
+/** Formatted (and colour-coded) cell content for one metricColumns entry */
+function metricCellHtml({ format, scale = 1, good, okay }, value) {
+    if (value == null) return "N/A";
+    const text = format(value);
+    return good === undefined ? text : colorMetric(text, value * scale, good, okay);
+}
+
+/** Color code a formatted metric by its number (in displayed units) against thresholds */
+function colorMetric(value, number, good, okay) {
     if (!value || value === "N/A") return value;
-    let number = parseFloat(value.replace(/[%x]/g, ''));
     if (isNaN(number)) return value;
     let color = "red";
     if (number >= good) color = "#28a745";
@@ -0,0 +1,25 @@
+"""Shared test setup: isolate every on-disk store and import the app modules from the repo root."""
+
+import os
+import sys
+import tempfile
+
+testsDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(testsDir)
+workDir = tempfile.mkdtemp(prefix="stockeval-tests-")
+
+# Stores and rate limits are read when the modules are first imported, so set them first
+os.environ.update({
+    "CACHE_DIR": os.path.join(workDir, "cache"),
+    "UNIVERSE_DIR": os.path.join(workDir, "universe"),
+    "TICKERS_CSV": os.path.join(workDir, "tickers.csv"),
+    "YAHOO_RATE": "100000",
+    "YAHOO_BURST": "100000",
+    "OPENROUTER_RATE": "100000",
+    "OPENROUTER_BURST": "100000",
+    "API_KEY": "test",
+    # No refresh, screen or job threads: tests must not reach the network
+    "DEFER_BACKGROUND_TASKS": "1",
+})
+sys.path.insert(0, repoDir)
+sys.path.insert(0, os.path.join(repoDir, "benchmarks"))
@@ -0,0 +1,46 @@
+"""HTTP behaviour against offline fixtures: NDJSON framing and shedding while Yahoo is down."""
+
+import json
+import pytest
+import fixtures
+import circuitBreaker
+import tickerSnapshot
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    baseDir = str(tmp_path_factory.mktemp("fixtures"))
+    fixtures.syntheticFixtures(3, baseDir)
+    fixtures.install(baseDir=baseDir)
+    import app
+    yield app.app.test_client()
+    tickerSnapshot.tickerFactory = tickerSnapshot.yf.Ticker
+
+
+@pytest.fixture(autouse=True)
+def freshBreakers(monkeypatch):
+    monkeypatch.setattr(circuitBreaker, "_breakers", {})
+
+
+def test_bulk_evaluate_streams_one_object_per_line(client):
+    response = client.post("/evaluate", json={"tickers": ["syn0000", "SYN0001", "SYN0000", "BAD"]})
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).split("\n")
+    assert lines[-1] == ""
+    results = {row["symbol"]: row for row in map(json.loads, lines[:-1])}
+    # Upper-cased and de-duplicated; a bad ticker is an error line, not a broken stream
+    assert set(results) == {"SYN0000", "SYN0001", "BAD"}
+    assert isinstance(results["SYN0000"]["score"], int)
+    assert "error" in results["BAD"]
+
+
+def test_bulk_evaluate_rejects_empty_requests(client):
+    assert client.post("/evaluate", json={"tickers": []}).status_code == 400
+
+
+def test_shed_tickers_get_503_with_retry_after(client):
+    circuitBreaker.breakerFor("yahoo")._trip("test")
+    for path in ("/evaluate/SYN0002", "/percentiles/SYN0002"):
+        response = client.get(path)
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) > 0
@@ -0,0 +1,49 @@
+"""runBatch results, retries and per-item timeouts."""
+
+import time
+from batchEngine import runBatch
+from circuitBreaker import CircuitOpenError
+
+
+def test_yields_every_item_once():
+    results = list(runBatch(range(20), lambda i: i * 2, workers=4))
+    assert sorted(result for _, result, _ in results) == [i * 2 for i in range(20)]
+    assert all(error is None for _, _, error in results)
+
+
+def test_retries_then_reports_the_error():
+    attempts = []
+
+    def flaky(item):
+        attempts.append(item)
+        raise ValueError("boom")
+
+    [(item, result, error)] = list(runBatch(["a"], flaky, retries=2, backoff=0))
+    assert (item, result) == ("a", None)
+    assert isinstance(error, ValueError)
+    assert len(attempts) == 3
+
+
+def test_hung_items_do_not_starve_the_rest():
+    def work(item):
+        time.sleep(3 if item < 3 else 0.05)
+        return item
+
+    started = time.monotonic()
+    results = {item: (result, error) for item, result, error in runBatch(range(12), work, workers=3, timeout=0.5, retries=0)}
+    assert time.monotonic() - started < 2.5
+    assert all(isinstance(results[item][1], TimeoutError) for item in range(3))
+    # The clock starts when an item runs, so none of the rest time out waiting in the queue
+    assert all(results[item] == (item, None) for item in range(3, 12))
+
+
+def test_shed_calls_are_not_retried():
+    attempts = []
+
+    def shed(item):
+        attempts.append(item)
+        raise CircuitOpenError("yahoo", 30)
+
+    [(_, _, error)] = list(runBatch(["a"], shed, retries=2, backoff=1))
+    assert isinstance(error, CircuitOpenError)
+    assert attempts == ["a"]
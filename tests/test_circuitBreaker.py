@@ -0,0 +1,107 @@
+"""Circuit breaker state transitions and which Yahoo errors count against it."""
+
+import time
+import pytest
+import requests
+from yfinance.exceptions import YFRateLimitError, YFTickerMissingError
+import circuitBreaker
+from circuitBreaker import CircuitBreaker
+from tickerSnapshot import isOutage
+
+
+class Response:
+    def __init__(self, status):
+        self.status_code = status
+
+
+@pytest.fixture
+def fastBreaker(monkeypatch):
+    monkeypatch.setattr(circuitBreaker, "minCalls", 4)
+    monkeypatch.setattr(circuitBreaker, "openSeconds", 0.05)
+    return CircuitBreaker("test")
+
+
+def test_trips_on_error_rate(fastBreaker):
+    for ok in (True, False, True):
+        assert fastBreaker.allow()
+        fastBreaker.record(ok, 0.01)
+    assert fastBreaker.state == "closed"
+    fastBreaker.record(False, 0.01)
+    assert fastBreaker.state == "open"
+    assert not fastBreaker.allow()
+    assert fastBreaker.retryAfter() > 0
+
+
+def test_trips_on_slow_calls(fastBreaker):
+    for _ in range(4):
+        fastBreaker.record(True, fastBreaker.slowSeconds + 1)
+    assert fastBreaker.state == "open"
+
+
+def test_successful_probe_closes(fastBreaker):
+    for _ in range(4):
+        fastBreaker.record(False, 0.01)
+    time.sleep(0.06)
+    assert fastBreaker.allow()
+    assert fastBreaker.state == "halfOpen"
+    # Only one probe at a time
+    assert not fastBreaker.allow()
+    fastBreaker.record(True, 0.01)
+    assert fastBreaker.state == "closed"
+    assert fastBreaker.allow()
+
+
+def test_failed_probe_doubles_open_time(fastBreaker):
+    for _ in range(4):
+        fastBreaker.record(False, 0.01)
+    time.sleep(0.06)
+    assert fastBreaker.allow()
+    fastBreaker.record(False, 0.01)
+    assert fastBreaker.state == "open"
+    assert fastBreaker._openFor == pytest.approx(0.1)
+    time.sleep(0.06)
+    assert not fastBreaker.allow()
+
+
+def test_missing_symbols_are_not_outages():
+    assert not isOutage(KeyError("No fixture for BAD"))
+    assert not isOutage(YFTickerMissingError("BAD", "no data"))
+    assert not isOutage(requests.HTTPError(response=Response(404)))
+
+
+def test_transport_errors_and_throttling_are_outages():
+    assert isOutage(YFRateLimitError())
+    assert isOutage(requests.ConnectionError())
+    assert isOutage(requests.Timeout())
+    assert isOutage(requests.HTTPError(response=Response(429)))
+    assert isOutage(requests.HTTPError(response=Response(503)))
+
+
+def test_unknown_tickers_do_not_trip_yahoo(monkeypatch):
+    import fixtures
+    import tickerSnapshot
+    monkeypatch.setattr(tickerSnapshot, "tickerFactory", fixtures.FixtureTicker)
+    monkeypatch.setattr(circuitBreaker, "_breakers", {})
+    for symbol in ("BAD1", "BAD2", "BAD3"):
+        tickerSnapshot.fetchFields(symbol)
+    assert circuitBreaker.breakerFor("yahoo").state == "closed"
+
+
+def test_streamed_answer_always_reports_the_probe(monkeypatch):
+    import StockEval
+    from fakeOpenRouter import FakeOpenRouter
+    server = FakeOpenRouter(latency=0.01).startInBackground()
+    # The disconnect below breaks the server's pipe; that is expected
+    server.handle_error = lambda request, address: None
+    monkeypatch.setattr(StockEval, "apiUrl", server.url)
+    monkeypatch.setattr(circuitBreaker, "_breakers", {})
+    monkeypatch.setattr(circuitBreaker, "openSeconds", 0.01)
+    breaker = circuitBreaker.breakerFor("openrouter")
+    breaker._trip("test")
+    time.sleep(0.02)
+    # The client disconnects after the first piece of a half-open probe
+    stream = StockEval.streamQualitativeQuestions("PROBE", "summary")
+    assert next(stream)
+    stream.close()
+    server.shutdown()
+    assert breaker.state == "closed"
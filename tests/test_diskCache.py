@@ -0,0 +1,84 @@
+"""DiskCache round trips, running size total, batched read times and LRU eviction."""
+
+import sqlite3
+import time
+import pytest
+import diskCache
+from diskCache import DiskCache
+
+
+def storedBytes(cache):
+    return cache._conn.execute("SELECT bytes FROM totals WHERE name = 'entries'").fetchone()[0]
+
+
+def summedBytes(cache):
+    return cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "cache.sqlite"), maxBytes=10_000)
+
+
+def test_round_trip(cache):
+    assert cache.get("missing") is None
+    before = time.time()
+    cache.set("key", {"a": [1, 2]})
+    value, storedAt = cache.get("key")
+    assert value == {"a": [1, 2]}
+    assert storedAt >= before
+    cache.delete("key")
+    assert cache.get("key") is None
+
+
+def test_running_total_tracks_sets_replaces_and_deletes(cache):
+    for i in range(20):
+        cache.set(f"k{i}", b"x" * 100)
+    cache.set("k3", b"y" * 10)
+    cache.delete("k4")
+    cache.delete("never stored")
+    assert storedBytes(cache) == summedBytes(cache)
+
+
+def test_hits_do_not_write(cache):
+    cache.set("key", 1)
+    accessed = cache._conn.execute("SELECT accessedAt FROM entries").fetchone()[0]
+    for _ in range(50):
+        cache.get("key")
+    assert cache._conn.execute("SELECT accessedAt FROM entries").fetchone()[0] == accessed
+    assert not cache._touches
+
+
+def test_eviction_keeps_recently_read_entries(cache, monkeypatch):
+    for i in range(40):
+        cache.set(f"k{i}", b"x" * 200)
+    # Pretend every entry was last read long ago, then read one of them
+    cache._conn.execute("UPDATE entries SET accessedAt = 0")
+    cache._conn.commit()
+    keys = [key for (key,) in cache._conn.execute("SELECT key FROM entries ORDER BY key")]
+    assert cache.get(keys[0]) is not None
+    for i in range(40, 50):
+        cache.set(f"k{i}", b"x" * 200)
+    remaining = {key for (key,) in cache._conn.execute("SELECT key FROM entries")}
+    assert keys[0] in remaining
+    assert storedBytes(cache) <= cache.maxBytes
+    assert storedBytes(cache) == summedBytes(cache)
+
+
+def test_existing_files_get_a_total(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE entries (key TEXT PRIMARY KEY, payload BLOB NOT NULL, size INTEGER NOT NULL, "
+        "storedAt REAL NOT NULL, accessedAt REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO entries VALUES ('a', x'00', 123, 0, 0)")
+    conn.commit()
+    conn.close()
+    assert storedBytes(DiskCache(path)) == 123
+
+
+def test_cache_path_uses_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(diskCache, "cacheDir", str(tmp_path / "nested"))
+    assert diskCache.cachePath("x.sqlite") == str(tmp_path / "nested" / "x.sqlite")
+    assert (tmp_path / "nested").is_dir()
@@ -0,0 +1,49 @@
+"""Export formats read back with the rows, columns and scoring weights that went in."""
+
+import csv
+import io
+import pytest
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+import exportWriters
+from exportWriters import exportStream
+
+columns = ["symbol", "score", "roce"]
+rows = [{"symbol": f"T{i}", "score": i, "roce": i / 100, "extra": "ignored"} for i in range(25)]
+weights = {"roce": 40, "peRatio": 5}
+
+
+def body(fmt, **kwargs):
+    return b"".join(exportStream(fmt, columns, iter(rows), ["symbol"], weights, **kwargs))
+
+
+def test_csv_is_chunked_with_one_header(monkeypatch):
+    monkeypatch.setattr(exportWriters, "chunkRows", 10)
+    chunks = list(exportWriters.writeCsv(columns, iter(rows)))
+    assert len(chunks) > 1
+    parsed = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert [row["symbol"] for row in parsed] == [row["symbol"] for row in rows]
+    assert list(parsed[0]) == columns
+
+
+def test_xlsx_has_rows_analysis_and_weights():
+    workbook = load_workbook(io.BytesIO(body("xlsx", sheetName="Screen", analysis={"T1": "Yes\nNo"})))
+    assert workbook.sheetnames == ["Screen", "Qualitative Analysis", "Scoring Weight"]
+    sheet = list(workbook["Screen"].values)
+    assert sheet[0] == tuple(columns)
+    assert sheet[3] == ("T2", 2, 0.02)
+    weightRows = dict(list(workbook["Scoring Weight"].values)[1:])
+    assert weightRows["ROCE"] == 40
+    assert weightRows["Gross Margin"] == 0
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        exportStream("pdf", columns, iter(rows), ["symbol"], weights)
+
+
+def test_parquet_round_trip():
+    table = pq.read_table(io.BytesIO(body("parquet")))
+    assert table.column_names == columns
+    assert table.num_rows == len(rows)
+    assert b"scoringWeights" in table.schema.metadata
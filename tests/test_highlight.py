@@ -0,0 +1,35 @@
+"""Streamed highlighting must produce the same HTML as highlight() on the whole answer."""
+
+import random
+from StockEval import IncrementalHighlighter, highlight
+
+pieces = [
+    "Yes", "No", "Yes,", "No.", "NoNo", "(Wide Moat)", "abc", "confid", "Final", "Score:",
+    "Final Score: 3/8", "final score: 7/8", "Confidence: 85%", "confidence: 55",
+    "YesFinal Score: 7/8", "Yesconfidence: 55", "\n", "\t",
+]
+
+
+def streamed(text, rng):
+    highlighter = IncrementalHighlighter()
+    html = ""
+    position = 0
+    while position < len(text):
+        size = rng.randrange(1, 8)
+        html += highlighter.feed(text[position:position + size])
+        position += size
+    return html + highlighter.flush()
+
+
+def test_matches_full_text_highlight():
+    rng = random.Random(7)
+    for _ in range(3000):
+        text = " ".join(rng.choice(pieces) for _ in range(rng.randrange(1, 15)))
+        assert streamed(text, rng) == highlight(text.replace("\n", "<br>")), repr(text)
+
+
+def test_keyword_inside_a_word_is_held():
+    highlighter = IncrementalHighlighter()
+    assert highlighter.feed("Yes YesFinal Sc") == highlight("Yes ")
+    assert highlighter.feed("ore: 7/8") == ""
+    assert highlighter.flush() == highlight("YesFinal Score: 7/8")
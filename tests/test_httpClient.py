@@ -0,0 +1,46 @@
+"""Async fan-out: retries on throttling, and one failed download leaves the others intact."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import httpClient
+import tickerFetcher
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        hits = Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        # /throttled answers 429 once, then succeeds
+        status = 404 if self.path == "/missing" else 429 if self.path == "/throttled" and hits == 1 else 200
+        body = self.path.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(httpClient, "backoffBase", 0.01)
+    Handler.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_download_all_retries_and_keeps_failures_separate(server):
+    ok, throttled, missing = tickerFetcher.downloadAll([
+        (f"{server}/ok", {}, (1, 1)),
+        (f"{server}/throttled", {}, (1, 1)),
+        (f"{server}/missing", {}, (1, 1)),
+    ])
+    assert ok.read() == b"/ok"
+    assert throttled.read() == b"/throttled"
+    assert Handler.hits["/throttled"] == 2
+    assert isinstance(missing, httpClient.AsyncRequestError)
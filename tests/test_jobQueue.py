@@ -0,0 +1,82 @@
+"""Job queue: processing, resuming after a restart, and spotting items nothing will finish."""
+
+import os
+import subprocess
+import sys
+import time
+import jobQueue
+from jobQueue import JobQueue
+
+
+def deadPid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def waitForCompletion(queue, jobId, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.status(jobId)
+        if status["complete"]:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"Job {jobId} did not finish: {queue.status(jobId)}")
+
+
+def failOnBad(ticker):
+    if ticker == "BAD":
+        raise ValueError("no data")
+    return f"<p>{ticker}</p>"
+
+
+def test_items_finish_with_results_and_errors(tmp_path):
+    queue = JobQueue(failOnBad, path=str(tmp_path / "jobs.sqlite"))
+    status = waitForCompletion(queue, queue.submit(["AAA", "BAD", "CCC"]))
+    assert [(r["Symbol"], r["status"]) for r in status["results"]] == [("AAA", "done"), ("BAD", "error"), ("CCC", "done")]
+    assert status["results"][0]["Qualitative"] == "<p>AAA</p>"
+    assert status["results"][1]["error"] == "no data"
+    assert queue.status("unknown") is None
+
+
+def insertClaimedJob(queue, tickers, pid, claimedAt):
+    """A job whose items are all marked running under `pid`, without running anything."""
+    queue._execute("INSERT INTO jobs (id, createdAt) VALUES ('job1', ?)", (time.time(),))
+    for position, ticker in enumerate(tickers):
+        queue._execute(
+            "INSERT INTO jobItems (jobId, position, ticker, status, claimedBy, claimedAt) "
+            "VALUES ('job1', ?, ?, 'running', ?, ?)",
+            (position, ticker, pid, claimedAt),
+        )
+    return "job1"
+
+
+def test_resume_requeues_items_of_dead_workers(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    # A job left half-done by a worker process that has since exited
+    crashed = JobQueue(failOnBad, path=path)
+    jobId = insertClaimedJob(crashed, ["AAA", "BBB"], deadPid(), time.time())
+    assert crashed.status(jobId)["stalled"] == 2
+
+    restarted = JobQueue(failOnBad, path=path)
+    restarted.resume()
+    status = waitForCompletion(restarted, jobId)
+    assert [r["status"] for r in status["results"]] == ["done", "done"]
+    assert status["stalled"] == 0
+
+
+def test_old_claims_of_live_workers_count_as_stalled(tmp_path, monkeypatch):
+    queue = JobQueue(failOnBad, path=str(tmp_path / "jobs.sqlite"))
+    jobId = insertClaimedJob(queue, ["AAA"], os.getpid(), time.time() - 10)
+    assert queue.status(jobId)["stalled"] == 0
+    monkeypatch.setattr(jobQueue, "claimTimeout", 5)
+    assert queue.status(jobId)["stalled"] == 1
+
+
+def test_resume_leaves_items_of_live_workers_alone(tmp_path):
+    queue = JobQueue(failOnBad, path=str(tmp_path / "jobs.sqlite"))
+    # Still being processed by another live worker (our parent stands in for it)
+    jobId = insertClaimedJob(queue, ["AAA"], os.getppid(), time.time())
+    queue.resume()
+    time.sleep(0.05)
+    assert queue.status(jobId)["finished"] == 0
@@ -0,0 +1,51 @@
+"""History store: point-in-time backtests and what a backfill is allowed to record."""
+
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+import diskCache
+import metricHistory
+import StockEval
+
+
+@pytest.fixture(autouse=True)
+def emptyStore(tmp_path, monkeypatch):
+    monkeypatch.setattr(diskCache, "cacheDir", str(tmp_path))
+    monkeypatch.setattr(metricHistory, "_conn", None)
+
+
+def storeYears(symbol, roces):
+    periods = pd.DataFrame(
+        {"roce": roces},
+        index=pd.to_datetime([f"{2020 + i}-12-31" for i in range(len(roces))]),
+    )
+    metricHistory.storePeriods(symbol, periods)
+
+
+def test_backtest_only_uses_periods_public_by_each_date():
+    storeYears("AAA", [0.05, 0.15])
+    storeYears("BBB", [0.15])
+    weights = {"roce": 30}
+    scores = metricHistory.backtest(["2021-01-15", "2021-06-01", "2022-06-01"], weights)
+    # 2020 results are public from 2021-03-31 (90 day lag), 2021 results from 2022-03-31
+    assert pd.isna(scores.loc["2021-01-15", "AAA"])
+    assert scores.loc["2021-06-01", "AAA"] == pytest.approx(10)
+    assert scores.loc["2022-06-01", "AAA"] == pytest.approx(30)
+    assert scores.loc["2022-06-01", "BBB"] == pytest.approx(30)
+
+
+def test_backtest_without_history_is_empty():
+    assert metricHistory.backtest(["2022-01-01"]).empty
+
+
+def test_backfill_skips_stale_snapshots(monkeypatch):
+    snapshots = {
+        "FRESH": SimpleNamespace(symbol="FRESH", staleFields=()),
+        "STALE": SimpleNamespace(symbol="STALE", staleFields=("income",)),
+    }
+    recorded = []
+    monkeypatch.setattr(StockEval, "loadSnapshot", snapshots.get)
+    monkeypatch.setattr(StockEval, "gatherMetrics", lambda snapshot: {})
+    monkeypatch.setattr(StockEval, "recordHistory", lambda snapshot, metrics: recorded.append(snapshot.symbol))
+    assert StockEval.backfillHistory(["FRESH", "STALE"]) == 1
+    assert recorded == ["FRESH"]
@@ -0,0 +1,67 @@
+"""Peer sketches stay exact as evaluations replace each other."""
+
+import random
+import numpy as np
+import pytest
+import diskCache
+import peerStats
+from peerStats import PeerSketches, quantileGrid, rankInSketch
+from scoring import metricKeys
+
+
+@pytest.fixture(autouse=True)
+def emptyStore(tmp_path, monkeypatch):
+    monkeypatch.setattr(diskCache, "cacheDir", str(tmp_path))
+    monkeypatch.setattr(peerStats, "_conn", None)
+
+
+def observeRandom(sketches, rng, count):
+    latest = {}
+    for _ in range(count):
+        symbol = f"S{rng.randrange(300)}"
+        groups = {"sector": rng.choice(["Tech", "Energy", None]), "country": rng.choice(["US", "DE"]), "capBand": "mid"}
+        metrics = {key: rng.choice([None, 0.0, -1.0]) if rng.random() < 0.1 else rng.uniform(-5, 50) for key in metricKeys}
+        sketches.observe(symbol, groups, metrics)
+        latest[symbol] = (groups, metrics)
+    return latest
+
+
+def expectedQuantiles(latest, metric, dimension, group):
+    values = np.array([
+        metrics[metric] for groups, metrics in latest.values()
+        if metrics[metric] is not None and (dimension == "all" or groups[dimension] == group)
+    ], dtype=float)
+    if metric == "peRatio":
+        values = values[values > 0]
+    return len(values), np.quantile(values, quantileGrid)
+
+
+@pytest.mark.parametrize("dimension,group", [("all", None), ("sector", "Tech"), ("country", "DE")])
+def test_sketches_match_numpy_quantiles(dimension, group):
+    sketches = PeerSketches()
+    latest = observeRandom(sketches, random.Random(2), 1500)
+    sketch = sketches.sketch(dimension, group)
+    for metric in metricKeys:
+        count, quantiles = expectedQuantiles(latest, metric, dimension, group)
+        assert sketch[metric][0] == count
+        assert np.allclose(sketch[metric][1], quantiles)
+
+
+def test_other_processes_pick_up_new_rows():
+    writer = PeerSketches()
+    latest = observeRandom(writer, random.Random(5), 200)
+    reader = PeerSketches()
+    reader.reloadIfChanged()
+    writer.observe("NEW", {"sector": "Tech", "country": "US", "capBand": "mid"}, {key: 1.0 for key in metricKeys})
+    assert reader.reloadIfChanged()
+    assert reader.groupsFor("NEW") == {"sector": "Tech", "country": "US", "capBand": "mid"}
+    assert reader.metricsFor("NEW")["roce"] == 1.0
+    assert reader.sketch("all", None)["roce"][0] == writer.sketch("all", None)["roce"][0]
+    assert latest
+
+
+def test_rank_in_sketch_is_clamped():
+    quantiles = np.linspace(0, 100, len(quantileGrid))
+    assert rankInSketch(quantiles, -1) == 0
+    assert rankInSketch(quantiles, 1000) == 100
+    assert peerStats.capBand(5e9) == "mid"
@@ -0,0 +1,67 @@
+"""Quote downloads: one download per symbol across callers, breaker checks, and re-pricing."""
+
+import threading
+import time
+import pandas as pd
+import pytest
+import circuitBreaker
+import quotes
+from diskCache import DiskCache
+
+
+class SlowDownload:
+    """yf.download stand-in that records which symbols it was asked for."""
+
+    def __init__(self, seconds=0.1):
+        self.seconds = seconds
+        self.requested = []
+
+    def __call__(self, symbols, **kwargs):
+        self.requested.extend(symbols)
+        time.sleep(self.seconds)
+        columns = pd.MultiIndex.from_product([["Close"], symbols])
+        return pd.DataFrame([[10.0] * len(symbols)], columns=columns)
+
+
+@pytest.fixture(autouse=True)
+def freshQuotes(monkeypatch, tmp_path):
+    monkeypatch.setattr(quotes, "_cache", DiskCache(str(tmp_path / "quotes.sqlite")))
+    monkeypatch.setattr(circuitBreaker, "_breakers", {})
+
+
+def test_concurrent_callers_share_one_download(monkeypatch):
+    download = SlowDownload()
+    monkeypatch.setattr(quotes, "downloadFn", download)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(quotes.getPrices(["AAA", "BBB"])[0]))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(download.requested) == ["AAA", "BBB"]
+    assert results == [{"AAA": 10.0, "BBB": 10.0}] * 3
+
+
+def test_no_download_once_the_breaker_trips_during_admission(monkeypatch):
+    download = SlowDownload(0)
+    monkeypatch.setattr(quotes, "downloadFn", download)
+    monkeypatch.setattr(quotes, "admit", lambda host: circuitBreaker.breakerFor(host)._trip("test"))
+    assert quotes.downloadPrices(["AAA"]) == {}
+    assert download.requested == []
+
+
+def test_missed_symbols_fall_back_to_their_last_quote(monkeypatch):
+    quotes.getCache().set(quotes.quoteKey("OLD"), 5.0)
+    monkeypatch.setattr(quotes, "quoteTtl", 0)
+    monkeypatch.setattr(quotes, "downloadFn", lambda symbols, **kwargs: pd.DataFrame())
+    assert quotes.getPrices(["OLD", "NONE"]) == ({"OLD": 5.0}, {"OLD"})
+
+
+def test_reprice_scales_pe_and_yield():
+    info = {"currentPrice": 100, "trailingPE": 20, "dividendYield": 0.02}
+    assert quotes.repriceMetrics(info, 150) == (20, 0.02, 30, pytest.approx(0.02 * 100 / 150))
+    # Without a cached price there is nothing to scale from
+    assert quotes.repriceMetrics({"forwardPE": 15}, 150) == (15, 0, 15, 0)
@@ -0,0 +1,32 @@
+"""Token buckets, including the SQLite-backed one worker processes share."""
+
+import time
+from rateLimit import SharedTokenBucket, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_waits():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire(timeout=0) and bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.01)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - start > 0.02
+
+
+def test_shared_bucket_is_one_budget_across_connections(tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite")
+    # Separate instances hold separate connections, as separate workers would
+    first, second = (SharedTokenBucket("yahoo", rate=0.01, capacity=3, path=path) for _ in range(2))
+    assert first.acquire(timeout=0)
+    assert second.acquire(timeout=0)
+    assert first.acquire(timeout=0)
+    assert not second.acquire(timeout=0.01)
+    # Another host has its own budget in the same file
+    assert SharedTokenBucket("openrouter", rate=0.01, capacity=1, path=path).acquire(timeout=0)
+
+
+def test_shared_bucket_refills(tmp_path):
+    bucket = SharedTokenBucket("yahoo", rate=50, capacity=1, path=str(tmp_path / "ratelimit.sqlite"))
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=1)
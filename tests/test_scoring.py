@@ -0,0 +1,54 @@
+"""The vectorized scorer must match StockEval.calculateScore / scoreMetrics exactly."""
+
+import numpy as np
+import pandas as pd
+from scoring import metricKeys, scoreArrays, scoreFrame, normalizeWeights, defaultWeights
+from StockEval import calculateScore, scoreMetrics
+
+
+def randomMetrics(rng, count):
+    frame = pd.DataFrame({
+        "roce": rng.uniform(-0.2, 0.5, count),
+        "interestCov": rng.uniform(-5, 40, count),
+        "grossMargin": rng.uniform(-0.1, 0.9, count),
+        "netMargin": rng.uniform(-0.3, 0.4, count),
+        "ccr": rng.uniform(-1, 2, count),
+        "gpAssets": rng.uniform(-0.1, 0.8, count),
+        "peRatio": rng.uniform(-20, 80, count),
+        "dividendYield": rng.uniform(0, 0.1, count),
+    })
+    # Edge cases: no earnings (P/E 0), everything zero
+    frame.loc[::7, "peRatio"] = 0
+    frame.loc[::11, metricKeys] = 0
+    return frame
+
+
+def test_matches_calculate_score():
+    frame = randomMetrics(np.random.default_rng(3), 2000)
+    expected = [
+        calculateScore(r.roce, r.interestCov, r.grossMargin, r.netMargin, r.ccr, r.gpAssets, r.peRatio, r.dividendYield)
+        for r in frame.itertuples()
+    ]
+    assert scoreArrays(frame).tolist() == expected
+    assert scoreFrame(frame).tolist() == expected
+
+
+def test_matches_score_metrics_with_missing_values():
+    frame = randomMetrics(np.random.default_rng(4), 200)
+    rows = frame.to_dict("records")
+    for row in rows[::5]:
+        row["ccr"] = None
+    # gatherMetrics names the dividend yield divYieldRaw
+    rows = [{("divYieldRaw" if key == "dividendYield" else key): value for key, value in row.items()} for row in rows]
+    expected = [scoreMetrics(row) for row in rows]
+    values = {key: [row[key] for row in rows] for key in rows[0]}
+    assert scoreArrays(values).tolist() == expected
+
+
+def test_weights():
+    assert normalizeWeights() == defaultWeights
+    assert normalizeWeights({"roce": 50, "divYield": 5, "unknown": 9}) == {
+        **{key: 0.0 for key in metricKeys}, "roce": 50.0, "dividendYield": 5.0,
+    }
+    # Only ROCE counts, capped at its weight
+    assert scoreArrays({"roce": [0.3, 0.075]}, {"roce": 40}).tolist() == [40, 20]
@@ -0,0 +1,27 @@
+"""Autocomplete ordering: prefix matches before substring matches, each by market cap."""
+
+import pandas as pd
+from searchIndex import SearchIndex
+
+
+def buildIndex():
+    return SearchIndex(pd.DataFrame({
+        "Symbol": ["APPS", "AAPL", "PAPA", "APX", "ZZZ"],
+        "Name": ["Digital Turbine", "Apple Inc.", "Papa Corp", "Apex Ltd", None],
+        "Market Cap": [1e9, 3e12, 5e9, None, 2e9],
+        "Country": ["United States", "United States", "Canada", "Canada", "United States"],
+    }))
+
+
+def test_prefix_matches_come_first_by_market_cap():
+    symbols = [result["Symbol"] for result in buildIndex().search("ap")]
+    # Prefix hits (largest cap first, unknown cap last), then "ap" anywhere
+    assert symbols == ["AAPL", "APPS", "APX", "PAPA"]
+
+
+def test_long_queries_and_case():
+    index = buildIndex()
+    assert [result["Symbol"] for result in index.search("PPLE I")] == ["AAPL"]
+    assert index.search("") == []
+    assert index.search("nothing like it") == []
+    assert len(index) == 5
@@ -0,0 +1,59 @@
+"""Universe refresh: diffing two builds, and keeping a failed exchange's rows."""
+
+import pandas as pd
+import pytest
+import tickerRefresh
+import universeStore
+from tickerRefresh import diffUniverse, fetchLatest
+
+
+def listing(rows, country="United States"):
+    return pd.DataFrame(
+        [(symbol, name, cap, country) for symbol, name, cap in rows],
+        columns=["Symbol", "Name", "Market Cap", "Country"],
+    )
+
+
+@pytest.fixture
+def current(tmp_path):
+    """The live universe as loaded from the store (nullable caps, categorical countries)."""
+    universeStore.saveUniverse(pd.concat([
+        listing([("AAPL", "Apple", 3e12), ("OLD", "Gone Inc", 1e9), ("NOCAP", "No Cap", None)]),
+        listing([("SHOP.TO", "Shopify", 1e11)], country="Canada"),
+    ]), baseDir=str(tmp_path))
+    return universeStore.loadUniverse(str(tmp_path))
+
+
+def test_diff_reports_every_kind_of_change(current):
+    latest = pd.concat([
+        listing([("AAPL", "Apple Inc", 3.1e12), ("NOCAP", "No Cap", 5e8), ("NEW", "New Co", 1e6)]),
+        listing([("SHOP.TO", "Shopify", 2e11)], country="Canada"),
+    ])
+    diff = diffUniverse(current, latest)
+    assert diff["added"] == ["NEW"]
+    assert diff["delisted"] == ["OLD"]
+    assert diff["renamed"] == [("AAPL", "Apple", "Apple Inc")]
+    # AAPL moved under 10%; a cap appearing counts
+    assert [symbol for symbol, _, _ in diff["capChanged"]] == ["NOCAP", "SHOP.TO"]
+
+
+def test_unchanged_lists_have_an_empty_diff(current):
+    assert not any(diffUniverse(current, current.copy()).values())
+
+
+def test_failed_source_keeps_its_current_rows(current, monkeypatch):
+    monkeypatch.setattr(tickerRefresh, "fetchListings", lambda: {
+        "nasdaq": listing([("AAPL", "Apple", 3e12)]),
+        "tsx": ConnectionError("tsx.com unreachable"),
+    })
+    latest = fetchLatest(current)
+    assert sorted(latest["Symbol"]) == ["AAPL", "SHOP.TO"]
+    assert not any(diffUniverse(current, latest)[key] for key in ("renamed", "capChanged"))
+
+
+def test_both_sources_failing_raises(current, monkeypatch):
+    monkeypatch.setattr(tickerRefresh, "fetchListings", lambda: {
+        "nasdaq": ConnectionError("down"), "tsx": ConnectionError("down"),
+    })
+    with pytest.raises(RuntimeError):
+        fetchLatest(current)
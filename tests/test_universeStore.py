@@ -0,0 +1,42 @@
+"""Universe store round trip, and which columns stay on the mapped pages."""
+
+import mmap
+import pandas as pd
+import universeStore
+
+
+def mappedFile(array):
+    """True if the array's memory belongs to a memory-mapped file."""
+    while array is not None:
+        if isinstance(array, mmap.mmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def saveAndLoad(tmp_path):
+    baseDir = str(tmp_path)
+    universeStore.saveUniverse(pd.DataFrame({
+        "Symbol": ["AAPL", "SHOP", "NEW"],
+        "Name": ["Apple Inc.", "Shopify Inc.", None],
+        "Market Cap": [3e12, 1.2e11, None],
+        "Country": ["United States", "Canada", "United States"],
+    }), baseDir=baseDir)
+    return universeStore.loadUniverse(baseDir)
+
+
+def test_round_trip(tmp_path):
+    universe = saveAndLoad(tmp_path)
+    assert list(universe["Symbol"]) == ["AAPL", "SHOP", "NEW"]
+    assert universe["Name"].isna().tolist() == [False, False, True]
+    assert universe["Market Cap"].iloc[0] == 3_000_000_000_000
+    assert universe["Market Cap"].isna().tolist() == [False, False, True]
+    assert list(universe["Country"]) == ["United States", "Canada", "United States"]
+
+
+def test_numeric_columns_are_not_copied(tmp_path):
+    universe = saveAndLoad(tmp_path)
+    marketCap = universe["Market Cap"].array
+    assert mappedFile(marketCap._data)
+    assert mappedFile(marketCap._mask)
+    assert mappedFile(universe["Country"].array.codes)
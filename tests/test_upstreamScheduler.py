@@ -0,0 +1,87 @@
+"""Priority order and per-user fairness of the upstream PriorityGate."""
+
+import contextvars
+import threading
+import time
+import pytest
+import upstreamScheduler
+from upstreamScheduler import PriorityGate, upstreamPriority
+
+
+class HeldLimiter:
+    """Rate limiter that only hands out tokens when the test releases them."""
+
+    def __init__(self):
+        self.tokens = threading.Semaphore(0)
+
+    def acquire(self, timeout=None):
+        return self.tokens.acquire(timeout=timeout)
+
+
+def queueCalls(gate, calls):
+    """Queue (priority, user, label) calls in order; returns the list they are served into."""
+    served = []
+    threads = []
+    for priority, user, label in calls:
+        queued = sum(gate.depth().values())
+        thread = threading.Thread(target=lambda p=priority, u=user, l=label: (gate.acquire(p, u), served.append(l)))
+        thread.start()
+        threads.append(thread)
+        # Wait until it is in the queue so arrival order is deterministic
+        while sum(gate.depth().values()) == queued:
+            time.sleep(0.001)
+    return served, threads
+
+
+def serveAll(gate, limiter, served, threads):
+    # Let a waiter that was polling the limiter notice it is no longer at the head
+    time.sleep(upstreamScheduler.preemptSlice * 2)
+    for count in range(1, len(threads) + 1):
+        limiter.tokens.release()
+        while len(served) < count:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(timeout=1)
+
+
+def test_more_urgent_classes_go_first():
+    limiter = HeldLimiter()
+    gate = PriorityGate("test", limiter)
+    served, threads = queueCalls(gate, [
+        ("background", "system", "background"),
+        ("batch", "system", "batch"),
+        ("watchlist", "alice", "watchlist"),
+        ("interactive", "alice", "interactive"),
+    ])
+    serveAll(gate, limiter, served, threads)
+    assert served == ["interactive", "watchlist", "batch", "background"]
+
+
+def test_users_share_a_class_fairly():
+    limiter = HeldLimiter()
+    gate = PriorityGate("test", limiter)
+    served, threads = queueCalls(gate, [
+        ("batch", "bulk", "bulk1"),
+        ("batch", "bulk", "bulk2"),
+        ("batch", "bulk", "bulk3"),
+        ("batch", "other", "other1"),
+    ])
+    serveAll(gate, limiter, served, threads)
+    assert served.index("other1") < served.index("bulk3")
+    assert all(count == 0 for count in gate.depth().values())
+
+
+def checkPriorityContext():
+    assert upstreamScheduler._currentClass.get() == "background"
+    with upstreamPriority("interactive", "alice"):
+        assert upstreamScheduler._currentClass.get() == "interactive"
+        assert upstreamScheduler._currentUser.get() == "alice"
+    assert upstreamScheduler._currentClass.get() == "background"
+    with pytest.raises(ValueError):
+        with upstreamPriority("urgent"):
+            pass
+
+
+def test_priority_context():
+    # A fresh context, as a new thread without a request would have
+    contextvars.Context().run(checkPriorityContext)
@@ -1,11 +1,24 @@
 """Utilities for downloading and normalizing stock ticker lists."""
 
-import requests
+import asyncio
+import io
 import json
-import csv
+import time
 import pandas as pd
 import re
-import os
+import httpClient
+from universeStore import saveUniverse, exportCsv
+
+# ==== Configuration ====
+
+outFields = ["Symbol", "Name", "Market Cap", "Country"]
+
+# Name clean-up patterns, compiled once and applied to whole columns
+parentheticalPattern = re.compile(r'\s*\((.*?)\)')
+suffixPattern = re.compile(
+    r'\b(Common Stock|Ordinary Shares|Class [A-Z]|ADR|ADS|Units|Warrants)\b', flags=re.IGNORECASE
+)
+whitespacePattern = re.compile(r'\s+')
 
 # ==== Helpers ====
 
@@ -14,60 +27,79 @@ def cleanName(name):
     Remove parentheticals and common suffixes (e.g. 'Common Stock', 'Class A') from a company name.
     """
     # Remove anything in parentheses
-    name = re.sub(r'\s*\((.*?)\)', '', name)
+    name = parentheticalPattern.sub('', name)
     # Strip common suffixes that clutter the company name
-    name = re.sub(r'\b(Common Stock|Ordinary Shares|Class [A-Z]|ADR|ADS|Units|Warrants)\b', '', name, flags=re.IGNORECASE)
+    name = suffixPattern.sub('', name)
     return name.strip()
 
-# ==== Fetch NASDAQ (US) stocks from Nasdaq API ====
+def cleanNames(names):
+    """Vectorized cleanName over a Series of names."""
+    # Most names have no parentheses; a plain substring test skips the regex for them
+    hasParens = names.str.contains("(", regex=False)
+    names = names.copy()
+    names[hasParens] = names[hasParens].str.replace(parentheticalPattern, '', regex=True)
+    return names.str.replace(suffixPattern, '', regex=True).str.strip()
 
-def getNasdaqRows():
+def normalizeName(name):
     """
-    Download and parse NASDAQ/US stock list from the Nasdaq API.
-    Cleans company names, keeps only required fields.
+    Normalize a company name for deduplication: lowercase, no spaces.
     """
-    URL = "https://api.nasdaq.com/api/screener/stocks?download=true"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(URL, headers=headers, timeout=10)
-    response.raise_for_status()
-    data = json.loads(response.content)
-    rows = data.get("data", {}).get("rows", [])
-    jsonToCsv = {
-        "Symbol": "symbol",
-        "Name": "name",
-        "Market Cap": "marketCap",
-        "Country": "country",
-    }
-    cleanedRows = []
-    for row in rows:
-        if row.get("symbol") and row.get("name"):
-            cleanCompanyName = cleanName(row.get("name", ""))
-            cleanedRow = {csvCol: row.get(jsonKey, "") for csvCol, jsonKey in jsonToCsv.items()}
-            cleanedRow["Name"] = cleanCompanyName
-            cleanedRows.append(cleanedRow)
-    return cleanedRows
+    return ''.join(str(name).lower().split())
 
-# ==== Fetch TSX (Canada) stocks from TSX Excel sheet ====
+def normalizeNames(names):
+    """Vectorized normalizeName over a Series of names."""
+    return names.astype(str).str.lower().str.replace(whitespacePattern, '', regex=True)
 
-def getTsxRows():
+def downloadAll(downloads):
     """
-    Download and parse the TSX (Toronto Stock Exchange) Excel file.
-    Cleans names, finds the market cap column, and returns a list of dicts.
+    Fetch every (url, headers, timeout) at once into in-memory buffers (no
+    temp files on disk).  Returns a buffer, or the exception that download
+    failed with, per entry in order.
     """
-    excelUrl = "https://www.tsx.com/resource/en/571"
-    excelPath = "tsx_companies.xlsx"
-    headers = {
-        "Referer": "https://www.tsx.com/listings/current-market-statistics",
-        "User-Agent": "Mozilla/5.0"
+    async def download(session, url, headers, timeout):
+        response = await httpClient.requestAsync(session, "GET", url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return io.BytesIO(await response.read())
+
+    async def fanOut():
+        async with httpClient.asyncSession() as session:
+            return await asyncio.gather(
+                *(download(session, *entry) for entry in downloads), return_exceptions=True
+            )
+    return asyncio.run(fanOut())
+
+# ==== Fetch NASDAQ (US) stocks from Nasdaq API ====
+
+def parseNasdaq(data):
+    """
+    Turn the Nasdaq screener JSON into a listing DataFrame.
+    Keeps rows with a symbol and name, cleans company names, keeps only required fields.
+    """
+    rows = data.get("data", {}).get("rows", [])
+    jsonToCsv = {
+        "symbol": "Symbol",
+        "name": "Name",
+        "marketCap": "Market Cap",
+        "country": "Country",
     }
+    df = pd.DataFrame(rows, columns=list(jsonToCsv)).rename(columns=jsonToCsv)
+    hasIdentity = df["Symbol"].fillna("").astype(bool) & df["Name"].fillna("").astype(bool)
+    df = df[hasIdentity].fillna("").reset_index(drop=True)
+    df["Name"] = cleanNames(df["Name"].astype(str))
+    return df
+
+# NASDAQ/US stock list from the Nasdaq API: (url, headers, timeout)
+nasdaqDownload = (
+    "https://api.nasdaq.com/api/screener/stocks?download=true",
+    {"User-Agent": "Mozilla/5.0"},
+    (5, 30),
+)
 
-    # Download the Excel file
-    resp = requests.get(excelUrl, headers=headers, timeout=30)
-    with open(excelPath, "wb") as f:
-        f.write(resp.content)
+# ==== Fetch TSX (Canada) stocks from TSX Excel sheet ====
 
-    # Use ExcelFile context to ensure file is closed after parsing
-    with pd.ExcelFile(excelPath) as xl:
+def readTsxSheet(workbook):
+    """Read the "TSX Issuers..." sheet from an Excel workbook (path or file-like)."""
+    with pd.ExcelFile(workbook) as xl:
         # Sheet name may change (find the first "TSX Issuers...")
         sheetName = None
         for s in xl.sheet_names:
@@ -76,77 +108,105 @@ def getTsxRows():
                 break
         if not sheetName:
             raise Exception("No TSX Issuers sheet found!")
-        df = xl.parse(sheetName, header=9)
+        return xl.parse(sheetName, header=9)
 
-    df = df.dropna(axis=1, how="all")
-    df = df[df['Root\nTicker'].notna()]
+def parseTsx(sheet):
+    """
+    Turn the raw TSX issuers sheet into a listing DataFrame.
+    Finds the market cap column by name since its header changes over time.
+    """
+    sheet = sheet.dropna(axis=1, how="all")
+    sheet = sheet[sheet['Root\nTicker'].notna()]
 
     # Find market cap column dynamically (should start with "Market Cap (C$)")
-    capCol = [col for col in df.columns if col.startswith("Market Cap (C$)")]
+    capCol = [col for col in sheet.columns if col.startswith("Market Cap (C$)")]
     capCol = capCol[0] if capCol else None
 
-    rows = []
-    for _, row in df.iterrows():
-        rows.append({
-            "Symbol": str(row['Root\nTicker']).strip(),
-            "Name": str(row['Name']).strip(),
-            "Market Cap": row.get(capCol, 0) if capCol else 0,
-            "Country": "Canada",
-        })
-
-    # Delete the Excel file after reading to avoid clutter
-    try:
-        os.remove(excelPath)
-    except Exception as e:
-        print(f"Warning: could not delete {excelPath}: {e}")
+    return pd.DataFrame({
+        "Symbol": sheet['Root\nTicker'].astype(str).str.strip(),
+        "Name": sheet['Name'].astype(str).str.strip(),
+        "Market Cap": sheet[capCol] if capCol else 0,
+        "Country": "Canada",
+    }, columns=outFields).reset_index(drop=True)
+
+# TSX (Toronto Stock Exchange) Excel file: (url, headers, timeout)
+tsxDownload = (
+    "https://www.tsx.com/resource/en/571",
+    {
+        "Referer": "https://www.tsx.com/listings/current-market-statistics",
+        "User-Agent": "Mozilla/5.0"
+    },
+    (5, 60),
+)
 
-    return rows
+# ==== Download every source at once ====
 
-def normalizeName(name):
+def fetchListings():
     """
-    Normalize a company name for deduplication: lowercase, no spaces.
+    Download the NASDAQ and TSX lists concurrently and parse them, entirely
+    in memory.  Returns {"nasdaq": ..., "tsx": ...}, each a listing
+    DataFrame or the exception that source failed with.
     """
-    return ''.join(str(name).lower().split())
-
-# ==== Main routine: Download, deduplicate, and write to tickers.csv ====
+    sources = {
+        "nasdaq": (nasdaqDownload, lambda body: parseNasdaq(json.load(body))),
+        "tsx": (tsxDownload, lambda body: parseTsx(readTsxSheet(body))),
+    }
+    bodies = downloadAll([download for download, _ in sources.values()])
+    listings = {}
+    for (name, (_, parse)), body in zip(sources.items(), bodies):
+        try:
+            listings[name] = body if isinstance(body, Exception) else parse(body)
+        except Exception as e:
+            listings[name] = e
+    return listings
+
+# ==== Main routine: Download, deduplicate, and save the ticker universe ====
+
+def dedupListings(*listings):
+    """
+    Stack listings and drop duplicate (symbol, normalized name) pairs.
+    Later listings take priority: their row replaces an earlier one while
+    keeping the position where that pair first appeared.
+    """
+    df = pd.concat([l[outFields] for l in listings], ignore_index=True)
+    keys = df["Symbol"].astype(str).str.upper()
+    # Only rows sharing a symbol can collide, so only their names need normalizing
+    shared = keys.duplicated(keep=False)
+    keys[shared] = keys[shared] + "\x00" + normalizeNames(df.loc[shared, "Name"])
+    # factorize numbers each pair in order of first appearance
+    group = pd.Series(pd.factorize(keys)[0])
+    last = ~group.duplicated(keep="last")
+    order = group[last].sort_values(kind="stable").index
+    return df.loc[order].reset_index(drop=True)
+
+def addYahooSuffix(df):
+    """Append ".TO" to Canadian symbols for Yahoo Finance compatibility."""
+    isCanada = df["Country"].astype(str).str.lower() == "canada"
+    return df.assign(Symbol=df["Symbol"].where(~isCanada, df["Symbol"].astype(str) + ".TO"))
+
+def combineListings(nasdaqDf, tsxDf):
+    """
+    Merge NASDAQ and TSX listings into one deduplicated DataFrame.
+    TSX rows win over US rows with the same symbol and name, and Canadian
+    symbols get the ".TO" suffix Yahoo Finance expects.
+    """
+    return addYahooSuffix(dedupListings(nasdaqDf, tsxDf))
 
 def main():
-    outFields = ["Symbol", "Name", "Market Cap", "Country"]
+    fetchedAt = time.time()
 
     # Download both sources
-    nasdaqRows = getNasdaqRows()
-    tsxRows = getTsxRows()
-
-    dedup = {}
-
-    # Add all NASDAQ/US tickers (US wins unless TSX duplicates)
-    for row in nasdaqRows:
-        baseSymbol = row["Symbol"].upper()
-        normName = normalizeName(row["Name"])
-        key = (baseSymbol, normName)
-        dedup[key] = dict(row)  # US version by default
-
-    # Add/overwrite with TSX/Canadian tickers (preferred for duplicates)
-    for row in tsxRows:
-        baseSymbol = row["Symbol"].upper()
-        normName = normalizeName(row["Name"])
-        key = (baseSymbol, normName)
-        dedup[key] = dict(row)  # Canada wins if duplicate
-
-    allRows = []
-
-    # Append ".TO" to Canadian symbols for Yahoo Finance compatibility
-    for row in dedup.values():
-        if row["Country"].lower() == "canada":
-            row["Symbol"] = f"{row['Symbol']}.TO"
-        allRows.append(row)
-
-    # Write combined list to tickers.csv
-    with open("tickers.csv", "w", newline='', encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=outFields)
-        writer.writeheader()
-        writer.writerows(allRows)
-    print(f"Saved {len(allRows)} tickers to tickers.csv")
+    listings = fetchListings()
+    for name, listing in listings.items():
+        if isinstance(listing, Exception):
+            raise RuntimeError(f"{name} download failed: {listing}") from listing
+    tickerDf = combineListings(listings["nasdaq"], listings["tsx"])
+
+    # Save the binary store the app loads, plus tickers.csv as an export
+    saveUniverse(tickerDf, fetchedAt=fetchedAt)
+    exportCsv(tickerDf)
+    print(f"Saved {len(tickerDf)} tickers to the universe store and tickers.csv")
+    return tickerDf
 
 # ==== Run script directly ====
 
@@ -0,0 +1,173 @@
+"""Scheduled, incremental refresh of the ticker universe with atomic hot-swap."""
+
+import os
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from periodic import startPeriodic, exclusive
+from searchIndex import SearchIndex
+from tickerFetcher import outFields, fetchListings, combineListings
+from universeStore import (
+    universeDir, currentVersion, loadUniverse, saveUniverse, markFetched, storeAge, exportCsv,
+)
+
+# ==== Configuration ====
+
+# Upstream lists are re-downloaded once the store is older than this
+refreshAge = float(os.getenv("TICKER_REFRESH_AGE", 24 * 3600))
+# How often each process checks the store for age and for builds made elsewhere
+refreshCheckInterval = float(os.getenv("TICKER_REFRESH_CHECK", 15 * 60))
+# Relative market-cap move reported as a change in the diff
+capChangeThreshold = 0.10
+
+# ==== Live Universe ====
+
+class Universe(NamedTuple):
+    """One immutable build of the ticker list and the structures derived from it."""
+    df: pd.DataFrame
+    index: SearchIndex
+    version: str
+
+
+class UniverseHolder:
+    """
+    Holds the live Universe behind a single reference.
+    Readers grab `holder.current` once per request and use it throughout; a
+    refresh builds the next Universe off to the side and swaps the reference,
+    so requests never see a half-updated list or wait on a rebuild.
+    """
+
+    def __init__(self, loadFn=loadUniverse):
+        self.loadFn = loadFn
+        self._lock = threading.Lock()
+        self.current = self._build()
+
+    def _build(self):
+        version = currentVersion()
+        df = self.loadFn()
+        if version is None:
+            # loadFn seeded the very first store itself
+            version = currentVersion()
+        return Universe(df, SearchIndex(df), version)
+
+    def reloadIfChanged(self):
+        """Swap in the store's active build if it differs from ours (e.g. written by another worker)."""
+        with self._lock:
+            if currentVersion() == self.current.version:
+                return False
+            self.current = self._build()
+            print(f"Swapped in ticker universe {self.current.version} ({len(self.current.df)} tickers)")
+            return True
+
+# ==== Diffing ====
+
+def _keyed(tickerDf):
+    """Universe rows keyed by symbol with comparable name and numeric cap columns."""
+    df = tickerDf.drop_duplicates("Symbol", keep="last").set_index("Symbol")
+    return pd.DataFrame({
+        "Name": df["Name"].astype(object).where(df["Name"].notna(), "").astype(str),
+        "Market Cap": pd.to_numeric(df["Market Cap"].astype(object), errors="coerce").astype(float),
+    }, index=df.index)
+
+
+def diffUniverse(old, new, capThreshold=capChangeThreshold):
+    """
+    Compare two ticker lists by symbol.
+    Returns {"added", "delisted", "renamed", "capChanged"}: symbol lists for the
+    first two, (symbol, old, new) tuples for the others.  Cap changes count
+    when the value moves by more than capThreshold relative to the old one.
+    """
+    old, new = _keyed(old), _keyed(new)
+    common = old.index.intersection(new.index)
+    oldCommon, newCommon = old.loc[common], new.loc[common]
+
+    renamed = common[(oldCommon["Name"] != newCommon["Name"]).to_numpy()]
+    oldCap, newCap = oldCommon["Market Cap"].to_numpy(), newCommon["Market Cap"].to_numpy()
+    with np.errstate(invalid="ignore"):
+        moved = abs(newCap - oldCap) > capThreshold * abs(oldCap)
+    # A cap appearing or disappearing also counts as a change
+    moved |= pd.isna(oldCap) != pd.isna(newCap)
+    capChanged = common[moved]
+
+    return {
+        "added": list(new.index.difference(old.index)),
+        "delisted": list(old.index.difference(new.index)),
+        "renamed": [(s, old.at[s, "Name"], new.at[s, "Name"]) for s in renamed],
+        "capChanged": [(s, old.at[s, "Market Cap"], new.at[s, "Market Cap"]) for s in capChanged],
+    }
+
+
+def describeDiff(diff):
+    """One-line summary of a diff for the logs."""
+    return ", ".join(f"{len(items)} {name}" for name, items in diff.items())
+
+# ==== Refresh ====
+
+def fetchLatest(current):
+    """
+    Download both exchange lists (concurrently) and merge them.
+    If one source fails, its rows from the current universe are kept (TSX
+    rows are the ".TO" symbols) so a flaky exchange never delists anything.
+    Raises if both sources fail.
+    """
+    sources = fetchListings()
+    fetched = {}
+    for name, listing in sources.items():
+        if isinstance(listing, Exception):
+            print(f"Ticker refresh: {name} download failed, keeping current rows: {listing}")
+        else:
+            fetched[name] = listing
+    if not fetched:
+        raise RuntimeError("Both ticker sources failed")
+
+    empty = pd.DataFrame(columns=outFields)
+    fresh = combineListings(fetched.get("nasdaq", empty), fetched.get("tsx", empty))
+    if len(fetched) == len(sources):
+        return fresh
+    isTsx = current["Symbol"].astype(str).str.endswith(".TO")
+    kept = current[~isTsx] if "nasdaq" not in fetched else current[isTsx]
+    kept = kept.assign(**{
+        "Market Cap": pd.to_numeric(kept["Market Cap"].astype(object), errors="coerce"),
+        "Country": kept["Country"].astype(object),
+    })
+    return pd.concat([fresh, kept[outFields]], ignore_index=True)
+
+
+def refreshUniverse(holder):
+    """
+    Download the latest lists, diff them against the live universe, and
+    apply the changes: write a new store build and swap it in.  An unchanged
+    list only has its fetch time bumped.  Returns the diff.
+    """
+    fetchedAt = time.time()
+    current = holder.current.df
+    latest = fetchLatest(current)
+    diff = diffUniverse(current, latest)
+    print(f"Ticker refresh: {describeDiff(diff)}")
+
+    if not any(diff.values()):
+        markFetched(fetchedAt)
+        return diff
+    saveUniverse(latest, fetchedAt=fetchedAt)
+    exportCsv(latest)
+    holder.reloadIfChanged()
+    return diff
+
+# ==== Scheduling ====
+
+def checkForRefresh(holder):
+    """Pick up builds written elsewhere, and refresh from upstream if the store is stale."""
+    holder.reloadIfChanged()
+    if storeAge() <= refreshAge:
+        return
+    with exclusive(os.path.join(universeDir, "refresh.lock")) as acquired:
+        # Re-check: another process may have refreshed while we waited
+        if acquired and storeAge() > refreshAge:
+            refreshUniverse(holder)
+
+
+def startRefreshSchedule(holder):
+    """Run checkForRefresh on a background thread, first right away and then periodically."""
+    return startPeriodic(lambda: checkForRefresh(holder), refreshCheckInterval, "ticker-refresh")
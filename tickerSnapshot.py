@@ -0,0 +1,184 @@
+"""Fetch every yfinance statement for a ticker once and hold it in an immutable snapshot."""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+import pandas as pd
+import requests
+import yfinance as yf
+from curl_cffi.curl import CurlError
+from curl_cffi.requests.exceptions import HTTPError as CurlHTTPError
+from yfinance.exceptions import YFRateLimitError
+from upstreamScheduler import admit
+from circuitBreaker import breakerFor, shedMessage
+from instrumentation import recordStage, upstreamCalls
+
+# ==== Configuration ====
+
+# yfinance attributes the metric functions read, fetched concurrently
+statementFields = (
+    "info",
+    "financials",
+    "balance_sheet",
+    "cashflow",
+    "quarterly_financials",
+    "quarterly_cashflow",
+)
+
+# Builds the object statements are read from (swappable for offline runs)
+tickerFactory = yf.Ticker
+
+# Shared pool so concurrent evaluations don't each spin up their own threads
+_fetchPool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="snapshot")
+
+# ==== Snapshot Types ====
+
+@dataclass(frozen=True)
+class FetchTrace:
+    """Timing of a single upstream statement fetch."""
+    field: str
+    seconds: float
+    error: str = None
+
+
+@dataclass(frozen=True)
+class TickerSnapshot:
+    """
+    Read-only view of one ticker's yfinance data.
+    Attribute names mirror yf.Ticker so metric functions can take either.
+    """
+    symbol: str
+    info: MappingProxyType
+    financials: pd.DataFrame
+    balance_sheet: pd.DataFrame
+    cashflow: pd.DataFrame
+    quarterly_financials: pd.DataFrame
+    quarterly_cashflow: pd.DataFrame
+    trace: tuple = ()
+    cachedFields: tuple = ()
+    # Fields served from last-known-good data because upstream failed, and
+    # when the oldest of them was fetched (epoch seconds); None if all fresh
+    staleFields: tuple = ()
+    staleSince: float = None
+
+    @property
+    def upstreamCalls(self):
+        """Number of upstream fetches made to build this snapshot (shed ones aren't made)."""
+        return sum(1 for t in self.trace if t.error != shedMessage)
+
+    def traceSummary(self):
+        """One-line description of the fetches, e.g. for logging."""
+        total = max((t.seconds for t in self.trace), default=0)
+        parts = [
+            f"{t.field} {t.seconds:.2f}s" + (" (shed)" if t.error == shedMessage else " (failed)" if t.error else "")
+            for t in self.trace
+        ]
+        summary = f"{self.symbol}: {self.upstreamCalls} upstream calls in {total:.2f}s ({', '.join(parts)})"
+        if self.cachedFields:
+            summary += f", {len(self.cachedFields)} from cache"
+        if self.staleFields:
+            summary += f", {len(self.staleFields)} stale"
+        return summary
+
+# ==== Fetching ====
+
+def emptyValue(field):
+    """Placeholder used when a statement is missing or fails to download."""
+    return {} if field == "info" else pd.DataFrame()
+
+
+def isOutage(error):
+    """
+    Whether a fetch exception means Yahoo itself is failing (transport error,
+    timeout, 429 or 5xx) rather than the symbol having no data.  Only outages
+    count against the breaker: a delisted ticker must not shed everyone's calls.
+    """
+    if isinstance(error, (YFRateLimitError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, requests.RequestException) and not isinstance(error, requests.HTTPError):
+        return True
+    if isinstance(error, CurlError) and not isinstance(error, CurlHTTPError):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def _fetchField(tickerObj, field):
+    """Read one attribute from the ticker object, timing the call."""
+    start = time.perf_counter()
+    outage = False
+    try:
+        value = getattr(tickerObj, field)
+        error = None
+    except Exception as e:
+        value = None
+        error = str(e) or type(e).__name__
+        outage = isOutage(e)
+    seconds = time.perf_counter() - start
+    # Yahoo answered (even if only to say there is no data), so only outages count as failures
+    breakerFor("yahoo").record(not outage, seconds)
+    recordStage(f"fetch.{field}", seconds)
+    upstreamCalls.inc(host="yahoo", outcome="error" if error else "ok")
+    return value, FetchTrace(field, seconds, error)
+
+
+def fetchFields(symbol, fields=statementFields):
+    """
+    Fetch the given attributes for a symbol concurrently.
+    Returns ({field: value}, [FetchTrace]); failed fields are left out of the values.
+    While Yahoo's circuit breaker is open no call is made: those fields fail
+    at once with shedMessage as their error.
+    """
+    tickerObj = tickerFactory(symbol)
+    breaker = breakerFor("yahoo")
+    # Turns are taken here, in priority order, before a fetch gets a pool thread,
+    # so queued batch work never holds the shared pool while interactive calls wait.
+    # Each fetch runs in a copy of our context so its timing lands in the request trace
+    futures = {}
+    for field in fields:
+        if not breaker.allow():
+            futures[field] = None
+            continue
+        admit("yahoo")
+        if breaker.isOpen():
+            # Tripped while this call waited for its turn
+            futures[field] = None
+            continue
+        futures[field] = _fetchPool.submit(contextvars.copy_context().run, _fetchField, tickerObj, field)
+    values = {}
+    trace = []
+    for field, future in futures.items():
+        value, entry = future.result() if future is not None else (None, FetchTrace(field, 0.0, shedMessage))
+        trace.append(entry)
+        if not entry.error:
+            values[field] = value if value is not None else emptyValue(field)
+    return values, trace
+
+
+def buildSnapshot(symbol, values, trace=(), cachedFields=(), staleFields=(), staleSince=None):
+    """
+    Assemble a TickerSnapshot from raw field values.
+    A missing `info` raises (nothing useful can be computed without it);
+    missing statements become empty frames so metrics fall back to zero.
+    """
+    if "info" not in values:
+        errors = [t.error for t in trace if t.field == "info" and t.error]
+        raise RuntimeError(f"Could not fetch info for {symbol}: {errors[0] if errors else 'not available'}")
+    fields = {field: values.get(field, emptyValue(field)) for field in statementFields}
+    fields["info"] = MappingProxyType(dict(fields["info"]))
+    return TickerSnapshot(
+        symbol=symbol,
+        trace=tuple(trace),
+        cachedFields=tuple(cachedFields),
+        staleFields=tuple(staleFields),
+        staleSince=staleSince,
+        **fields,
+    )
+
+
+def fetchSnapshot(symbol):
+    """Fetch all statements for a symbol straight from upstream (no cache)."""
+    values, trace = fetchFields(symbol)
+    return buildSnapshot(symbol, values, trace)
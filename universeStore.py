@@ -0,0 +1,174 @@
+"""Compact, memory-mapped columnar store for the ticker universe."""
+
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# ==== Configuration ====
+
+# Directory holding versioned store builds plus a CURRENT pointer file
+universeDir = os.getenv("UNIVERSE_DIR", "universe")
+# Older builds kept around so workers still mapping them aren't surprised
+keepVersions = 2
+# Human-readable CSV export written alongside each refresh
+csvExportPath = os.getenv("TICKERS_CSV", "tickers.csv")
+
+# ==== Encoding Helpers ====
+
+def encodeStrings(values):
+    """Pack strings into one UTF-8 byte blob plus int64 offsets (missing -> empty)."""
+    encoded = [v.encode("utf-8") if isinstance(v, str) else b"" for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def decodeStrings(blob, offsets):
+    """Unpack a blob/offsets pair into interned strings (empty -> None)."""
+    raw = blob.tobytes()
+    values = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        values.append(sys.intern(raw[start:end].decode("utf-8")) if end > start else None)
+    return values
+
+
+def versionPath(version, baseDir=universeDir):
+    return os.path.join(baseDir, version)
+
+# ==== Store ====
+
+def currentVersion(baseDir=universeDir):
+    """Name of the active store build, or None if no store exists yet."""
+    try:
+        with open(os.path.join(baseDir, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def readMeta(baseDir=universeDir):
+    """Metadata of the active build (row count, when its data was fetched)."""
+    version = currentVersion(baseDir)
+    if version is None:
+        raise FileNotFoundError(f"No ticker universe store in {baseDir}")
+    with open(os.path.join(versionPath(version, baseDir), "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def saveUniverse(tickerDf, baseDir=universeDir, fetchedAt=None):
+    """
+    Write a new store build from a ticker DataFrame and make it current.
+    The build goes to its own directory and only then is CURRENT swapped,
+    so readers never see a half-written store.
+    """
+    # Microseconds keep two builds in the same second from sharing a directory
+    version = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}"
+    path = versionPath(version, baseDir)
+    os.makedirs(path, exist_ok=True)
+
+    symbolBlob, symbolOffsets = encodeStrings(tickerDf["Symbol"])
+    nameBlob, nameOffsets = encodeStrings(tickerDf["Name"])
+    country = pd.Categorical(tickerDf["Country"])
+    marketCap = pd.to_numeric(tickerDf["Market Cap"], errors="coerce")
+    # -1 marks an unknown market cap
+    marketCap = marketCap.round().fillna(-1).to_numpy(dtype=np.int64)
+
+    np.save(os.path.join(path, "symbols.npy"), symbolBlob)
+    np.save(os.path.join(path, "symbolOffsets.npy"), symbolOffsets)
+    np.save(os.path.join(path, "names.npy"), nameBlob)
+    np.save(os.path.join(path, "nameOffsets.npy"), nameOffsets)
+    # Saved in the dtype pandas uses for the codes, so loading can map them as-is
+    np.save(os.path.join(path, "countryCodes.npy"), country.codes)
+    np.save(os.path.join(path, "marketCap.npy"), marketCap)
+    np.save(os.path.join(path, "marketCapMissing.npy"), marketCap < 0)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "rows": len(tickerDf),
+            "countries": [str(c) for c in country.categories],
+            "fetchedAt": fetchedAt or time.time(),
+        }, f)
+
+    pointer = os.path.join(baseDir, f"CURRENT.{os.getpid()}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(baseDir, "CURRENT"))
+    pruneVersions(baseDir)
+    return version
+
+
+def pruneVersions(baseDir=universeDir):
+    """Delete all but the newest few store builds."""
+    current = currentVersion(baseDir)
+    versions = sorted(
+        d for d in os.listdir(baseDir)
+        if os.path.isdir(os.path.join(baseDir, d))
+    )
+    for version in versions[:-keepVersions]:
+        if version != current:
+            shutil.rmtree(os.path.join(baseDir, version), ignore_errors=True)
+
+
+def loadUniverse(baseDir=universeDir):
+    """
+    Load the active store build as a DataFrame.
+    Market cap (values and missing mask) and country codes are used straight
+    from the mapped files, so their pages are shared between worker
+    processes.  Symbol and Name are decoded into ordinary Python strings
+    here: the search index and the screen read every one of them, so each
+    process ends up holding its own copy.
+    """
+    meta = readMeta(baseDir)
+    path = versionPath(currentVersion(baseDir), baseDir)
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    marketCap = load("marketCap")
+    try:
+        missing = load("marketCapMissing")
+    except FileNotFoundError:
+        # Builds from before the mask was stored
+        missing = marketCap < 0
+    country = pd.CategoricalDtype(meta["countries"])
+    # copy=False: pandas would otherwise copy the mapped arrays into private memory
+    return pd.DataFrame({
+        "Symbol": decodeStrings(load("symbols"), load("symbolOffsets")),
+        "Name": decodeStrings(load("names"), load("nameOffsets")),
+        # Nullable int64 over the mapped array; unknown caps are <NA>
+        "Market Cap": pd.arrays.IntegerArray(marketCap, missing),
+        # Codes in any other dtype than pandas picks for these categories get copied
+        "Country": pd.Categorical.from_codes(load("countryCodes"), dtype=country),
+    }, copy=False)
+
+
+def markFetched(fetchedAt=None, baseDir=universeDir):
+    """Record that the active build was re-checked against upstream and is still current."""
+    version = currentVersion(baseDir)
+    if version is None:
+        raise FileNotFoundError(f"No ticker universe store in {baseDir}")
+    meta = readMeta(baseDir)
+    meta["fetchedAt"] = fetchedAt or time.time()
+    path = os.path.join(versionPath(version, baseDir), "meta.json")
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+    with open(tmpPath, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmpPath, path)
+
+
+def storeAge(baseDir=universeDir):
+    """Seconds since the active build's data was fetched (inf if there is none)."""
+    try:
+        return time.time() - readMeta(baseDir)["fetchedAt"]
+    except FileNotFoundError:
+        return float("inf")
+
+
+def exportCsv(tickerDf, path=csvExportPath):
+    """Write the universe out as the human-readable CSV export."""
+    tickerDf.to_csv(path, index=False, columns=["Symbol", "Name", "Market Cap", "Country"])
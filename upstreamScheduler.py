@@ -0,0 +1,157 @@
+"""Priority scheduling of upstream calls: interactive work first, users served fairly within a class."""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from rateLimit import limiterFor
+from instrumentation import Histogram, registerCollector
+
+# ==== Configuration ====
+
+# Priority classes, most urgent first
+priorityClasses = ["interactive", "watchlist", "batch", "background"]
+
+# How long the head waiter blocks on the rate limiter before checking whether
+# a more urgent call has queued ahead of it
+preemptSlice = 0.05
+
+# Class and user of the calls made by the current request / thread.  Threads
+# that never set them (schedules, cache refreshes) run as background work.
+_currentClass = contextvars.ContextVar("upstreamClass", default="background")
+_currentUser = contextvars.ContextVar("upstreamUser", default="system")
+
+waitSeconds = Histogram(
+    "stockeval_upstream_wait_seconds",
+    "Time upstream calls waited for their turn under the rate budget.",
+    ["host", "priority"],
+)
+
+# ==== Context ====
+
+def setPriority(priority, user=None):
+    """Set the class (and user) for upstream calls made from here on in this context."""
+    if priority not in priorityClasses:
+        raise ValueError(f"Unknown priority class: {priority}")
+    _currentClass.set(priority)
+    if user is not None:
+        _currentUser.set(user)
+
+
+@contextmanager
+def upstreamPriority(priority, user=None):
+    """Run the enclosed block's upstream calls under `priority` (and `user`)."""
+    if priority not in priorityClasses:
+        raise ValueError(f"Unknown priority class: {priority}")
+    classToken = _currentClass.set(priority)
+    userToken = _currentUser.set(user) if user is not None else None
+    try:
+        yield
+    finally:
+        _currentClass.reset(classToken)
+        if userToken is not None:
+            _currentUser.reset(userToken)
+
+# ==== Gate ====
+
+class PriorityGate:
+    """
+    Hands out one host's rate-limit tokens in priority order.  Waiters queue
+    by (class, fair-share tag, arrival); only the head of the queue draws on
+    the token bucket, so a batch job with hundreds of queued calls can't get
+    ahead of a user's evaluation.  Within a class each user's calls get
+    increasing tags (start-time fair queuing), so one user's bulk import
+    interleaves with everyone else's instead of running first.
+    """
+
+    def __init__(self, host, limiter):
+        self.host = host
+        self.limiter = limiter
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._order = itertools.count()
+        # (class rank, user) -> last tag handed out; class rank -> tag of the last call served
+        self._userTags = {}
+        self._virtualTime = {}
+
+    def _remove(self, entry):
+        self._waiting.remove(entry)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def acquire(self, priority="background", user="system"):
+        """Block until it is this call's turn and a token is available."""
+        rank = priorityClasses.index(priority)
+        start = time.monotonic()
+        with self._cond:
+            tag = max(self._userTags.get((rank, user), 0), self._virtualTime.get(rank, 0)) + 1
+            self._userTags[(rank, user)] = tag
+            entry = (rank, tag, next(self._order))
+            heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                with self._cond:
+                    while self._waiting[0] != entry:
+                        self._cond.wait()
+                if self.limiter.acquire(timeout=preemptSlice):
+                    break
+        finally:
+            with self._cond:
+                self._remove(entry)
+                self._virtualTime[rank] = max(self._virtualTime.get(rank, 0), tag)
+                # Forget users with nothing queued once the class has moved past them
+                if self._userTags.get((rank, user)) == tag and not any(e[0] == rank for e in self._waiting):
+                    del self._userTags[(rank, user)]
+        waitSeconds.observe(time.monotonic() - start, host=self.host, priority=priority)
+
+    def depth(self):
+        """Queued calls per priority class."""
+        with self._cond:
+            counts = {priority: 0 for priority in priorityClasses}
+            for rank, _, _ in self._waiting:
+                counts[priorityClasses[rank]] += 1
+            return counts
+
+# ==== Registry ====
+
+_gates = {}
+_gatesLock = threading.Lock()
+
+
+def gateFor(host):
+    """The PriorityGate in front of an upstream host's rate limiter."""
+    with _gatesLock:
+        if host not in _gates:
+            _gates[host] = PriorityGate(host, limiterFor(host))
+        return _gates[host]
+
+
+def admit(host):
+    """
+    Wait for permission to make one call to `host`, queued under the
+    current context's priority class and user.  Use instead of
+    limiterFor(host).acquire() for every upstream call.
+    """
+    gateFor(host).acquire(_currentClass.get(), _currentUser.get())
+
+
+def queueDepths():
+    """{host: {priority: queued calls}} for every host seen so far."""
+    with _gatesLock:
+        gates = list(_gates.values())
+    return {gate.host: gate.depth() for gate in gates}
+
+
+def _prometheusLines():
+    lines = [
+        "# HELP stockeval_upstream_queue_depth Upstream calls waiting for their turn.",
+        "# TYPE stockeval_upstream_queue_depth gauge",
+    ]
+    for host, counts in sorted(queueDepths().items()):
+        for priority, count in counts.items():
+            lines.append(f'stockeval_upstream_queue_depth{{host="{host}",priority="{priority}"}} {count}')
+    return lines
+
+registerCollector(_prometheusLines)